@@ -2,14 +2,31 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import os
+import sys
 from dotenv import load_dotenv
 import asyncio
+import contextlib
+import contextvars
+import hashlib
+import json
 import traceback
 import aiohttp
+import bisect
 import time
 import random
+import re
+import sqlite3
+import threading
+import tracemalloc
+import unicodedata
+from array import array
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
 
+# Extensions reach the shared state below with `from bot import ...`; make that this module even
+# when it runs as a script (`python bot.py`), instead of a second copy imported under another name.
+sys.modules.setdefault("bot", sys.modules[__name__])
+
 # Load environment variables from .env file (for local development)
 # This line should be present for local testing, but Railway handles environment variables directly.
 load_dotenv()
@@ -18,10 +35,22 @@ load_dotenv()
 # All sensitive configurations MUST be loaded from environment variables.
 # For Railway, these are set in your project's "Variables" tab.
 DISCORD_BOT_TOKEN = os.getenv('DISCORD_TOKEN') # Ensure your Railway variable is named DISCORD_TOKEN
+# Bot-wide fallback; servers can pick their own channel with /confessionconfig
 CONFESSIONS_CHANNEL_ID = int(os.getenv('CONFESSIONS_CHANNEL_ID', '1383079469958566038')) # Default if not set, but prefer explicit config
+# Confessions are delivered by a background outbox that stays under Discord's per-channel rate limit
+CONFESSION_CHANNEL_RATE_LIMIT = int(os.getenv("CONFESSION_CHANNEL_RATE_LIMIT", "5"))        # Messages per channel...
+CONFESSION_CHANNEL_RATE_PERIOD = float(os.getenv("CONFESSION_CHANNEL_RATE_PERIOD", "5"))    # ...per this many seconds
+# Post confessions through a per-channel webhook (needs Manage Webhooks) instead of as the bot
+CONFESSION_USE_WEBHOOKS = os.getenv("CONFESSION_USE_WEBHOOKS", "true").lower() in ("1", "true", "yes")
 
 # --- API Configuration ---
-GAG_STOCK_API_URL = "https://growagardenapi.vercel.app/api/stock/GetStock"
+# Upstream URLs can be overridden, e.g. to point the bot at the local stand-ins in loadtest.py
+GAG_STOCK_API_URL = os.getenv("GAG_STOCK_API_URL", "https://growagardenapi.vercel.app/api/stock/GetStock")
+LYRICS_API_URL = os.getenv("LYRICS_API_URL", "https://api.lyrics.ovh/v1")
+CURRENCY_API_URL = os.getenv("CURRENCY_API_URL", "https://v6.exchangerate-api.com/v6")
+ROBLOX_USERS_API_URL = os.getenv("ROBLOX_USERS_API_URL", "https://users.roblox.com/v1")
+FORTNITE_API_URL = os.getenv("FORTNITE_API_URL", "https://fortnite-api.com/v2")
+GAG_STOCK_POLL_INTERVAL = float(os.getenv("GAG_STOCK_POLL_INTERVAL", "30")) # Seconds between background stock polls (cluster 0 polls, the others share its snapshot)
 
 # --- API Keys for external services (ALL LOADED FROM ENVIRONMENT VARIABLES) ---
 # You MUST set these environment variables in your Railway project settings.
@@ -30,300 +59,1665 @@ CURRENCY_API_KEY = os.getenv("CURRENCY_API_KEY")
 IMAGE_GEN_API_KEY = os.getenv("IMAGE_GEN_API_KEY") 
 FORTNITE_API_KEY = os.getenv("FORTNITE_API_KEY")
 
+# Currency rates are fetched once for CURRENCY_BASE and every pair is computed from that table
+CURRENCY_BASE = os.getenv("CURRENCY_BASE", "USD").upper()
+CURRENCY_RATES_TTL = float(os.getenv("CURRENCY_RATES_TTL", "3600")) # Seconds before the cached rate table is refreshed (by cluster 0, shared with the others)
+CURRENCY_MAX_TARGETS = 10 # Max currencies per /currencyconvert in multi-target mode
+
 # Example Stability AI (SDXL) endpoint - keep this as a string, no key needed in URL
-IMAGE_GEN_API_URL = "https://api.stability.ai/v1/generation/stable-diffusion-xl-1024-v0-9/text-to-image" 
+IMAGE_GEN_API_URL = os.getenv("IMAGE_GEN_API_URL", "https://api.stability.ai/v1/generation/stable-diffusion-xl-1024-v0-9/text-to-image")
+
+# Roblox lookups made within ROBLOX_BATCH_WINDOW seconds of each other share one batched API request
+ROBLOX_BATCH_WINDOW = float(os.getenv("ROBLOX_BATCH_WINDOW", "0.005"))
+ROBLOX_ID_CACHE_TTL = float(os.getenv("ROBLOX_ID_CACHE_TTL", "86400"))       # Username -> user ID mappings rarely change
+ROBLOX_PROFILE_CACHE_TTL = float(os.getenv("ROBLOX_PROFILE_CACHE_TTL", "300")) # Profiles (description, ban status) change more often
+ROBLOX_AUTOCOMPLETE_NAMES = int(os.getenv("ROBLOX_AUTOCOMPLETE_NAMES", "50000"))  # Resolved usernames remembered for /roblox suggestions
+
+# Fortnite stats are cached per player; /fortnitecompare fetches several players with bounded concurrency
+FORTNITE_CACHE_TTL = float(os.getenv("FORTNITE_CACHE_TTL", "120"))
+FORTNITE_COMPARE_MAX = 5
+FORTNITE_COMPARE_CONCURRENCY = int(os.getenv("FORTNITE_COMPARE_CONCURRENCY", "3"))
+
+# /ship without a second user scores the caller against every cached member of the server
+SHIP_MATCHES = 5                                                            # Top matches shown in matchmaking mode
+SHIP_MEMBER_INDEX_TTL = float(os.getenv("SHIP_MEMBER_INDEX_TTL", "300"))    # Seconds a server's member ID array is reused
+# Privileged; needed for /ship matchmaking to see every member (enable "Server Members Intent" in the Developer Portal)
+MEMBERS_INTENT = os.getenv("MEMBERS_INTENT", "false").lower() in ("1", "true", "yes")
+
+# Truth/dare/never-have-I-ever prompts are read from PROMPTS_DIR/<pack>/<kind>.<rating>.txt, one prompt per line
+PROMPTS_DIR = os.getenv("PROMPTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts"))
+PROMPT_RELOAD_INTERVAL = float(os.getenv("PROMPT_RELOAD_INTERVAL", "30"))  # Seconds between checks for edited pack files
+PROMPT_DEFAULT_PACKS = [p.strip() for p in os.getenv("PROMPT_DEFAULT_PACKS", "classic").split(",") if p.strip()]
+PROMPT_DEFAULT_RATING = os.getenv("PROMPT_DEFAULT_RATING", "mature")      # Highest content rating servers get by default
+PROMPT_MAX_BAGS = int(os.getenv("PROMPT_MAX_BAGS", "100000"))             # Channels whose shuffle position is remembered
+
+# --- Local Storage ---
+# Directory for SQLite databases and other on-disk caches. On Railway, point this at a mounted volume.
+DATA_DIR = os.getenv("DATA_DIR", "data")
+SOCIALS_CACHE_SIZE = int(os.getenv("SOCIALS_CACHE_SIZE", "10000")) # Users whose social links are kept in RAM
+LYRICS_MEMORY_CACHE_BYTES = int(os.getenv("LYRICS_MEMORY_CACHE_BYTES", str(16 * 1024 * 1024))) # Budget for compressed lyrics held in RAM
+LYRICS_PAGE_CHARS = 3800 # Max characters per lyrics page (embed descriptions allow 4096)
+
+# Image generation runs through a job queue with a fixed number of workers
+IMAGE_GEN_WORKERS = int(os.getenv("IMAGE_GEN_WORKERS", "2"))                         # Jobs generated concurrently
+IMAGE_GEN_MAX_JOBS_PER_USER = int(os.getenv("IMAGE_GEN_MAX_JOBS_PER_USER", "2"))     # Jobs a user may have queued or running
+IMAGE_GEN_MAX_QUEUE = int(os.getenv("IMAGE_GEN_MAX_QUEUE", "50"))                    # Jobs waiting across all users
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))  # Disk budget for cached generated images
+
+# --- Shared HTTP Client Configuration ---
+# One pooled aiohttp session is shared by every command that talks to an external API.
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))                 # Max open connections in total
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20")) # Max open connections per upstream host
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))           # Seconds to cache DNS lookups
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))                      # Default total timeout per request (seconds)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))      # Default connect timeout (seconds)
+
+# --- Memory Configuration ---
+# LOW_MEMORY trims what discord.py keeps for a bot that only answers slash commands: no message content,
+# message, typing, voice state, emoji or invite events, no message cache, no member cache and no member
+# chunking at startup. /ship matchmaking (with MEMBERS_INTENT) then requests a server's member list when
+# it's needed and keeps only the IDs. Compare RSS with /debug memory before and after turning it on.
+LOW_MEMORY = os.getenv("LOW_MEMORY", "false").lower() in ("1", "true", "yes")
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "0")) # >0 traces allocations for /debug memory (costs memory and CPU)
+if TRACEMALLOC_FRAMES > 0:
+    tracemalloc.start(TRACEMALLOC_FRAMES) # As early as possible, so startup allocations are attributed too
+
+# --- Extensions ---
+# Commands live in extensions/ and are loaded at startup; the owner can load, unload and reload them
+# in-process with /debug extension. Only the modules (and dependencies) of enabled extensions are imported.
+EXTENSIONS = [e.strip() for e in os.getenv("EXTENSIONS", "confessions,games,lookups,moderation,profiles").split(",") if e.strip()]
+
+# --- Upstream Resilience Configuration ---
+# Every external API gets a latency budget (covering retries), and a circuit breaker that fails
+# fast for BREAKER_RESET_TIMEOUT seconds after BREAKER_FAILURE_THRESHOLD consecutive failures.
+GAG_STOCK_TIMEOUT = float(os.getenv("GAG_STOCK_TIMEOUT", "5"))      # Seconds per gag-stock poll
+LYRICS_TIMEOUT = float(os.getenv("LYRICS_TIMEOUT", "8"))            # Seconds per lyrics.ovh lookup
+CURRENCY_TIMEOUT = float(os.getenv("CURRENCY_TIMEOUT", "5"))        # Seconds per exchangerate-api refresh
+ROBLOX_TIMEOUT = float(os.getenv("ROBLOX_TIMEOUT", "5"))            # Seconds per Roblox API call
+FORTNITE_TIMEOUT = float(os.getenv("FORTNITE_TIMEOUT", "8"))        # Seconds per Fortnite-API.com lookup
+IMAGE_GEN_TIMEOUT = float(os.getenv("IMAGE_GEN_TIMEOUT", "120"))    # Seconds per image generation (never retried)
+UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", "2"))          # Extra attempts for GETs after a timeout, connection error or 5xx/429
+UPSTREAM_RETRY_BACKOFF = float(os.getenv("UPSTREAM_RETRY_BACKOFF", "0.25")) # Retry n waits a random 0..BACKOFF*2^n seconds
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5")) # Consecutive failures that open a breaker
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))      # Seconds a breaker stays open before a trial request
+
+# --- Upstream Rate Limit Configuration ---
+# Token bucket per upstream as "<requests>/<seconds>[:<burst>]" (burst defaults to 1); empty = unlimited.
+# Limits apply per process, so split a quota between clusters. Requests over the limit are queued
+# and handed out round-robin across guilds, then across users within a guild.
+GAG_STOCK_RATE_LIMIT = os.getenv("GAG_STOCK_RATE_LIMIT", "")
+LYRICS_RATE_LIMIT = os.getenv("LYRICS_RATE_LIMIT", "")
+CURRENCY_RATE_LIMIT = os.getenv("CURRENCY_RATE_LIMIT", "1500/2592000:5")   # ExchangeRate-API free plan: 1500 requests/month
+ROBLOX_RATE_LIMIT = os.getenv("ROBLOX_RATE_LIMIT", "")
+FORTNITE_RATE_LIMIT = os.getenv("FORTNITE_RATE_LIMIT", "3/1:3")
+IMAGE_GEN_RATE_LIMIT = os.getenv("IMAGE_GEN_RATE_LIMIT", "10/60:2")
+UPSTREAM_QUEUE_MAX_WAIT = float(os.getenv("UPSTREAM_QUEUE_MAX_WAIT", "600")) # Refuse requests expected to queue longer (interactions expire after 15 min)
+UPSTREAM_NOTIFY_WAIT = float(os.getenv("UPSTREAM_NOTIFY_WAIT", "2"))         # Tell users their expected wait when queued at least this long
+
+# --- Cooldown Configuration ---
+# Bot-wide cooldowns as comma-separated "<command>=<uses>/<seconds>" (or "=off"); "*" covers every other command.
+# Servers can override them per command and per role, and the owner bot-wide, with /cooldownconfig.
+COMMAND_COOLDOWNS = os.getenv(
+    "COMMAND_COOLDOWNS",
+    "gag-stock=1/10,imagegenerate=2/60,fortnite=5/30,fortnitecompare=2/30,lyrics=5/30,roblox=5/30,currencyconvert=5/30"
+)
+
+# --- Command Sync Configuration ---
+# Slash commands are only re-uploaded when the command tree's hash changes
+DEV_GUILD_ID = int(os.getenv("DEV_GUILD_ID", "0"))                                       # Sync to this guild only (instant updates while developing)
+COMMAND_SYNC_FORCE = os.getenv("COMMAND_SYNC_FORCE", "false").lower() in ("1", "true", "yes") # Sync even if the hash is unchanged
+
+# --- Sharding Configuration ---
+# Leave unset to run unsharded. cluster.py sets these for each worker process it launches.
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0"))                                   # Total shards across all processes (0 = unsharded)
+SHARD_IDS = [int(i) for i in os.getenv("SHARD_IDS", "").split(",") if i.strip()]   # Shards this process runs (needs SHARD_COUNT; empty = all)
+AUTO_SHARD = os.getenv("AUTO_SHARD", "false").lower() in ("1", "true", "yes")      # Use Discord's recommended shard count
+CLUSTER_ID = int(os.getenv("CLUSTER_ID", "0"))                                     # This worker's index; cluster 0 owns command sync
+SHARDED = AUTO_SHARD or SHARD_COUNT > 0
+STORAGE_SYNC_INTERVAL = float(os.getenv("STORAGE_SYNC_INTERVAL", "2")) # Seconds between checks for writes made by other processes
+
+# --- Metrics Configuration ---
+# Set METRICS_PORT to serve Prometheus metrics at http://METRICS_HOST:METRICS_PORT/metrics
+# (each cluster listens on METRICS_PORT + CLUSTER_ID)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))         # 0 = metrics endpoint disabled
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")     # Keep it local unless a scraper needs remote access
 
 
 # --- Bot Setup ---
+class ConfessionsBot(commands.AutoShardedBot if SHARDED else commands.Bot):
+    """
+    commands.Bot (or AutoShardedBot when sharding is configured) with a single pooled
+    aiohttp session for outbound API calls.
+    The session is created in setup_hook and closed when the bot shuts down. Commands are loaded
+    from the EXTENSIONS, whose caches and workers live in shared_state so they survive reloads.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.http_session: aiohttp.ClientSession | None = None
+        self.metrics_runner = None # aiohttp.web.AppRunner while the metrics endpoint is up
+        self.shared_state = {}     # name -> object created by shared(); kept across extension reloads
+
+    async def setup_hook(self):
+        await self.start_services()
+        if CLUSTER_ID == 0: # Commands are global; one process is enough to keep them in sync
+            await sync_commands(force=COMMAND_SYNC_FORCE)
+
+    async def start_services(self):
+        """Opens storage and the HTTP session, then loads the extensions (which start their own workers). Needs no Discord connection."""
+        storage.open()
+        cooldowns.load()
+        snapshots.open()
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        )
+        self.http_session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            trace_configs=[build_http_trace_config()],
+        )
+        if METRICS_PORT:
+            self.metrics_runner = await start_metrics_server(METRICS_HOST, METRICS_PORT + CLUSTER_ID)
+        for name in EXTENSIONS:
+            await self.load_extension(f"extensions.{name}")
+        storage.watch(STORAGE_SYNC_INTERVAL)
+
+    def owns_guild(self, guild_id):
+        """
+        True if the guild's events are handled by a shard running in this process.
+        DMs are always delivered to shard 0.
+        """
+        if self.shard_count is None or self.shard_ids is None:
+            return True
+        shard_id = (guild_id >> 22) % self.shard_count if guild_id else 0
+        return shard_id in self.shard_ids
+
+    async def close(self):
+        await self.stop_services()
+        await super().close()
+        if self.http_session is not None and not self.http_session.closed:
+            await self.http_session.close()
+
+    async def stop_services(self):
+        for name in list(self.extensions):
+            await self.unload_extension(name) # Their teardown() stops workers and closes caches
+        cooldowns.close()
+        snapshots.close()
+        await storage.close()
+        if self.metrics_runner is not None:
+            await self.metrics_runner.cleanup()
+
+
+class BanGateTree(app_commands.CommandTree):
+    """
+    CommandTree that rejects bot-banned users before any command work starts
+    (argument transformation, checks). Bans live in storage.bans. The CooldownEngine is charged by
+    cooldown_check, which runs after the command's own checks.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.blocked = {"global": 0, "guild": 0, "command": 0} # Short-circuited invocations by ban scope
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        command_name = interaction.data.get("name", "") if interaction.data else ""
+        scope = storage.bans.match(interaction.guild_id, command_name, interaction.user.id)
+        if scope is None:
+            current_interaction.set(interaction) # Runs in the same task as the command callback
+            if interaction.type is discord.InteractionType.application_command:
+                command = interaction.command
+                instrument_interaction(interaction, command.qualified_name if command else command_name)
+                if command is not None and cooldown_check not in command.checks:
+                    # Attached on first use, so commands added later (extensions, /debug reload) get it too
+                    command.add_check(cooldown_check)
+            return True
+
+        self.blocked[scope] += 1
+        if interaction.type is discord.InteractionType.application_command:
+            if scope == "command":
+                message = f"You are banned from using `/{command_name}`."
+            else:
+                message = "You are banned from using bot commands."
+            await interaction.response.send_message(message, ephemeral=True)
+        return False # Autocomplete requests from banned users just get no suggestions
+
+
+def build_discord_trace_config():
+    """aiohttp TraceConfig for discord.py's own HTTP client (Client's http_trace), feeding response_timer."""
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_end(session, ctx, params):
+        if params.method != "POST" or params.response.status >= 400:
+            return
+        parts = params.url.path.rstrip("/").split("/")
+        if len(parts) >= 4 and parts[-1] == "callback" and parts[-4] == "interactions":
+            response_timer.record(parts[-2], "bot_command_ack_seconds")
+        elif len(parts) >= 3 and parts[-3] == "webhooks":
+            response_timer.record(parts[-1], "bot_command_followup_seconds")
+
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
+
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix='!', intents=intents)
+intents.members = MEMBERS_INTENT
+client_options = {"http_trace": build_discord_trace_config()}
+if SHARD_COUNT:
+    client_options["shard_count"] = SHARD_COUNT
+    if SHARD_IDS:
+        client_options["shard_ids"] = SHARD_IDS
+if LOW_MEMORY:
+    # Interactions carry everything a slash command needs; skip the events and caches nothing here reads
+    intents.message_content = False
+    intents.messages = False
+    intents.typing = False
+    intents.voice_states = False
+    intents.emojis_and_stickers = False
+    intents.invites = False
+    client_options["member_cache_flags"] = discord.MemberCacheFlags.none()
+    client_options["chunk_guilds_at_startup"] = False
+    client_options["max_messages"] = None
+bot = ConfessionsBot(command_prefix='!', intents=intents, tree_cls=BanGateTree, **client_options)
+
+@bot.listen('on_app_command_completion')
+async def record_command_completion(interaction, command):
+    record_command_finished(interaction, "ok")
 
 # --- Global Variables for Commands ---
 bot_start_time = datetime.now() # To track bot uptime
+# Bot bans and social links are persisted by BotStorage (see "Persistent Storage" below)
 
-# In-memory storage for bot-banned users (resets on bot restart)
-bot_banned_users = set()
-# In-memory storage for social links (resets on bot restart)
-user_social_links = {} # {user_id: {platform: link}}
-
-# Lists for fun commands - these can stay directly in code as they're not sensitive
-TRUTHS = [
-    "What's the most embarrassing thing you've ever worn?",
-    "What's a secret talent you have?",
-    "What's the weirdest food combination you secretly enjoy?",
-    "What's one thing you're really bad at, but love doing?",
-    "What's the funniest thing you've seen happen on Discord?",
-    "What's the most scandalous thing you've ever witnessed in a public Discord call?",
-    "What's a secret Discord server you're in that you'd never tell your real-life friends about?",
-    "What's the riskiest lie you've ever told someone you met on Discord?",
-    "Have you ever pretended to be busy in real life to spend more time on Discord? What were you doing instead?",
-    "What's the most embarrassing Discord message you've ever accidentally sent to the wrong person/channel?",
-    "What's a weird habit or ritual you have when you're heavily invested in a Discord game or event?",
-    "What's the most inappropriate direct message exchange you've ever had on Discord?",
-    "Have you ever snooped through someone else's Discord DMs or private channels (with or without permission)?",
-    "What's a Discord crush you've had that no one knows about?",
-    "What's the most time you've ever spent on Discord in a single day, and what were you avoiding in real life?",
-    "What's one thing you've done in real life that was directly influenced by a dare or challenge from Discord?",
-    "What's the most personal secret you've accidentally revealed in a Discord voice chat?",
-    "What's one Discord server you joined purely out of FOMO (Fear Of Missing Out) and then immediately regretted?",
-    "What's a Discord profile picture or bio you've had that you now deeply regret?",
-    "Have you ever blocked someone on Discord in real life, or vice versa, because of something that happened online?",
-    "What's the most outrageous lie you've ever told about yourself on a Discord profile or in a server?",
-    "What's a Discord roleplay scenario you've been in that blurred the lines between online and real life too much?",
-    "Have you ever tried to use Discord to find a romantic partner, and what was your most awkward experience?",
-    "What's the most dramatic exit you've ever made from a Discord server, and why?",
-    "What's a secret you keep from your real-life friends that you've told someone on Discord?",
-]
-
-DARES = [
-    "Send a random emoji to a random text channel in this server.",
-    "Change your nickname to 'Daredevil' for 5 minutes.",
-    "Say 'Boop boop beep' in a voice chat (if applicable).",
-    "Post a picture of your pet (or a funny animal picture) in chat.",
-    "Try to say your username backwards 3 times fast.",
-    "Give a random user a compliment.",
-    "Tell Summer hes a sexy young man", # This one is very specific, you might want to generalize it
-    "Send a screenshot of your phone's home screen",
-    "Tell us your go-to karaoke song.",
-    "Post a picture of your shoes.",
-    "Show us your best thinking pose",
-    "What's one thing you can't live without?",
-    "Type out your Discord ID backwards",
-    "Share the last Discord sticker you used.",
-    "Change your server profile picture to a random server emoji for 5 minutes.",
-    "Do your best impression of a Discord notification sound.",
-    "Send a message composed entirely of Discord bot command names.",
-    "Share a screenshot of your current Discord activity status.",
-    "Tell us a funny story about something that happened in a Discord call.",
-    "What's one Discord Nitro feature you can't live without?",
-    "Give a shoutout to a specific Discord server.",
-    "Make a funny face during a Discord video call (if applicable).",
-    "Write a 1-sentence synopsis of your favorite Discord bot's purpose.",
-    "Ping the bot's developer in a public channel and tell them a random fact.",
-    "Change your Discord bio to \"Powered by Lonelyy!\" for 30 minutes.", # Fixed string literal
-    "Send a message that only contains Discord emoji reactions.",
-    "List all the bots in the server in reverse alphabetical order.",
-    "Say \"Latency is love, latency is life\" five times fast in a voice chat.", # Fixed string literal
-    "Post a picture of your favorite Discord emote that isn't from this server.",
-    "Share the first message you ever sent in this server.",
-    "Send a screenshot of your Discord friend list (blurring names).",
-    "Give a random user in the server a ping role (if you have permission).",
-    "Invent a new Discord game mode for voice channels.",
-    "Try to draw the Discord logo using only text characters.",
-    "Describe what you'd do if Discord went down for 24 hours.",
-    "Post a little-known Discord trick or tip.",
-    "Write a mini-story (3 sentences) about a lost message in a Discord channel.",
-    "Reveal your least favorite Discord server you've been in.",
-    "Change your server nickname to a common Discord error message for 5 minutes.",
-    "Send a message using only Discord system messages (e.g., \"User joined the call\").",
-    "Tell us your favorite Discord custom status.",
-    "Act out the \"connecting to voice\" sound in voice chat.", # Fixed string literal and made more specific
-    "Describe your biggest Discord pet peeve in three words.",
-    "Tell us your least favorite Discord feature.",
-    "Post a picture of your longest active Discord thread.",
-    "Recommend a Discord server you genuinely love.",
-    "Invent a new Discord permission and describe its use.",
-    "Try to say \"Slash commands are super swift\" with a mouthful of marshmallows (if you have them).", # Fixed string literal
-    "Write a review for an imaginary Discord bot feature.",
-    "Explain the difference between a guild and a server in Discord in 10 words or less.",
-    "Show us your best typing... impression.",
-    "Pretend to be a Discord moderator for your next 5 messages.",
-    "Send a picture of your favorite Discord font.",
-    "Tell us your dream Discord app command idea.",
-    "Write a short poem about Discord DMs.",
-    "What's the last Discord emoji you used? Tell us!",
-    "Do your best impression of a Discord user leaving a voice channel.",
-    "Describe your ideal Discord bot.",
-    "What's your favorite Discord Easter egg?",
-    "Send a message composed entirely of Discord invite links (to safe servers!).",
-    "Share a screenshot of your oldest Discord message in a server.",
-    "Tell us a funny story about a Discord bot going rogue.",
-    "What's one Discord developer feature you can't live without?",
-    "Give a shoutout to a specific Discord role.",
-    "Make a funny sound in a Discord voice call (if applicable).",
-    "Write a 1-sentence synopsis of why you love Discord.",
-]
-
-NEVER_HAVE_I_EVER = [
-    "Never have I ever dyed my hair a crazy color.",
-    "Never have I ever fallen asleep in a public place.",
-    "Never have I ever accidentally sent a text to the wrong person.",
-    "Never have I ever faked being sick to get out of something.",
-    "Never have I ever cheated on a test.",
-    "Never have I ever accidentally shared a highly embarrassing screenshot in a public Discord channel.",
-    "Never have I ever ghosted someone in real life because I was too invested in a Discord roleplay.",
-    "Never have I ever pretended to be someone else entirely during a Discord voice chat.",
-    "Never have I ever gone on a date with someone I only knew from Discord, and it was nothing like I expected.",
-    "Never have I ever been caught discussing something highly inappropriate in a Discord DM by someone looking over my shoulder.",
-    "Never have I ever used a voice changer in Discord to prank someone and taken it too far.",
-    "Never have I ever been secretly attracted to a Discord moderator or admin.",
-    "Never have I ever joined a \"not safe for work\" Discord server just out of pure curiosity.", # Fixed string literal
-    "Never have I ever stayed up all night on Discord and then had to pretend I got sleep in real life.",
-    "Never have I ever sent a risky photo or video to someone I only knew from Discord.",
-    "Never have I ever created a fake Discord account to snoop on someone.",
-    "Never have I ever been involved in or witnessed serious drama unfold in a Discord voice channel.",
-    "Never have I ever regretted a Discord username or profile picture so much that I considered quitting.",
-    "Never have I ever had a dream about my Discord friends or a specific server.",
-]
-
-# --- Check if user is bot-banned ---
-async def is_bot_banned(interaction: discord.Interaction):
-    """
-    Checks if a user is banned from using bot commands.
-    Sends an ephemeral message if banned.
-    """
-    if interaction.user.id in bot_banned_users:
-        await interaction.response.send_message("You are banned from using bot commands.", ephemeral=True)
-        return True
-    return False
+# Truth/dare/never-have-I-ever prompts live in prompt pack files (see extensions/games.py)
 
-# --- Event: Bot is Ready ---
-@bot.event
-async def on_ready():
+def shared(name, factory):
     """
-    This event fires when the bot has successfully connected to Discord.
-    It's a good place to synchronize slash commands.
+    Returns bot.shared_state[name], creating it with factory() the first time.
+    Extensions keep their caches, queues and stores here: reloading an extension swaps in its new
+    command code but keeps these objects and their data. Changes to their classes need a restart.
     """
-    print(f'Logged in as {bot.user.name} ({bot.user.id})')
-    print('------')
-    try:
-        # Sync slash commands with Discord.
-        # This can take a few seconds and might not be instant.
-        synced = await bot.tree.sync()
-        print(f"Synced {len(synced)} command(s).")
-    except Exception as e:
-        print(f"Failed to sync commands: {e}")
+    value = bot.shared_state.get(name)
+    if value is None:
+        value = bot.shared_state[name] = factory()
+    return value
 
-# --- Slash Command: /confession ---
-@bot.tree.command(name="confession", description="Submit an anonymous confession.")
-@app_commands.describe(
-    text="The confession you want to submit anonymously."
-)
-async def confession(interaction: discord.Interaction, text: str):
+# --- Shared Helpers ---
+def open_sqlite(path):
     """
-    Handles the '/confession' slash command.
-    Submits an anonymous confession to a predefined channel.
+    Opens (and creates if needed) a SQLite database in WAL mode.
+    The connection may be used from worker threads; callers serialize access with their own lock.
     """
-    if await is_bot_banned(interaction): return
-    
-    await interaction.response.send_message(
-        "Your confession has been sent!",
-        ephemeral=True
-    )
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
 
-    confessions_channel = bot.get_channel(CONFESSIONS_CHANNEL_ID)
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one in-flight task.
+    Every caller awaiting the same key gets the same result (or exception).
+    """
+    def __init__(self):
+        self._inflight = {}
+
+    async def do(self, key, func):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            def _forget(done_task, key=key):
+                if self._inflight.get(key) is done_task:
+                    del self._inflight[key]
+            task.add_done_callback(_forget)
+        # shield() so one caller timing out doesn't cancel the fetch for everyone else
+        return await asyncio.shield(task)
+
+async def send_response(interaction, content=None, **kwargs):
+    """Sends the initial response, or a followup if the interaction was already deferred/answered."""
+    if interaction.response.is_done():
+        return await interaction.followup.send(content, **kwargs)
+    return await interaction.response.send_message(content, **kwargs)
+
+MISSING = object() # Sentinel for "not cached", since None can be a cached value
+
+class TTLCache:
+    """
+    Dict-backed cache whose entries expire after `ttl` seconds.
+    Once `max_entries` is exceeded, the least recently written entries are dropped.
+    """
+    def __init__(self, ttl, max_entries=10000, name=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.name = name # Label for the bot_cache_requests_total metric
+        self._data = OrderedDict() # key -> (expires_at, value)
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None:
+            metrics.cache_result(self.name, False)
+            return default
+        if item[0] < time.monotonic():
+            del self._data[key]
+            metrics.cache_result(self.name, False)
+            return default
+        metrics.cache_result(self.name, True)
+        return item[1]
+
+    def set(self, key, value, ttl=None):
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def pop(self, key):
+        self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+def normalize_search_text(text):
+    """Case-folds, strips punctuation and collapses whitespace, so lookups ignore formatting."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+def autocomplete_choices(values):
+    """Wraps suggestions as app command choices (Discord caps names and values at 100 characters)."""
+    return [app_commands.Choice(name=value[:100], value=value) for value in values if len(value) <= 100]
+
+class PrefixIndex:
+    """
+    Sorted parallel lists of (search key, display value) for prefix lookups with bisect.
+    A lookup is O(log n + results). Keys are unique; the first display value added for a key wins.
+    When `max_entries` is set, the oldest entries are dropped once it's exceeded.
+    """
+    def __init__(self, items=(), max_entries=None):
+        self.max_entries = max_entries
+        pairs = {}
+        for key, value in items:
+            pairs.setdefault(key, value)
+        self._keys = sorted(pairs)
+        self._values = [pairs[key] for key in self._keys]
+        self._order = deque(pairs) if max_entries else None # Insertion order, for eviction
+
+    def add(self, key, value):
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return
+        self._keys.insert(i, key)
+        self._values.insert(i, value)
+        if self._order is not None:
+            self._order.append(key)
+            while len(self._keys) > self.max_entries:
+                self.discard(self._order.popleft())
+
+    def discard(self, key):
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+            del self._values[i]
+
+    def search(self, prefix, limit=25):
+        """Display values whose key starts with `prefix`, in key order."""
+        i = bisect.bisect_left(self._keys, prefix)
+        results = []
+        while i < len(self._keys) and len(results) < limit and self._keys[i].startswith(prefix):
+            results.append(self._values[i])
+            i += 1
+        return results
+
+    def __len__(self):
+        return len(self._keys)
+
+MASK64 = 0xFFFFFFFFFFFFFFFF # Keeps 64-bit hash arithmetic on Python ints from growing
+
+def splitmix64(x):
+    """SplitMix64 finalizer: a fast, well-mixed 64-bit hash of a 64-bit integer."""
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+def format_age(seconds):
+    """Formats an age in seconds as a short string, e.g. '45s' or '3m 12s'."""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes}m"
+
+# --- Metrics ---
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+class Metrics:
+    """
+    In-process counters and histograms, rendered in the Prometheus text exposition format.
+    Each series is keyed by metric name plus a tuple of label values. Recording is a dict
+    lookup and an add, cheap enough for every command and every outbound HTTP request.
+    """
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self):
+        self._meta = {}       # name -> (type, help text, label names, buckets)
+        self._series = {}     # name -> {label values: float, or [bucket counts..., sum, count] for histograms}
+        self._gauges = {}     # name -> callable returning a number, or {label values: number}
+
+    def counter(self, name, help_text, labels=()):
+        self._meta[name] = ("counter", help_text, labels, None)
+        self._series[name] = {}
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self._meta[name] = ("histogram", help_text, labels, buckets)
+        self._series[name] = {}
+
+    def gauge(self, name, help_text, func, labels=()):
+        """Registers a gauge whose value is read from `func` at scrape time."""
+        self._meta[name] = ("gauge", help_text, labels, None)
+        self._gauges[name] = func
+
+    def remove(self, name):
+        """Unregisters a metric, e.g. a gauge whose source went away with an unloaded extension."""
+        self._meta.pop(name, None)
+        self._gauges.pop(name, None)
+        self._series.pop(name, None)
+
+    def inc(self, name, *labels, value=1):
+        series = self._series[name]
+        series[labels] = series.get(labels, 0) + value
+
+    def observe(self, name, value, *labels):
+        buckets = self._meta[name][3]
+        series = self._series[name]
+        counts = series.get(labels)
+        if counts is None:
+            counts = series[labels] = [0] * (len(buckets) + 3) # One per bucket, +Inf, sum, count
+        counts[bisect.bisect_left(buckets, value)] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+    def cache_result(self, cache, hit):
+        if cache is not None:
+            self.inc("bot_cache_requests_total", cache, "hit" if hit else "miss")
+
+    def render(self):
+        lines = []
+        for name, (kind, help_text, label_names, buckets) in self._meta.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "gauge":
+                try:
+                    value = self._gauges[name]()
+                except Exception as e:
+                    print(f"Metrics gauge {name} failed: {e}")
+                    continue
+                series = value if isinstance(value, dict) else {(): value}
+            else:
+                series = self._series[name]
+
+            for labels, value in list(series.items()):
+                pairs = [f'{label}="{_escape_label(v)}"' for label, v in zip(label_names, labels)]
+                if kind != "histogram":
+                    lines.append(f"{name}{{{','.join(pairs)}}} {value}" if pairs else f"{name} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + ("+Inf",), value):
+                    cumulative += count
+                    le = ",".join(pairs + [f'le="{bound}"'])
+                    lines.append(f"{name}_bucket{{{le}}} {cumulative}")
+                suffix = f"{{{','.join(pairs)}}}" if pairs else ""
+                lines.append(f"{name}_sum{suffix} {value[-2]}")
+                lines.append(f"{name}_count{suffix} {value[-1]}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+metrics.histogram("bot_command_ack_seconds", "Time from dispatch to the first response (message, defer or modal).", ("command",))
+metrics.histogram("bot_command_followup_seconds", "Time from dispatch to the first followup message.", ("command",))
+metrics.histogram("bot_command_duration_seconds", "Total time spent running a command.", ("command", "status"))
+metrics.histogram("bot_upstream_request_seconds", "Outbound HTTP latency until response headers arrive.", ("host", "status"))
+metrics.counter("bot_upstream_request_bytes_total", "Outbound HTTP request body bytes sent.", ("host",))
+metrics.counter("bot_upstream_response_bytes_total", "Outbound HTTP response body bytes received.", ("host",))
+metrics.counter("bot_cache_requests_total", "Cache lookups by cache and result.", ("cache", "result"))
+
+class ResponseTimer:
+    """
+    Records time-to-ack and time to the first followup per command. discord.py sends both through
+    its own HTTP client, whose requests build_discord_trace_config reports here: interaction callbacks
+    (POST /interactions/<id>/<token>/callback) and followups (POST /webhooks/<application id>/<token>).
+    Followups can be sent after the command returns (e.g. by image workers), so an interaction is
+    tracked until both are seen or its token expires.
+    """
+    TOKEN_TTL = 15 * 60 # Interaction tokens are valid for 15 minutes
+
+    def __init__(self):
+        self._pending = TTLCache(self.TOKEN_TTL, max_entries=10000) # token -> [command, started, metrics not yet recorded]
+
+    def start(self, interaction, command_name, started):
+        self._pending.set(interaction.token, [command_name, started, {"bot_command_ack_seconds", "bot_command_followup_seconds"}])
+
+    def record(self, token, metric):
+        entry = self._pending.get(token)
+        if entry is None or metric not in entry[2]:
+            return
+        command_name, started, remaining = entry
+        metrics.observe(metric, time.perf_counter() - started, command_name)
+        remaining.discard(metric)
+        if not remaining:
+            self._pending.pop(token)
+
+response_timer = ResponseTimer()
+
+def instrument_interaction(interaction, command_name):
+    """Stamps the start time used for the duration histogram and starts timing the interaction's responses."""
+    started = time.perf_counter()
+    interaction.extras["metrics_command"] = command_name
+    interaction.extras["metrics_started"] = started
+    response_timer.start(interaction, command_name, started)
+
+def record_command_finished(interaction, status):
+    started = interaction.extras.pop("metrics_started", None)
+    if started is not None:
+        metrics.observe("bot_command_duration_seconds", time.perf_counter() - started, interaction.extras["metrics_command"], status)
+
+def build_http_trace_config():
+    """aiohttp TraceConfig that records latency, status and body bytes per upstream host."""
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, ctx, params):
+        ctx.started = time.perf_counter()
+        ctx.host = params.url.host
+
+    async def on_request_end(session, ctx, params):
+        metrics.observe("bot_upstream_request_seconds", time.perf_counter() - ctx.started, ctx.host, params.response.status)
+
+    async def on_request_exception(session, ctx, params):
+        metrics.observe("bot_upstream_request_seconds", time.perf_counter() - ctx.started, ctx.host, type(params.exception).__name__)
+
+    async def on_request_chunk_sent(session, ctx, params):
+        metrics.inc("bot_upstream_request_bytes_total", ctx.host, value=len(params.chunk))
+
+    async def on_response_chunk_received(session, ctx, params):
+        metrics.inc("bot_upstream_response_bytes_total", ctx.host, value=len(params.chunk))
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    trace_config.on_request_chunk_sent.append(on_request_chunk_sent)
+    trace_config.on_response_chunk_received.append(on_response_chunk_received)
+    return trace_config
+
+async def start_metrics_server(host, port):
+    """Serves metrics.render() at /metrics. Returns the runner so it can be cleaned up on shutdown."""
+    from aiohttp import web # The server side of aiohttp is only needed when metrics are enabled
+
+    async def handle_metrics(request):
+        return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8", headers={"X-Prometheus-Format": "0.0.4"})
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"Serving metrics on http://{host}:{port}/metrics")
+    return runner
+
+# --- Upstream Resilience ---
+# The interaction being handled in this task, set by BanGateTree; lets upstream rate limiting
+# attribute requests to a user and guild without threading the interaction through every call.
+current_interaction = contextvars.ContextVar("current_interaction", default=None)
+
+def background_task(coro):
+    """
+    Starts a task in a fresh context instead of a copy of the caller's. Pollers, workers and batch
+    flushes started while handling an interaction (or a /debug reload) would otherwise charge all
+    of their upstream requests to that one user for as long as they run.
+    """
+    return asyncio.create_task(coro, context=contextvars.Context())
+
+class UpstreamBusy(aiohttp.ClientConnectionError):
+    """Raised when an upstream's rate limit queue is so long the request would outlive its interaction."""
+    def __init__(self, upstream, wait):
+        super().__init__(f"{upstream.label} is too busy right now (estimated wait {format_age(wait)})")
+        self.upstream = upstream
+        self.wait = wait
+
+def parse_rate_limit(text):
+    """Parses '<requests>/<seconds>[:<burst>]' into (requests per second, burst), or None if empty."""
+    if not text.strip():
+        return None
+    rate, _, burst = text.partition(":")
+    count, _, period = rate.partition("/")
+    return float(count) / float(period or 1), max(1.0, float(burst or 1))
+
+class FairTokenBucket:
+    """
+    Token bucket that queues requests instead of failing them once it's empty. Waiters are kept in
+    one FIFO per user, grouped per guild, and tokens are handed out round-robin: first across guilds,
+    then across users within the chosen guild. One heavy user therefore only delays their own requests.
+    While tokens are available and nobody is queued, acquiring is a refill and a subtraction.
+    """
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.waiting = 0
+        self._updated = time.monotonic()
+        self._queues = OrderedDict() # guild_id -> OrderedDict(user_id -> deque of Futures)
+        self._timer = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        """Takes a token if one is free and nobody is queued ahead. Never waits."""
+        self._refill()
+        if self.tokens >= 1 and not self.waiting:
+            self.tokens -= 1
+            return True
+        return False
+
+    def estimate_wait(self, guild_id, user_id, position):
+        """
+        Seconds until the `position`-th queued request of this user (1-based) gets a token,
+        assuming nobody else joins the queue.
+        """
+        users = self._queues.get(guild_id, {})
+        # Requests from this guild served before ours: up to `position` from each user, one round at a time
+        guild_rank = sum(min(len(queue), position) for other, queue in users.items() if other != user_id) + position
+        ahead = guild_rank - 1
+        for other_guild, other_users in self._queues.items():
+            if other_guild != guild_id:
+                ahead += min(sum(len(queue) for queue in other_users.values()), guild_rank)
+        return max(0.0, (ahead + 1 - self.tokens) / self.rate)
+
+    async def acquire(self, guild_id, user_id, max_wait=None, on_queued=None):
+        """
+        Waits for a token. Returns the estimated wait (0 if none). Raises asyncio.TimeoutError without
+        queueing if the estimate exceeds `max_wait`; awaits `on_queued(estimate)` once queued.
+        """
+        if self.try_acquire():
+            return 0.0
+        users = self._queues.setdefault(guild_id, OrderedDict())
+        queue = users.setdefault(user_id, deque())
+        estimate = self.estimate_wait(guild_id, user_id, len(queue) + 1)
+        if max_wait is not None and estimate > max_wait:
+            if not queue:
+                del users[user_id]
+                if not users:
+                    del self._queues[guild_id]
+            raise asyncio.TimeoutError(estimate)
+
+        future = asyncio.get_running_loop().create_future()
+        queue.append(future)
+        self.waiting += 1
+        self._schedule()
+        try:
+            if on_queued is not None:
+                await on_queued(estimate)
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.tokens = min(self.burst, self.tokens + 1) # Handed a token we won't use
+            else:
+                future.cancel()
+                self._discard(guild_id, user_id, future)
+            raise
+        return estimate
+
+    def _discard(self, guild_id, user_id, future):
+        users = self._queues.get(guild_id)
+        queue = users.get(user_id) if users else None
+        if queue is None or future not in queue:
+            return
+        queue.remove(future)
+        self.waiting -= 1
+        if not queue:
+            del users[user_id]
+            if not users:
+                del self._queues[guild_id]
+
+    def _schedule(self):
+        if self._timer is None and self.waiting:
+            delay = max(0.0, (1 - self.tokens) / self.rate)
+            self._timer = asyncio.get_running_loop().call_later(delay, self._release)
+
+    def _release(self):
+        self._timer = None
+        self._refill()
+        while self.tokens >= 1 and self.waiting:
+            guild_id, users = next(iter(self._queues.items()))
+            self._queues.move_to_end(guild_id)
+            user_id, queue = next(iter(users.items()))
+            users.move_to_end(user_id)
+            future = queue.popleft()
+            self.waiting -= 1
+            if not queue:
+                del users[user_id]
+                if not users:
+                    del self._queues[guild_id]
+            if not future.done():
+                future.set_result(None)
+                self.tokens -= 1
+        self._schedule()
+
+class UpstreamUnavailable(aiohttp.ClientConnectionError):
+    """Raised without sending a request while an upstream's circuit breaker is open."""
+    def __init__(self, upstream):
+        super().__init__(f"{upstream.name} is unavailable (circuit breaker open, retry in {upstream.retry_in():.0f}s)")
+        self.upstream = upstream
+
+class Upstream:
+    """
+    One external API: a latency budget shared by all attempts of a request, bounded retries with
+    full jitter for GETs, and a circuit breaker. The breaker opens after `failure_threshold`
+    consecutive failures (timeouts, connection errors, 5xx), rejects requests for `reset_timeout`
+    seconds, then lets a single trial request through; its outcome closes or re-opens the breaker.
+    4xx answers count as healthy.
+    With a `rate_limit`, requests first wait their turn in a FairTokenBucket; queue time doesn't
+    count against the latency budget.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, name, label, timeout, rate_limit="", retries=UPSTREAM_RETRIES,
+                 failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.label = label # Shown to users, e.g. in queue notices
+        self.timeout = timeout
+        limit = parse_rate_limit(rate_limit)
+        self.limiter = FairTokenBucket(*limit) if limit else None
+        self.retries = retries
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0          # Consecutive failures
+        self.opened_at = 0.0       # time.monotonic() when the breaker last opened
+        self.last_error = None     # Description of the most recent failure
+        self.trips = 0             # Times the breaker has opened
+        self.rejected = 0          # Requests failed fast while open
+        self._trial_in_flight = False
+        upstreams[name] = self
+
+    def retry_in(self):
+        """Seconds until an open breaker lets a trial request through."""
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def _admit(self):
+        """Raises UpstreamUnavailable unless a request may be sent now. Returns True for a trial request."""
+        if self.state == self.CLOSED:
+            return False
+        if self.state == self.OPEN and self.retry_in() > 0:
+            self.rejected += 1
+            raise UpstreamUnavailable(self)
+        if self._trial_in_flight:
+            self.rejected += 1
+            raise UpstreamUnavailable(self)
+        self.state = self.HALF_OPEN
+        self._trial_in_flight = True
+        return True
 
-    if confessions_channel:
-        embed = discord.Embed(
-            title="Anonymous Confession",
-            description=f"\"**{text}**\"",
-            color=discord.Color.dark_red()
-        )
-        embed.set_footer(text="Confession submitted anonymously.")
-        embed.timestamp = interaction.created_at
+    def _record_success(self):
+        if self.state != self.CLOSED:
+            print(f"Upstream {self.name} recovered; circuit breaker closed.")
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def _record_failure(self, error):
+        self.failures += 1
+        self.last_error = error
+        if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.trips += 1
+            print(f"Upstream {self.name} failing ({error}); circuit breaker open for {self.reset_timeout:.0f}s.")
+
+    async def _wait_for_token(self):
+        """Takes a rate limit token, queueing fairly behind other users' requests if there is none."""
+        if self.limiter is None or self.limiter.try_acquire():
+            return
+        interaction = current_interaction.get()
+        guild_id = interaction.guild_id if interaction else None
+        user_id = interaction.user.id if interaction else None # None = the bot's own background work
+
+        async def notify(estimate):
+            if interaction is None or estimate < UPSTREAM_NOTIFY_WAIT or not interaction.response.is_done():
+                return
+            try:
+                await interaction.followup.send(
+                    f"⏳ {self.label} is busy right now. Your request is queued; expected wait about {format_age(estimate)}.",
+                    ephemeral=True
+                )
+            except discord.HTTPException:
+                pass
+
+        try:
+            await self.limiter.acquire(guild_id, user_id, max_wait=UPSTREAM_QUEUE_MAX_WAIT, on_queued=notify)
+        except asyncio.TimeoutError as e:
+            raise UpstreamBusy(self, e.args[0]) from None
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    @contextlib.asynccontextmanager
+    async def request(self, method, url, **kwargs):
+        """
+        Drop-in for `bot.http_session.request(...)` used as `async with`. Yields the response;
+        raises UpstreamUnavailable, aiohttp.ServerTimeoutError or another aiohttp error like the session would.
+        """
+        if self.state == self.OPEN and self.retry_in() > 0: # Fail fast instead of queueing for quota
+            self.rejected += 1
+            raise UpstreamUnavailable(self)
+        await self._wait_for_token()
+        trial = self._admit()
+        attempts = 1 if trial or method != "GET" else 1 + self.retries
+        deadline = time.monotonic() + self.timeout
+        try:
+            for attempt in range(attempts):
+                remaining = deadline - time.monotonic()
+                try:
+                    response = await bot.http_session.request(
+                        method, url, timeout=aiohttp.ClientTimeout(total=remaining, connect=min(remaining, HTTP_CONNECT_TIMEOUT)), **kwargs
+                    )
+                except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as e:
+                    error, response = e, None
+                else:
+                    if response.status not in self.RETRY_STATUSES:
+                        break
+
+                delay = random.uniform(0, UPSTREAM_RETRY_BACKOFF * 2 ** attempt)
+                if attempt + 1 == attempts or time.monotonic() + delay >= deadline:
+                    break
+                if self.limiter is not None and not self.limiter.try_acquire():
+                    break # No quota to spare for a retry; keep the last answer
+                if response is not None:
+                    response.release()
+                await asyncio.sleep(delay)
+
+            if response is None:
+                self._record_failure(f"{type(error).__name__}: {error}".rstrip(": "))
+                if isinstance(error, aiohttp.ClientError):
+                    raise error
+                # A bare timeout from the budget; surface it as a ClientError like connection timeouts
+                raise aiohttp.ServerTimeoutError(f"{self.name} did not answer within {self.timeout:g}s") from error
+            if response.status >= 500:
+                self._record_failure(f"HTTP {response.status}")
+            else:
+                self._record_success() # 429 is the API throttling us, not failing
+
+            try:
+                yield response
+            except (asyncio.TimeoutError, aiohttp.ClientPayloadError, aiohttp.ServerDisconnectedError) as e:
+                self._record_failure(f"{type(e).__name__} while reading the body")
+                raise
+            finally:
+                response.release()
+        finally:
+            if trial:
+                self._trial_in_flight = False
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "retry_in": self.retry_in() if self.state == self.OPEN else 0.0,
+            "last_error": self.last_error,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "queued": self.limiter.waiting if self.limiter else 0,
+        }
 
-        await confessions_channel.send(embed=embed)
-        print(f"Confession sent to channel {confessions_channel.name} by {interaction.user.name}")
-    else:
-        print(f"Error: Confessions channel with ID {CONFESSIONS_CHANNEL_ID} not found or accessible.")
-        await interaction.followup.send(
-            "An error occurred while sending your confession. The confessions channel might be misconfigured.",
-            ephemeral=True
-        )
+upstreams = {} # name -> Upstream, filled in by Upstream.__init__
+gag_stock_upstream = Upstream("gag_stock", "The Grow A Garden API", GAG_STOCK_TIMEOUT, GAG_STOCK_RATE_LIMIT)
+lyrics_upstream = Upstream("lyrics", "Lyrics.ovh", LYRICS_TIMEOUT, LYRICS_RATE_LIMIT)
+currency_upstream = Upstream("currency", "ExchangeRate-API", CURRENCY_TIMEOUT, CURRENCY_RATE_LIMIT)
+roblox_upstream = Upstream("roblox", "The Roblox API", ROBLOX_TIMEOUT, ROBLOX_RATE_LIMIT)
+fortnite_upstream = Upstream("fortnite", "Fortnite-API.com", FORTNITE_TIMEOUT, FORTNITE_RATE_LIMIT)
+image_gen_upstream = Upstream("image_gen", "The image generator", IMAGE_GEN_TIMEOUT, IMAGE_GEN_RATE_LIMIT, retries=0)
 
-# --- Slash Command: /gag-stock ---
-@bot.tree.command(name="gag-stock", description="Get the current stock levels for various gags.")
-@app_commands.checks.cooldown(1, 10, key=lambda i: i.user.id)
-async def gag_stock(interaction: discord.Interaction):
+# --- Ban Index ---
+class IdSet:
     """
-    Fetches and displays current stock levels from the Grow A Garden API.
+    Compact set of Discord IDs (64-bit snowflakes): an open-addressing hash table with linear
+    probing over a single array('Q'). Costs 12-24 bytes per ID instead of the ~70-100 bytes of a
+    Python set of ints, with O(1) lookups. 0 marks an empty slot, since no snowflake is 0.
     """
-    if await is_bot_banned(interaction): return
-    
-    try:
-        await interaction.response.defer(ephemeral=True)
-    except discord.errors.NotFound:
-        print("Failed to defer interaction for /gag-stock. It might have expired or been responded to already.")
-        return
+    __slots__ = ("_slots", "_mask", "_count")
+
+    def __init__(self, ids=()):
+        self._slots = array('Q', bytes(8 * 8))
+        self._mask = 7
+        self._count = 0
+        for value in ids:
+            self.add(value)
+
+    @staticmethod
+    def _hash(value):
+        # Fibonacci hashing; snowflakes' low bits are mostly a sequence counter, so mix them first
+        return ((value * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> 20
+
+    def _find(self, value):
+        """Returns the slot index holding value, or of the empty slot where it would go."""
+        slots, mask = self._slots, self._mask
+        i = self._hash(value) & mask
+        while True:
+            current = slots[i]
+            if current == value or current == 0:
+                return i
+            i = (i + 1) & mask
+
+    def __contains__(self, value):
+        return self._slots[self._find(value)] == value
+
+    def add(self, value):
+        i = self._find(value)
+        if self._slots[i] == value:
+            return
+        self._slots[i] = value
+        self._count += 1
+        if self._count * 3 > len(self._slots) * 2: # Keep the load factor under 2/3
+            self._resize(len(self._slots) * 2)
+
+    def discard(self, value):
+        slots, mask = self._slots, self._mask
+        i = self._find(value)
+        if slots[i] != value:
+            return
+        # Backward-shift deletion: pull later entries of the probe run into the hole
+        j = i
+        while True:
+            j = (j + 1) & mask
+            current = slots[j]
+            if current == 0:
+                break
+            home = self._hash(current) & mask
+            if (i < home <= j) if i <= j else (home > i or home <= j):
+                continue # Still reachable from its home slot
+            slots[i] = current
+            i = j
+        slots[i] = 0
+        self._count -= 1
+
+    def _resize(self, capacity):
+        old = self._slots
+        self._slots = array('Q', bytes(8 * capacity))
+        self._mask = capacity - 1
+        self._count = 0
+        for value in old:
+            if value:
+                self.add(value)
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return (value for value in self._slots if value)
+
+    @property
+    def nbytes(self):
+        return len(self._slots) * self._slots.itemsize
+
+class BanIndex:
+    """
+    Bot bans grouped by scope. A scope is (guild_id, command): guild_id 0 means every guild,
+    and command "" means every command. Each scope holds its banned user IDs in an IdSet,
+    so a check is at most four O(1) probes however many users are banned.
+    """
+    GLOBAL = 0
+    ALL_COMMANDS = ""
+
+    def __init__(self):
+        self._scopes = {} # (guild_id, command) -> IdSet
+
+    def add(self, guild_id, command, user_id):
+        scope = (guild_id or self.GLOBAL, command or self.ALL_COMMANDS)
+        ids = self._scopes.get(scope)
+        if ids is None:
+            ids = self._scopes[scope] = IdSet()
+        ids.add(user_id)
+
+    def discard(self, guild_id, command, user_id):
+        scope = (guild_id or self.GLOBAL, command or self.ALL_COMMANDS)
+        ids = self._scopes.get(scope)
+        if ids is not None:
+            ids.discard(user_id)
+            if not ids:
+                del self._scopes[scope]
+
+    def has(self, guild_id, command, user_id):
+        """True if this exact scope bans the user."""
+        ids = self._scopes.get((guild_id or self.GLOBAL, command or self.ALL_COMMANDS))
+        return ids is not None and user_id in ids
+
+    def match(self, guild_id, command, user_id):
+        """
+        Returns the kind of ban ("global", "guild" or "command") that blocks a user from
+        running `command` in `guild_id`, or None if they're allowed.
+        """
+        scopes = self._scopes
+        if not scopes:
+            return None
+        ids = scopes.get((self.GLOBAL, self.ALL_COMMANDS))
+        if ids is not None and user_id in ids:
+            return "global"
+        if guild_id:
+            ids = scopes.get((guild_id, self.ALL_COMMANDS))
+            if ids is not None and user_id in ids:
+                return "guild"
+            ids = scopes.get((guild_id, command))
+            if ids is not None and user_id in ids:
+                return "command"
+        ids = scopes.get((self.GLOBAL, command))
+        if ids is not None and user_id in ids:
+            return "command"
+        return None
+
+    def __len__(self):
+        return sum(len(ids) for ids in self._scopes.values())
+
+    @property
+    def nbytes(self):
+        return sum(ids.nbytes for ids in self._scopes.values())
+
+# --- Cooldowns ---
+def parse_cooldown(text):
+    """Parses '<uses>/<seconds>' into (uses, seconds), or 'off' into None (no cooldown). Raises ValueError."""
+    text = text.strip().lower()
+    if text in ("off", "none", "0"):
+        return None
+    uses, _, seconds = text.partition("/")
+    uses, seconds = int(uses), float(seconds)
+    if uses < 1 or seconds <= 0:
+        raise ValueError(f"invalid cooldown {text!r}")
+    return uses, seconds
+
+def format_cooldown(policy):
+    return "no cooldown" if policy is None else f"{policy[0]} use(s) per {policy[1]:g}s"
+
+def normalize_command_name(text):
+    """'/Confessionconfig   set' -> 'confessionconfig set'"""
+    return " ".join(text.strip().lstrip("/").lower().split())
+
+class CooldownTable:
+    """
+    This process's cache of GCRA cooldown buckets in one open-addressing hash table: a 64-bit key per
+    (command, user) in an array('Q') and the theoretical arrival time CooldownStore last returned for it
+    in a parallel array('d'), so a bucket costs 16 bytes per slot. Arrival times only move forward, so a
+    use the cache already refuses is refused without touching the disk. A bucket whose arrival time has
+    passed is full again and carries no state: its slot is reused by the next insert that probes past it
+    and dropped whenever the table is rebuilt, so the size tracks users active within their cooldown
+    window, not everyone who ever ran a command.
+    """
+    __slots__ = ("_keys", "_tats", "_mask", "_used")
+
+    def __init__(self, capacity=8):
+        self._keys = array('Q', bytes(8 * capacity))
+        self._tats = array('d', bytes(8 * capacity))
+        self._mask = capacity - 1
+        self._used = 0 # Slots holding a key, live or idle
+
+    def _find(self, key, now):
+        """Returns the slot holding key, else the slot to insert it in (the first idle slot on its probe run)."""
+        keys, tats, mask = self._keys, self._tats, self._mask
+        i = key & mask # Keys are already well mixed
+        reusable = -1
+        while True:
+            current = keys[i]
+            if current == key:
+                return i
+            if current == 0:
+                return i if reusable < 0 else reusable
+            if reusable < 0 and tats[i] <= now:
+                reusable = i
+            i = (i + 1) & mask
+
+    def retry_after(self, key, tolerance, now):
+        """Seconds until the cached bucket allows a use; 0.0 if it does or isn't cached."""
+        i = self._find(key, now)
+        if self._keys[i] != key:
+            return 0.0
+        return max(0.0, self._tats[i] - tolerance - now)
+
+    def remember(self, key, tat, now):
+        """Caches a bucket's arrival time as returned by CooldownStore.hit."""
+        i = self._find(key, now)
+        if self._keys[i] == 0:
+            self._used += 1
+        self._keys[i] = key
+        self._tats[i] = tat
+        if self._used * 3 > len(self._keys) * 2: # Keep the load factor under 2/3
+            self._rebuild(now)
+
+    def _rebuild(self, now):
+        """Rehashes the live buckets into a table sized for them, shrinking it after bursts."""
+        live = [(key, tat) for key, tat in zip(self._keys, self._tats) if key and tat > now]
+        capacity = 8
+        while capacity < len(live) * 3:
+            capacity *= 2
+        self._keys = array('Q', bytes(8 * capacity))
+        self._tats = array('d', bytes(8 * capacity))
+        self._mask = capacity - 1
+        self._used = 0
+        for key, tat in live:
+            i = self._find(key, now)
+            self._keys[i] = key
+            self._tats[i] = tat
+            self._used += 1
+
+    def __len__(self):
+        """Buckets still cooling down."""
+        now = time.time()
+        return sum(1 for key, tat in zip(self._keys, self._tats) if key and tat > now)
+
+    @property
+    def nbytes(self):
+        return len(self._keys) * 16
+
+class CooldownStore:
+    """
+    GCRA theoretical arrival times shared by every process using DATA_DIR, so a user's cooldown holds
+    across clusters. A use is one upsert that only advances a bucket that has room, so concurrent uses
+    from different processes can't both get the last one. Buckets use wall-clock time, since monotonic
+    clocks aren't comparable between processes, and live in their own database file so cooldown
+    traffic doesn't make other clusters reload bans and routes (see BotStorage.watch).
+    """
+    PRUNE_INTERVAL = 300 # Seconds between deletions of buckets that are full again
+
+    def __init__(self, path):
+        self.path = path
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._next_prune = 0.0
+
+    def open(self):
+        self._db = open_sqlite(self.path)
+        with self._db_lock, self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS cooldown_buckets (key INTEGER PRIMARY KEY, tat REAL NOT NULL) WITHOUT ROWID")
+
+    def close(self):
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+    def hit(self, key, interval, tolerance, now):
+        """
+        Records one use if the bucket allows it. `interval` is seconds per use and `tolerance` how far ahead
+        of schedule a burst may run. Returns (retry_after, tat): the seconds until a use is allowed (0.0 if
+        this one was) and the bucket's arrival time.
+        Blocks on disk I/O; call it from a worker thread.
+        """
+        with self._db_lock, self._db:
+            row = self._db.execute(
+                "INSERT INTO cooldown_buckets (key, tat) VALUES (:key, :now + :interval)"
+                " ON CONFLICT (key) DO UPDATE SET tat = max(tat, :now) + :interval WHERE max(tat, :now) - :now <= :tolerance"
+                " RETURNING tat",
+                {"key": key, "now": now, "interval": interval, "tolerance": tolerance}
+            ).fetchone()
+            if row is None:
+                tat = self._db.execute("SELECT tat FROM cooldown_buckets WHERE key = ?", (key,)).fetchone()[0]
+                return tat - tolerance - now, tat
+            if now >= self._next_prune:
+                self._next_prune = now + self.PRUNE_INTERVAL
+                self._db.execute("DELETE FROM cooldown_buckets WHERE tat <= ?", (now,))
+            return 0.0, row[0]
+
+class CooldownEngine:
+    """
+    Cooldowns for every command, checked by cooldown_check before a command runs. Buckets are per user
+    and command, GCRA in a CooldownStore shared by every cluster and cached in a CooldownTable. The policy is resolved on every use, so changes apply
+    immediately: the command's own policy beats "*", and at each of those a server's role override
+    (the most lenient of the member's roles) beats the server-wide override, which beats the bot-wide
+    policy. Bot-wide policies come from COMMAND_COOLDOWNS unless the owner saved one.
+    """
+    BOT_WIDE = 0   # guild_id of bot-wide policies
+    EVERYONE = 0   # role_id of policies that apply to every member
+    ALL_COMMANDS = "*"
+
+    def __init__(self, defaults, path):
+        self.defaults = defaults  # command -> (uses, seconds) or None, from COMMAND_COOLDOWNS
+        self.policies = {}        # guild_id -> {command: {role_id: (uses, seconds) or None}}
+        self.store = CooldownStore(path)
+        self.buckets = CooldownTable()
+        self.rejected = 0         # Uses refused since startup
+        self._salts = {}          # command -> 64-bit salt mixed into its bucket keys
+
+    @staticmethod
+    def parse_defaults(text):
+        """Parses COMMAND_COOLDOWNS. Malformed entries are reported and skipped."""
+        defaults = {}
+        for entry in text.split(","):
+            command, _, policy = entry.partition("=")
+            if not command.strip():
+                continue
+            try:
+                defaults[normalize_command_name(command)] = parse_cooldown(policy)
+            except ValueError:
+                print(f"Ignoring malformed COMMAND_COOLDOWNS entry: {entry.strip()!r}")
+        return defaults
+
+    def load(self):
+        self.store.open()
+        storage.executescript(
+            "CREATE TABLE IF NOT EXISTS cooldown_policies ("
+            "  guild_id INTEGER NOT NULL, command TEXT NOT NULL, role_id INTEGER NOT NULL DEFAULT 0,"
+            "  uses INTEGER NOT NULL, seconds REAL NOT NULL, PRIMARY KEY (guild_id, command, role_id));"
+        )
+        self._reload()
+        storage.on_external_change(self._reload)
+
+    def _reload(self):
+        policies = {}
+        for guild_id, command, role_id, uses, seconds in storage.fetchall(
+            "SELECT guild_id, command, role_id, uses, seconds FROM cooldown_policies"
+        ):
+            policies.setdefault(guild_id, {}).setdefault(command, {})[role_id] = (uses, seconds) if uses else None
+        self.policies = policies
+
+    def close(self):
+        self.store.close()
+
+    def set_policy(self, guild_id, command, role_id, policy):
+        """Saves an override; policy None means no cooldown."""
+        self.policies.setdefault(guild_id, {}).setdefault(command, {})[role_id] = policy
+        uses, seconds = policy or (0, 0)
+        return storage.write(
+            "INSERT OR REPLACE INTO cooldown_policies (guild_id, command, role_id, uses, seconds) VALUES (?, ?, ?, ?, ?)",
+            (guild_id, command, role_id, uses, seconds)
+        )
 
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(GAG_STOCK_API_URL) as response:
-                response.raise_for_status() # Raises an exception for HTTP errors (4xx or 5xx)
-                data = await response.json()
-
-        seeds_stock_data = data.get('seedsStock', [])
-        egg_items = data.get('eggStock', [])         
-        gear_items = data.get('gearStock', [])       
-        
-        print(f"Raw seedsStock from API: {seeds_stock_data}")
-
-        def format_stock_list(items_data):
-            """Helper to format stock items into a readable string."""
-            if not isinstance(items_data, list):
-                print(f"Warning: Expected a list for stock items, got {type(items_data)}")
-                return "Data format error" 
-            if not items_data:
-                return "None in stock"
-            
-            formatted_items = []
-            for item in items_data:
-                if isinstance(item, dict) and 'name' in item and 'value' in item:
-                    name = item['name']
-                    value = item['value']
-                    formatted_items.append(f"- {name} ({value})")
-                else:
-                    print(f"Skipping malformed item in stock list: {item}")
-            
-            if not formatted_items:
-                return "None in stock (or all items malformed)" 
-            
-            return "\n".join(formatted_items)
-
-        formatted_seeds_stock = format_stock_list(seeds_stock_data)
-        formatted_egg_stock = format_stock_list(egg_items)
-        formatted_gear_stock = format_stock_list(gear_items)
-
-        embed = discord.Embed(
-            title="Gag Stock Information",
-            color=discord.Color.dark_grey(),
-            timestamp=interaction.created_at
+    def remove_policy(self, guild_id, command, role_id):
+        by_role = self.policies.get(guild_id, {}).get(command)
+        if not by_role or role_id not in by_role:
+            return False
+        del by_role[role_id]
+        storage.write(
+            "DELETE FROM cooldown_policies WHERE guild_id = ? AND command = ? AND role_id = ?",
+            (guild_id, command, role_id)
         )
+        return True
 
-        embed.add_field(name="Seed Stock", value=formatted_seeds_stock, inline=True)
-        embed.add_field(name="Egg Stock", value=formatted_egg_stock, inline=True)
-        embed.add_field(name="Gear Stock", value=formatted_gear_stock, inline=True)
+    def policy_for(self, guild_id, command, member):
+        """Returns the (uses, seconds) that apply to this member, or None if the command has no cooldown."""
+        guild_policies = self.policies.get(guild_id) if guild_id else None
+        bot_policies = self.policies.get(self.BOT_WIDE)
+        for name in (command, self.ALL_COMMANDS):
+            if guild_policies:
+                by_role = guild_policies.get(name)
+                if by_role:
+                    matched = [
+                        policy for role_id, policy in by_role.items()
+                        if role_id != self.EVERYONE and isinstance(member, discord.Member) and member.get_role(role_id)
+                    ]
+                    if matched:
+                        # No cooldown beats any cooldown; otherwise the highest uses-per-second wins
+                        return None if None in matched else max(matched, key=lambda policy: policy[0] / policy[1])
+                    if self.EVERYONE in by_role:
+                        return by_role[self.EVERYONE]
+            if bot_policies and self.EVERYONE in bot_policies.get(name, {}):
+                return bot_policies[name][self.EVERYONE]
+            if name in self.defaults:
+                return self.defaults[name]
+        return None
+
+    def _key(self, command, user_id):
+        salt = self._salts.get(command)
+        if salt is None:
+            salt = self._salts[command] = int.from_bytes(hashlib.blake2b(command.encode(), digest_size=8).digest(), "little")
+        # 63 bits so the key is also a valid SQLite INTEGER; 0 marks an empty slot
+        return (splitmix64(user_id ^ salt) >> 1) or 1
+
+    async def check(self, interaction):
+        """Uses one of the caller's uses, or raises app_commands.CommandOnCooldown."""
+        command = interaction.command
+        if command is None:
+            return
+        name = command.qualified_name
+        policy = self.policy_for(interaction.guild_id, name, interaction.user)
+        if policy is None:
+            return
+        uses, seconds = policy
+        interval = seconds / uses
+        tolerance = seconds - interval
+        key = self._key(name, interaction.user.id)
+        now = time.time()
+        retry_after = self.buckets.retry_after(key, tolerance, now)
+        if not retry_after:
+            try:
+                retry_after, tat = await asyncio.to_thread(self.store.hit, key, interval, tolerance, now)
+            except sqlite3.Error as e:
+                print(f"Cooldown store unavailable, allowing /{name} without a cooldown: {e}")
+                return
+            self.buckets.remember(key, tat, now)
+        if retry_after:
+            self.rejected += 1
+            raise app_commands.CommandOnCooldown(app_commands.Cooldown(uses, seconds), retry_after)
+
+cooldowns = CooldownEngine(CooldownEngine.parse_defaults(COMMAND_COOLDOWNS), os.path.join(DATA_DIR, "cooldowns.sqlite3"))
+
+async def cooldown_check(interaction):
+    """
+    App command check that uses one of the caller's uses. BanGateTree adds it after a command's own
+    checks (has_permissions etc.), so a rejected invocation doesn't cost a use or hide the real error.
+    """
+    await cooldowns.check(interaction) # Raises CommandOnCooldown, handled by on_app_command_error
+    return True
 
-        await interaction.followup.send(embed=embed, ephemeral=True)
+class SnapshotStore:
+    """
+    The latest copy of each polled upstream snapshot (gag stock, currency rates), shared by every process
+    using DATA_DIR. Only cluster 0 polls the upstreams and saves here; the other clusters read its copy,
+    so upstream quota doesn't grow with CLUSTER_COUNT. Like CooldownStore it has its own database file,
+    so saves don't make other clusters reload bans and routes.
+    Blocks on disk I/O; call it from a worker thread.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._db = None
+        self._db_lock = threading.Lock()
+
+    @property
+    def is_leader(self):
+        """True in the one process that polls the upstreams."""
+        return CLUSTER_ID == 0
+
+    def open(self):
+        self._db = open_sqlite(self.path)
+        with self._db_lock, self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS snapshots (name TEXT PRIMARY KEY, data TEXT NOT NULL, fetched_at REAL NOT NULL)")
+
+    def close(self):
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+    def save(self, name, data, fetched_at):
+        """Stores a JSON-serializable snapshot fetched at `fetched_at` (wall-clock seconds)."""
+        with self._db_lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO snapshots (name, data, fetched_at) VALUES (?, ?, ?)",
+                (name, json.dumps(data), fetched_at)
+            )
+
+    def load(self, name):
+        """Returns (data, fetched_at) for the saved snapshot, or None if there is none yet."""
+        with self._db_lock:
+            row = self._db.execute("SELECT data, fetched_at FROM snapshots WHERE name = ?", (name,)).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+snapshots = SnapshotStore(os.path.join(DATA_DIR, "snapshots.sqlite3"))
+
+# --- Persistent Storage ---
+class BotStorage:
+    """
+    SQLite (WAL mode) storage for bot bans and social links, with in-memory read-through caches.
 
-    except aiohttp.ClientError as e:
-        print(f"API request failed: {e}\n{traceback.format_exc()}")
-        await interaction.followup.send(
-            "Failed to retrieve stock information. The API might be down or unreachable. Please try again later.",
-            ephemeral=True
+    - Bans are loaded once at startup into a BanIndex, so checking a ban never touches the disk.
+      They're scoped per guild and optionally per command (guild id 0 means every guild).
+    - Social links are loaded per user on first access and kept in a bounded LRU.
+    - Writes are queued and applied by a background writer that commits everything queued
+      so far in one transaction in a worker thread, so commands never block on disk I/O.
+    """
+    def __init__(self, path, socials_cache_size):
+        self.path = path
+        self.socials_cache_size = socials_cache_size
+        self.bans = BanIndex()
+        self._socials = OrderedDict()   # user_id -> {platform: link}, least recently used first
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._writes = asyncio.Queue()  # (sql, params, future)
+        self._writer_task = None
+        self._watch_task = None
+        self._change_listeners = []
+        self._write_count = 0
+
+    def open(self):
+        self._db = open_sqlite(self.path)
+        with self._db_lock, self._db:
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(bot_bans)")]
+            if columns and "command" not in columns:
+                # Bans used to be per guild only; widen the primary key to include the command
+                self._db.execute("ALTER TABLE bot_bans RENAME TO bot_bans_old")
+            self._db.executescript(
+                "CREATE TABLE IF NOT EXISTS bot_bans ("
+                "  guild_id INTEGER NOT NULL, user_id INTEGER NOT NULL, command TEXT NOT NULL DEFAULT '',"
+                "  reason TEXT, banned_by INTEGER, created_at REAL NOT NULL,"
+                "  PRIMARY KEY (guild_id, user_id, command));"
+                "CREATE TABLE IF NOT EXISTS social_links ("
+                "  user_id INTEGER NOT NULL, platform TEXT NOT NULL, link TEXT NOT NULL,"
+                "  updated_at REAL NOT NULL, PRIMARY KEY (user_id, platform));"
+            )
+            if columns and "command" not in columns:
+                self._db.executescript(
+                    "INSERT INTO bot_bans (guild_id, user_id, reason, banned_by, created_at)"
+                    "  SELECT guild_id, user_id, reason, banned_by, created_at FROM bot_bans_old;"
+                    "DROP TABLE bot_bans_old;"
+                )
+        self.bans = self._load_bans()
+        self._writer_task = background_task(self._write_forever())
+
+    def _load_bans(self):
+        bans = BanIndex()
+        with self._db_lock:
+            for guild_id, command, user_id in self._db.execute("SELECT guild_id, command, user_id FROM bot_bans"):
+                bans.add(guild_id, command, user_id)
+        return bans
+
+    # --- Multi-process consistency ---
+    def on_external_change(self, callback):
+        """Registers a callback run after another process (e.g. another cluster) commits to the database."""
+        if callback not in self._change_listeners: # Reloaded extensions register their callbacks again
+            self._change_listeners.append(callback)
+
+    def _data_version(self):
+        with self._db_lock:
+            return self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    def watch(self, interval):
+        """
+        Polls PRAGMA data_version, which only changes when another connection commits.
+        On a change, bans are reloaded, cached social links dropped, and listeners notified,
+        so every cluster sees bans, routes and links made through any other cluster.
+        """
+        if interval > 0 and self._watch_task is None:
+            self._watch_task = background_task(self._watch_forever(interval))
+
+    async def _watch_forever(self, interval):
+        version = await asyncio.to_thread(self._data_version)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                current = await asyncio.to_thread(self._data_version)
+                if current == version:
+                    continue
+                await self.flush() # Our own queued writes must be on disk before we reload from it
+                writes_before = self._write_count
+                bans = await asyncio.to_thread(self._load_bans)
+                if self._write_count != writes_before:
+                    continue # A local write raced the reload; try again on the next tick
+                version = current
+                self.bans = bans
+                self._socials.clear()
+                for callback in self._change_listeners:
+                    callback()
+            except Exception as e:
+                print(f"Failed to reload storage after an external change: {e}\n{traceback.format_exc()}")
+
+    async def close(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+        if self._writer_task is not None:
+            await self.flush()
+            self._writer_task.cancel()
+            self._writer_task = None
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+    # --- Direct access (startup only; blocks the event loop) ---
+    def executescript(self, script):
+        with self._db_lock, self._db:
+            self._db.executescript(script)
+
+    def fetchall(self, sql, params=()):
+        with self._db_lock:
+            return self._db.execute(sql, params).fetchall()
+
+    # --- Write batching ---
+    def write(self, sql, params=()):
+        """Queues a write. Returns a future that resolves once it has been committed."""
+        future = asyncio.get_running_loop().create_future()
+        self._writes.put_nowait((sql, params, future))
+        self._write_count += 1
+        return future
+
+    async def flush(self):
+        """Waits until every queued write has been committed."""
+        await self._writes.join()
+
+    def _commit_batch(self, batch):
+        with self._db_lock, self._db:
+            for sql, params, _ in batch:
+                self._db.execute(sql, params)
+
+    async def _write_forever(self):
+        while True:
+            batch = [await self._writes.get()]
+            while not self._writes.empty() and len(batch) < 500:
+                batch.append(self._writes.get_nowait())
+            try:
+                await asyncio.to_thread(self._commit_batch, batch)
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+            except Exception as e:
+                print(f"Storage write batch of {len(batch)} failed: {e}\n{traceback.format_exc()}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                    future.exception() # Mark retrieved; fire-and-forget writes are already logged above
+            finally:
+                for _ in batch:
+                    self._writes.task_done()
+
+    # --- Bot bans ---
+    def add_ban(self, guild_id, user_id, reason, banned_by, command=""):
+        """Bans a user in a guild (0 = every guild), from one command or ("") all of them."""
+        self.bans.add(guild_id, command, user_id)
+        return self.write(
+            "INSERT OR REPLACE INTO bot_bans (guild_id, user_id, command, reason, banned_by, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (guild_id or 0, user_id, command or "", reason, banned_by, time.time())
         )
-    except KeyError as e:
-        print(f"Missing expected data in API response: {e}\n{traceback.format_exc()}")
-        await interaction.followup.send(
-            "Failed to parse stock information. The API response format might have changed. Please contact support.",
-            ephemeral=True
+
+    def remove_ban(self, guild_id, user_id, command=""):
+        self.bans.discard(guild_id, command, user_id)
+        return self.write(
+            "DELETE FROM bot_bans WHERE guild_id = ? AND user_id = ? AND command = ?",
+            (guild_id or 0, user_id, command or "")
         )
-    except Exception as e:
-        print(f"An unexpected error occurred in /gag-stock: {e}\n{traceback.format_exc()}")
-        await interaction.followup.send(
-            "An unexpected error occurred while fetching gag stock. Please try again later.",
-            ephemeral=True
+
+    # --- Social links ---
+    def _load_socials(self, user_id):
+        with self._db_lock:
+            rows = self._db.execute("SELECT platform, link FROM social_links WHERE user_id = ? ORDER BY rowid", (user_id,)).fetchall()
+        return dict(rows)
+
+    def _cache_socials(self, user_id, links):
+        self._socials[user_id] = links
+        self._socials.move_to_end(user_id)
+        while len(self._socials) > self.socials_cache_size:
+            self._socials.popitem(last=False)
+
+    async def get_socials(self, user_id):
+        """Returns {platform: link} for a user (empty if none), loading it from disk on first access."""
+        links = self._socials.get(user_id)
+        metrics.cache_result("socials", links is not None)
+        if links is not None:
+            self._socials.move_to_end(user_id)
+            return links
+        if self._writes.qsize():
+            await self.flush() # Don't read around a queued write for this user
+        links = await asyncio.to_thread(self._load_socials, user_id)
+        self._cache_socials(user_id, links)
+        return links
+
+    async def set_social(self, user_id, platform, link):
+        links = await self.get_socials(user_id)
+        links[platform] = link
+        return self.write(
+            "INSERT OR REPLACE INTO social_links (user_id, platform, link, updated_at) VALUES (?, ?, ?, ?)",
+            (user_id, platform, link, time.time())
         )
 
+    def stats(self):
+        return {"bans": len(self.bans), "cached_socials": len(self._socials), "queued_writes": self._writes.qsize()}
+
+storage = BotStorage(os.path.join(DATA_DIR, "bot.sqlite3"), SOCIALS_CACHE_SIZE)
+
+# --- Command Sync ---
+def command_tree_hash(guild=None):
+    """
+    Hashes the command tree exactly as it would be uploaded, so any change to a name,
+    description, option or permission produces a different hash.
+    """
+    payload = [command.to_dict(bot.tree) for command in bot.tree.get_commands(guild=guild)]
+    payload.sort(key=lambda command: (command.get("type", 1), command["name"]))
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+async def sync_commands(force=False):
+    """
+    Uploads the command tree only if it differs from the last synced one.
+    Runs once from setup_hook, never from on_ready (which fires again after every reconnect).
+    With DEV_GUILD_ID set, commands are synced to that guild only, which updates instantly.
+    """
+    storage.executescript("CREATE TABLE IF NOT EXISTS bot_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);")
+    guild = discord.Object(id=DEV_GUILD_ID) if DEV_GUILD_ID else None
+    if guild is not None:
+        bot.tree.copy_global_to(guild=guild)
+
+    scope = f"guild:{DEV_GUILD_ID}" if guild is not None else "global"
+    key = f"command_tree_hash:{bot.application_id}:{scope}"
+    digest = command_tree_hash(guild)
+    rows = storage.fetchall("SELECT value FROM bot_meta WHERE key = ?", (key,))
+    if rows and rows[0][0] == digest and not force:
+        print(f"Command tree unchanged ({digest[:12]}), skipping {scope} sync.")
+        return None
+
+    try:
+        synced = await bot.tree.sync(guild=guild)
+    except discord.HTTPException as e:
+        print(f"Failed to sync commands: {e}")
+        return None
+    await storage.write("INSERT OR REPLACE INTO bot_meta (key, value) VALUES (?, ?)", (key, digest))
+    print(f"Synced {len(synced)} command(s) to {scope} ({digest[:12]}).")
+    return synced
+
+# --- Event: Bot is Ready ---
+@bot.event
+async def on_ready():
+    """
+    This event fires when the bot has successfully connected to Discord.
+    It fires again after reconnects, so slash commands are synced from setup_hook instead.
+    """
+    print(f'Logged in as {bot.user.name} ({bot.user.id})')
+    print('------')
+
 # --- New Command: /uptime ---
 @bot.tree.command(name="uptime", description="Shows how long the bot has been online.")
 async def uptime(interaction: discord.Interaction):
     """
     Displays the bot's current uptime.
     """
-    if await is_bot_banned(interaction): return
-
     current_time = datetime.now()
     delta = current_time - bot_start_time
     
@@ -344,582 +1738,242 @@ async def uptime(interaction: discord.Interaction):
     await interaction.response.send_message(f"I've been online for **{' '.join(uptime_string)}**.", ephemeral=False)
 
 
-# --- New Command: /ship ---
-@bot.tree.command(name="ship", description="Calculate the compatibility between two users.")
-@app_commands.describe(user1="The first user.", user2="The second user.")
-async def ship(interaction: discord.Interaction, user1: discord.Member, user2: discord.Member):
-    """
-    Calculates and displays a "compatibility percentage" between two users.
-    """
-    if await is_bot_banned(interaction): return
-
-    if user1.id == user2.id:
-        return await interaction.response.send_message("Please pick two different users!", ephemeral=True)
-
-    # Combine user IDs in a consistent way to ensure same result regardless of order
-    user_ids = sorted([user1.id, user2.id])
-    seed_value = sum(user_ids) # Simple numeric sum as a seed
+# --- Owner-only Diagnostics: /debug ---
+class OwnerOnlyGroup(app_commands.Group):
+    """Command group that only the bot owner (or application team) can run."""
+    async def interaction_check(self, interaction: discord.Interaction):
+        return await bot.is_owner(interaction.user)
 
-    random.seed(seed_value)
-    compatibility_percentage = random.randint(0, 100)
-    random.seed() # Reset seed for other random operations
-
-    response_messages = [
-        "Hmm, interesting combo...",
-        "Let's see what the stars say...",
-        "Calculating connection...",
-        "A bond is forming...",
-        "Chemistry check..."
-    ]
-    random_response = random.choice(response_messages)
-
-    if compatibility_percentage < 30:
-        phrase = "not a great match."
-    elif 30 <= compatibility_percentage < 60:
-        phrase = "an okay match."
-    elif 60 <= compatibility_percentage < 85:
-        phrase = "a good match!"
-    else:
-        phrase = "a perfect match! ❤️"
-
-    await interaction.response.send_message(
-        f"{random_response}\n"
-        f"**{user1.display_name}** and **{user2.display_name}** are **{compatibility_percentage}%** {phrase}",
-        ephemeral=False
-    )
+debug_group = OwnerOnlyGroup(
+    name="debug",
+    description="Owner-only bot diagnostics.",
+    default_permissions=discord.Permissions(administrator=True) # Hidden from regular members in the command picker
+)
 
-# --- New Command: /simprate ---
-@bot.tree.command(name="simprate", description="Rate someone's 'simp' level (for playful use).")
-@app_commands.describe(user="The user to rate.")
-async def simprate(interaction: discord.Interaction, user: discord.Member):
+@debug_group.command(name="bans", description="Show bot ban counts and how many invocations they blocked.")
+async def debug_bans(interaction: discord.Interaction):
     """
-    Playfully rates a user's 'simp' level.
+    Reports the size of the ban index and the BanGateTree short-circuit counters.
     """
-    if await is_bot_banned(interaction): return
-
-    # Use user ID as a seed for consistent results for the same user
-    random.seed(user.id)
-    simp_percentage = random.randint(0, 100)
-    random.seed() # Reset seed
-
-    if simp_percentage < 25:
-        tier = "just a friend."
-    elif 25 <= simp_percentage < 50:
-        tier = "a bit caring."
-    elif 50 <= simp_percentage < 75:
-        tier = "quite devoted."
-    else:
-        tier = "a true simp! ❤️"
-
-    await interaction.response.send_message(f"**{user.display_name}** is **{simp_percentage}%** {tier}", ephemeral=False)
-
-# --- New Command: /howgay ---
-@bot.tree.command(name="howgay", description="Playfully rate someone's 'gayness'.")
-@app_commands.describe(user="The user to rate.")
-async def howgay(interaction: discord.Interaction, user: discord.Member):
+    blocked = bot.tree.blocked
+    embed = discord.Embed(title="Bot Bans", color=discord.Color.dark_grey())
+    embed.add_field(name="Banned Entries", value=f"{len(storage.bans)} ({storage.bans.nbytes / 1024:.1f} KiB)", inline=False)
+    embed.add_field(name="Blocked (global)", value=blocked["global"], inline=True)
+    embed.add_field(name="Blocked (server)", value=blocked["guild"], inline=True)
+    embed.add_field(name="Blocked (command)", value=blocked["command"], inline=True)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@debug_group.command(name="shards", description="Show latency and guild counts for this process's shards.")
+async def debug_shards(interaction: discord.Interaction):
     """
-    Playfully rates a user's 'gayness'.
+    Reports per-shard gateway latency and guild counts for the cluster that handled this command.
     """
-    if await is_bot_banned(interaction): return
-
-    random.seed(user.id)
-    gay_percentage = random.randint(0, 100)
-    random.seed()
+    guild_counts = {}
+    for guild in bot.guilds:
+        guild_counts[guild.shard_id] = guild_counts.get(guild.shard_id, 0) + 1
 
-    phrases = [
-        "just vibing.",
-        "got some rainbow flair.",
-        "pretty fabulous.",
-        "shining bright like a diamond!",
-        "the gayest of them all! 🌈"
-    ]
-    
-    if gay_percentage < 20:
-        phrase_index = 0
-    elif gay_percentage < 40:
-        phrase_index = 1
-    elif gay_percentage < 60:
-        phrase_index = 2
-    elif gay_percentage < 80:
-        phrase_index = 3
+    if SHARDED:
+        shards = [(shard_id, shard.latency, shard.is_closed()) for shard_id, shard in sorted(bot.shards.items())]
     else:
-        phrase_index = 4
-
-    await interaction.response.send_message(f"**{user.display_name}** is **{gay_percentage}%** {phrases[phrase_index]}", ephemeral=False)
-
-
-# --- New Command: /truth ---
-@bot.tree.command(name="truth", description="Get a random truth question.")
-async def truth(interaction: discord.Interaction):
-    """
-    Sends a random 'truth' question.
-    """
-    if await is_bot_banned(interaction): return
-    await interaction.response.send_message(f"**Truth:** {random.choice(TRUTHS)}", ephemeral=False)
+        shards = [(0, bot.latency, bot.is_closed())]
 
-# --- New Command: /dare ---
-@bot.tree.command(name="dare", description="Get a random dare challenge.")
-async def dare(interaction: discord.Interaction):
-    """
-    Sends a random 'dare' challenge.
-    """
-    if await is_bot_banned(interaction): return
-    await interaction.response.send_message(f"**Dare:** {random.choice(DARES)}", ephemeral=False)
-
-# --- New Command: /neverhaveiever ---
-@bot.tree.command(name="neverhaveiever", description="Play a 'Never Have I Ever' statement.")
-async def neverhaveiever(interaction: discord.Interaction):
-    """
-    Sends a random 'Never Have I Ever' statement.
-    """
-    if await is_bot_banned(interaction): return
-    await interaction.response.send_message(f"**Never Have I Ever:** {random.choice(NEVER_HAVE_I_EVER)}", ephemeral=False)
+    embed = discord.Embed(
+        title=f"Cluster {CLUSTER_ID} (pid {os.getpid()})",
+        description=f"Shards {', '.join(str(shard_id) for shard_id, _, _ in shards)} of {bot.shard_count or 1} · {len(bot.guilds)} guilds",
+        color=discord.Color.dark_grey()
+    )
+    for shard_id, latency, closed in shards[:25]: # Embed field limit
+        status = "disconnected" if closed else f"{latency * 1000:.0f} ms"
+        embed.add_field(name=f"Shard {shard_id}", value=f"{status} · {guild_counts.get(shard_id, 0)} guilds", inline=True)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
-# --- New Command: /clickgame ---
-@bot.tree.command(name="clickgame", description="A simple click-based mini-game.")
-async def clickgame(interaction: discord.Interaction):
+@debug_group.command(name="sync", description="Re-upload slash commands even if the command tree hash is unchanged.")
+async def debug_sync(interaction: discord.Interaction):
     """
-    Starts a simple mini-game where the user clicks a button.
+    Forces a command sync, e.g. after commands were edited in the Developer Portal.
     """
-    if await is_bot_banned(interaction): return
-    
-    view = discord.ui.View(timeout=30) # Set a timeout for the view (e.g., 30 seconds)
-    button = discord.ui.Button(label="Click Me!", style=discord.ButtonStyle.primary)
-
-    async def button_callback(button_interaction: discord.Interaction):
-        if button_interaction.user.id == interaction.user.id:
-            await button_interaction.response.send_message(f"You clicked it! Good job!", ephemeral=True)
-            view.stop() # Stop listening after one click
-        else:
-            await button_interaction.response.send_message("This isn't your game!", ephemeral=True)
-
-    button.callback = button_callback
-    view.add_item(button)
-
-    await interaction.response.send_message("Test your reflexes! Click the button!", view=view, ephemeral=False)
-    # The view will timeout after 180 seconds by default if no interaction occurs.
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    synced = await sync_commands(force=True)
+    if synced is None:
+        await interaction.followup.send("Command sync failed. Check the logs.", ephemeral=True)
+    else:
+        await interaction.followup.send(f"Synced {len(synced)} command(s).", ephemeral=True)
 
-# --- New Command: /lyrics ---
-@bot.tree.command(name="lyrics", description="Get lyrics for a song.")
-@app_commands.describe(artist="The artist's name.", title="The song title.")
-async def lyrics(interaction: discord.Interaction, artist: str, title: str):
+@debug_group.command(name="breakers", description="Show circuit breaker state for each external API.")
+async def debug_breakers(interaction: discord.Interaction):
     """
-    Fetches and displays lyrics for a given song and artist using Lyrics.ovh API.
+    Reports each Upstream's breaker state, consecutive failures and how many requests it failed fast.
     """
-    if await is_bot_banned(interaction): return
-
-    await interaction.response.defer(ephemeral=False)
-    
+    embed = discord.Embed(title=f"Circuit Breakers (cluster {CLUSTER_ID})", color=discord.Color.dark_grey())
+    for name, upstream in upstreams.items():
+        stats = upstream.stats()
+        status = {"closed": "🟢 closed", "half-open": "🟡 half-open", "open": f"🔴 open, retry in {stats['retry_in']:.0f}s"}[stats["state"]]
+        lines = [
+            status,
+            f"Budget {upstream.timeout:g}s · {upstream.retries} retries · Queued: {stats['queued']}",
+            f"Failures in a row: {stats['failures']} · Trips: {stats['trips']} · Failed fast: {stats['rejected']}",
+        ]
+        if stats["last_error"]:
+            lines.append(f"Last error: `{str(stats['last_error'])[:200]}`")
+        embed.add_field(name=name, value="\n".join(lines), inline=False)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+def process_rss():
+    """Resident memory of this process in bytes: current where /proc exists, otherwise the peak. None if unknown."""
     try:
-        lyrics_url = f"https://api.lyrics.ovh/v1/{artist}/{title}"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(lyrics_url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    lyrics_text = data.get('lyrics')
-                    if lyrics_text:
-                        # Discord embed description has a limit of 4096 characters
-                        if len(lyrics_text) > 4000:
-                            lyrics_text = lyrics_text[:4000] + "\n\n... (lyrics too long, truncated)"
-
-                        embed = discord.Embed(
-                            title=f"Lyrics for {title} by {artist}",
-                            description=lyrics_text,
-                            color=discord.Color.blue()
-                        )
-                        await interaction.followup.send(embed=embed, ephemeral=False)
-                    else:
-                        await interaction.followup.send(f"Couldn't find lyrics for **{title}** by **{artist}**. No lyrics data available.", ephemeral=False)
-                elif response.status == 404:
-                    await interaction.followup.send(f"Lyrics not found for **{title}** by **{artist}**. Please check the spelling.", ephemeral=False)
-                else:
-                    await interaction.followup.send(f"An error occurred while fetching lyrics. Status code: {response.status}", ephemeral=False)
-    except Exception as e:
-        print(f"Error fetching lyrics: {e}\n{traceback.format_exc()}")
-        await interaction.followup.send("An unexpected error occurred while trying to get lyrics. The lyrics API might be down or unreachable.", ephemeral=False)
-
-
-# --- New Command: /currencyconvert ---
-@bot.tree.command(name="currencyconvert", description="Convert currencies.")
-@app_commands.describe(amount="The amount to convert.", from_currency="The currency code to convert from (e.g., USD, EUR).", to_currency="The currency code to convert to (e.g., JPY, GBP).")
-async def currencyconvert(interaction: discord.Interaction, amount: float, from_currency: str, to_currency: str):
-    """
-    Converts a given amount from one currency to another using an external API.
-    """
-    if await is_bot_banned(interaction): return
-
-    await interaction.response.defer(ephemeral=False)
-
-    # Check if API key is properly configured
-    if not CURRENCY_API_KEY:
-        return await interaction.followup.send("Currency conversion API key is not configured. Please contact the bot owner.", ephemeral=True)
-
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
     try:
-        from_currency = from_currency.upper()
-        to_currency = to_currency.upper()
-
-        # The API URL uses the from_currency as the base for rates
-        # Construct the URL with the API key loaded from environment variable
-        api_url = f"https://v6.exchangerate-api.com/v6/{CURRENCY_API_KEY}/latest/{from_currency}"
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(api_url) as response:
-                response.raise_for_status()
-                data = await response.json()
-                
-                if data.get('result') == 'success':
-                    rates = data.get('conversion_rates')
-                    if rates and to_currency in rates:
-                        exchange_rate = rates[to_currency]
-                        converted_amount = amount * exchange_rate
-                        await interaction.followup.send(
-                            f"{amount:,.2f} {from_currency} is **{converted_amount:,.2f} {to_currency}**.",
-                            ephemeral=False
-                        )
-                    else:
-                        await interaction.followup.send(f"Could not find exchange rate for `{to_currency}`. Please check the currency codes (e.g., USD, EUR).", ephemeral=False)
-                else:
-                    error_type = data.get('error-type', 'Unknown error')
-                    await interaction.followup.send(f"Currency conversion failed: {error_type}. Please check your currency codes and API key.", ephemeral=False)
-    except aiohttp.ClientError as e:
-        print(f"API request failed for currency conversion: {e}\n{traceback.format_exc()}")
-        await interaction.followup.send("Failed to retrieve currency rates. The API might be down or unreachable or your API key is invalid.", ephemeral=False)
-    except Exception as e:
-        print(f"An unexpected error occurred in /currencyconvert: {e}\n{traceback.format_exc()}")
-        await interaction.followup.send("An unexpected error occurred during currency conversion.", ephemeral=False)
-
-# --- New Command: /imagegenerate ---
-@bot.tree.command(name="imagegenerate", description="Generate an image based on a text prompt.")
-@app_commands.describe(prompt="The text description for the image to generate.")
-async def imagegenerate(interaction: discord.Interaction, prompt: str):
+        import resource
+    except ImportError: # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024 # ru_maxrss is in KiB on Linux, bytes on macOS
+
+def format_bytes(size):
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+def describe_store(store):
+    """One-line size summary of a shared_state object, from whichever of len(), nbytes and stats() it has."""
+    parts = []
+    if hasattr(store, "__len__"):
+        parts.append(f"{len(store):,} entries")
+    if hasattr(store, "nbytes"):
+        parts.append(format_bytes(store.nbytes))
+    if callable(getattr(store, "stats", None)):
+        parts.extend(f"{key}: {value:,}" for key, value in store.stats().items() if type(value) is int)
+    return " · ".join(parts)
+
+def fit_field(lines, limit=1024):
+    """Joins as many lines as fit in an embed field value."""
+    value = ""
+    for line in lines:
+        if len(value) + len(line) + 1 > limit:
+            break
+        value += line + "\n"
+    return value or "—"
+
+def top_allocation_sites(count):
+    """The source lines holding the most traced memory, leaving out tracemalloc's own and import machinery."""
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ))
+    return snapshot.statistics("lineno")[:count]
+
+@debug_group.command(name="memory", description="Show memory use, top allocation sites and the size of the bot's stores.")
+async def debug_memory(interaction: discord.Interaction):
     """
-    Generates an image from a text prompt using an external AI image generation API.
+    Reports RSS, discord.py's caches, bot-owned stores and, with TRACEMALLOC_FRAMES set, where Python memory was allocated.
+    Use it to compare a LOW_MEMORY deployment against a default one.
     """
-    if await is_bot_banned(interaction): return
-
-    await interaction.response.defer(ephemeral=False)
-
-    # Check if API key and URL are properly configured
-    if not IMAGE_GEN_API_KEY:
-        return await interaction.followup.send("Image generation API key is not configured. Please contact the bot owner.", ephemeral=True)
-    if not IMAGE_GEN_API_URL.startswith("http"):
-         return await interaction.followup.send("Image generation API URL is not properly set. Please contact the bot owner.", ephemeral=True)
-
-    try:
-        # Headers and payload need to match your chosen Image Generation API's documentation
-        headers = {
-            "Authorization": f"Bearer {IMAGE_GEN_API_KEY}",
-            "Content-Type": "application/json",
-            "Accept": "application/json" # Typically application/json for response, or image/png/jpeg for direct image
-        }
-        
-        # Example payload for Stability AI's SDXL (check docs for exact parameters)
-        payload = {
-            "text_prompts": [{"text": prompt}],
-            "cfg_scale": 7, # Controls how much the prompt is adhered to
-            "height": 512,  # Image height
-            "width": 512,   # Image width
-            "samples": 1,   # Number of images to generate (keep to 1 for free tier/simplicity)
-            "steps": 30,    # Number of steps for generation
-        }
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(IMAGE_GEN_API_URL, json=payload, headers=headers) as response:
-                response.raise_for_status() # Raise exception for bad responses
-                data = await response.json()
-                
-                # --- IMPORTANT: Parsing the response depends on your chosen API ---
-                # Example for Stability AI, which often returns base64 encoded images:
-                image_url = None
-                if data and 'artifacts' in data and len(data['artifacts']) > 0:
-                    # Check if the image is base64 encoded
-                    if 'base64' in data['artifacts'][0]:
-                        image_data_base64 = data['artifacts'][0]['base64']
-                        image_url = f"data:image/png;base64,{image_data_base64}"
-                    # Or if a direct URL is provided by the API (less common for direct generation)
-                    elif 'url' in data['artifacts'][0]:
-                        image_url = data['artifacts'][0]['url']
-
-                if image_url:
-                    embed = discord.Embed(
-                        title="Generated Image",
-                        description=f"Prompt: \"{prompt}\"",
-                        color=discord.Color.green(),
-                        timestamp=interaction.created_at
-                    )
-                    embed.set_image(url=image_url)
-                    embed.set_footer(text="Generated by AI")
-                    await interaction.followup.send(embed=embed, ephemeral=False)
-                else:
-                    await interaction.followup.send("Could not generate image. The AI response was unexpected or empty.", ephemeral=False)
-
-    except aiohttp.ClientError as e:
-        print(f"Image generation API request failed: {e}\n{traceback.format_exc()}")
-        await interaction.followup.send(f"Failed to generate image. The AI service might be down, unreachable, or your API key is invalid. Error: `{e}`", ephemeral=False)
-    except Exception as e:
-        print(f"An unexpected error occurred in /imagegenerate: {e}\n{traceback.followup()}")
-        await interaction.followup.send("An unexpected error occurred during image generation. Please ensure your prompt is appropriate.", ephemeral=False)
-
-
-# --- New Command: /socials ---
-@bot.tree.command(name="socials", description="Add your social media links to your profile.")
-@app_commands.describe(platform="The social media platform (e.g., YouTube, Reddit).", link="Your profile link on that platform.")
-async def socials(interaction: discord.Interaction, platform: str, link: str):
-    """
-    Allows users to save their social media links. (Data is in-memory)
-    """
-    if await is_bot_banned(interaction): return
-
-    user_id = interaction.user.id
-    if user_id not in user_social_links:
-        user_social_links[user_id] = {}
-    
-    # Store platform in lowercase for consistency
-    user_social_links[user_id][platform.lower()] = link
-    
-    await interaction.response.send_message(f"Your **{platform.capitalize()}** link has been saved!", ephemeral=True)
-
-# --- New Command: /getsocials ---
-@bot.tree.command(name="getsocials", description="View a user's linked social media.")
-@app_commands.describe(user="The user whose social links you want to view.")
-async def getsocials(interaction: discord.Interaction, user: discord.Member):
-    """
-    Displays a user's saved social media links.
-    """
-    if await is_bot_banned(interaction): return
-
-    user_id = user.id
-    if user_id not in user_social_links or not user_social_links[user_id]:
-        return await interaction.response.send_message(f"**{user.display_name}** hasn't added any social media links yet.", ephemeral=False)
-
+    await interaction.response.defer(ephemeral=True, thinking=True) # A tracemalloc snapshot of a big heap takes a while
+    rss = process_rss()
     embed = discord.Embed(
-        title=f"{user.display_name}'s Social Links",
-        color=discord.Color.purple(),
-        timestamp=interaction.created_at
+        title=f"Memory (cluster {CLUSTER_ID}, pid {os.getpid()})",
+        description=f"RSS: **{format_bytes(rss) if rss is not None else 'unknown'}** · Low-memory mode: **{'on' if LOW_MEMORY else 'off'}**",
+        color=discord.Color.dark_grey()
     )
-    embed.set_thumbnail(url=user.avatar.url if user.avatar else user.default_avatar.url)
-
-    description_parts = []
-    for platform, link in user_social_links[user_id].items():
-        description_parts.append(f"**{platform.capitalize()}:** <{link}>")
-    
-    embed.description = "\n".join(description_parts)
-
-    await interaction.response.send_message(embed=embed, ephemeral=False)
-
-# --- New Command: /botban (Admin Only) ---
-@bot.tree.command(name="botban", description="Prevent a user from using any bot commands.")
-@app_commands.checks.has_permissions(ban_members=True) # Requires Ban Members permission
-@app_commands.describe(user="The user to ban from bot commands.", reason="The reason for the bot ban.")
-async def botban(interaction: discord.Interaction, user: discord.Member, reason: str = "No reason provided."):
-    """
-    Bans a user from using any bot commands. Requires 'Ban Members' permission.
-    """
-    if user.id == bot.user.id:
-        return await interaction.response.send_message("I cannot ban myself from using commands.", ephemeral=True)
-    if user.id == interaction.user.id:
-        return await interaction.response.send_message("You cannot ban yourself from using commands.", ephemeral=True)
-    # Prevent non-admin from banning admin, unless they are also admin
-    if user.guild_permissions.administrator and not interaction.user.guild_permissions.administrator:
-        return await interaction.response.send_message("You cannot ban an administrator from using bot commands unless you are also an administrator.", ephemeral=True)
-
-    if user.id in bot_banned_users:
-        return await interaction.response.send_message(f"**{user.display_name}** is already banned from using bot commands.", ephemeral=True)
-
-    bot_banned_users.add(user.id)
-    await interaction.response.send_message(f"**{user.display_name}** has been banned from using bot commands. Reason: {reason}", ephemeral=False)
-    # Optionally, notify the banned user via DM
-    try:
-        await user.send(f"You have been banned from using commands in **{interaction.guild.name}** by **{interaction.user.display_name}**. Reason: {reason}")
-    except discord.Forbidden:
-        print(f"Could not DM {user.display_name} about bot ban.")
-
-# --- New Command: /botunban (Admin Only) ---
-@bot.tree.command(name="botunban", description="Allow a user to use bot commands again.")
-@app_commands.checks.has_permissions(ban_members=True) # Requires Ban Members permission
-@app_commands.describe(user="The user to unban from bot commands.")
-async def botunban(interaction: discord.Interaction, user: discord.Member):
-    """
-    Unbans a user, allowing them to use bot commands again. Requires 'Ban Members' permission.
-    """
-    if user.id not in bot_banned_users:
-        return await interaction.response.send_message(f"**{user.display_name}** is not currently banned from using bot commands.", ephemeral=True)
-
-    bot_banned_users.remove(user.id)
-    await interaction.response.send_message(f"**{user.display_name}** has been unbanned from using bot commands.", ephemeral=False)
-    try:
-        await user.send(f"You have been unbanned from using commands in **{interaction.guild.name}** by **{interaction.user.display_name}**.")
-    except discord.Forbidden:
-        print(f"Could not DM {user.display_name} about bot unban.")
 
+    members = sum(len(guild.members) for guild in bot.guilds)
+    embed.add_field(
+        name="discord.py Caches",
+        value=f"{len(bot.guilds):,} guilds · {members:,} members · {len(bot.users):,} users · {len(bot.cached_messages):,} messages",
+        inline=False
+    )
 
-# --- New Command: /roblox ---
-@bot.tree.command(name="roblox", description="Shows a Roblox user's profile and stats.")
-@app_commands.describe(username="The Roblox username.")
-async def roblox(interaction: discord.Interaction, username: str):
+    storage_stats = storage.stats()
+    stores = [
+        f"**bans**: {storage_stats['bans']:,} entries · {format_bytes(storage.bans.nbytes)}",
+        f"**socials**: {storage_stats['cached_socials']:,} users cached · {storage_stats['queued_writes']:,} queued writes",
+        f"**cooldowns**: {describe_store(cooldowns.buckets)} · {sum(len(roles) for policy in cooldowns.policies.values() for roles in policy.values()):,} overrides",
+    ]
+    stores.extend(f"**{name}**: {describe_store(store)}" for name, store in sorted(bot.shared_state.items()) if describe_store(store))
+    embed.add_field(name="Bot Stores", value=fit_field(stores), inline=False)
+
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        top = await asyncio.to_thread(top_allocation_sites, 10)
+        lines = [f"Traced: {format_bytes(current)} (peak {format_bytes(peak)})"]
+        for stat in top:
+            frame = stat.traceback[0]
+            where = "/".join(frame.filename.replace("\\", "/").split("/")[-2:])
+            lines.append(f"`{format_bytes(stat.size):>9}` {stat.count:,} blocks · {where}:{frame.lineno}")
+        embed.add_field(name="Top Allocation Sites", value=fit_field(lines), inline=False)
+    else:
+        embed.add_field(name="Top Allocation Sites", value="tracemalloc is off. Set TRACEMALLOC_FRAMES (e.g. 1) and restart to trace allocations.", inline=False)
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
+EXTENSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "extensions")
+
+def available_extensions():
+    return sorted(entry.name[:-3] for entry in os.scandir(EXTENSIONS_DIR) if entry.name.endswith(".py") and not entry.name.startswith("_"))
+
+@debug_group.command(name="extension", description="Load, unload or reload command extensions on this cluster.")
+@app_commands.describe(action="What to do. Leave empty to list the extensions.", name="The extension. Reload without one reloads every loaded extension.")
+@app_commands.choices(action=[
+    app_commands.Choice(name="Load", value="load"),
+    app_commands.Choice(name="Unload", value="unload"),
+    app_commands.Choice(name="Reload", value="reload"),
+])
+async def debug_extension(interaction: discord.Interaction, action: str | None = None, name: str | None = None):
     """
-    Fetches and displays a Roblox user's profile information.
-    Performs two API calls: username-to-ID, then ID-to-profile.
+    Swaps command code in and out without restarting the process or dropping the gateway connection.
+    Objects the extensions keep in bot.shared_state (caches, queues) survive. Only the cluster that
+    handled this command changes, so run it on every cluster (or restart them) to roll a change out.
     """
-    if await is_bot_banned(interaction): return
-    await interaction.response.defer(ephemeral=False)
-
-    try:
-        # Step 1: Get UserID from username (POST request)
-        username_to_id_url = "https://users.roblox.com/v1/usernames/users"
-        payload = {"usernames": [username], "excludeBannedUsers": False}
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.post(username_to_id_url, json=payload) as response:
-                response.raise_for_status()
-                user_id_data = await response.json()
-                
-                if not user_id_data or not user_id_data.get('data'):
-                    return await interaction.followup.send(f"Could not find Roblox user **{username}**.", ephemeral=False)
-                
-                roblox_user_id = user_id_data['data'][0]['id']
-                roblox_display_name = user_id_data['data'][0].get('displayName', username)
-
-
-            # Step 2: Get User Profile Details using UserID (GET request)
-            profile_url = f"https://users.roblox.com/v1/users/{roblox_user_id}"
-            async with session.get(profile_url) as response:
-                response.raise_for_status()
-                profile_data = await response.json()
-
-                # Extract relevant data
-                name = profile_data.get('name', 'N/A')
-                display_name = profile_data.get('displayName', name)
-                description = profile_data.get('description', 'No description set.').strip()
-                created_date_str = profile_data.get('created', 'N/A')
-                is_banned = profile_data.get('isBanned', False)
-
-                # Format join date
-                join_date = "N/A"
-                if created_date_str != 'N/A':
-                    try:
-                        # Parse ISO format (e.g., '2020-01-01T00:00:00.000Z')
-                        created_dt = datetime.fromisoformat(created_date_str.replace('Z', '+00:00'))
-                        join_date = created_dt.strftime("%Y-%m-%d %H:%M UTC")
-                    except ValueError:
-                        pass # Keep N/A if parsing fails
-                
-                embed = discord.Embed(
-                    title=f"Roblox Profile: {display_name}",
-                    description=f"Username: `{name}`",
-                    color=discord.Color.blue(),
-                    timestamp=interaction.created_at
-                )
-                embed.set_thumbnail(url=f"https://www.roblox.com/Thumbs/Avatar.ashx?x=150&y=150&username={name}") # Basic avatar thumbnail
-                
-                embed.add_field(name="User ID", value=roblox_user_id, inline=True)
-                embed.add_field(name="Join Date", value=join_date, inline=True)
-                embed.add_field(name="Banned", value="Yes" if is_banned else "No", inline=True)
-                
-                if description:
-                    embed.add_field(name="About Me", value=description if len(description) <= 1024 else description[:1021] + "...", inline=False) # Discord field value limit
-
-                await interaction.followup.send(embed=embed, ephemeral=False)
-
-    except aiohttp.ClientResponseError as e:
-        if e.status == 404:
-            await interaction.followup.send(f"Roblox user **{username}** not found.", ephemeral=False)
+    loaded = sorted(extension.removeprefix("extensions.") for extension in bot.extensions)
+    if action is None:
+        lines = [f"{'🟢' if extension in loaded else '⚪'} `{extension}`" for extension in available_extensions()]
+        embed = discord.Embed(title=f"Extensions (cluster {CLUSTER_ID})", description="\n".join(lines) or "None found.", color=discord.Color.dark_grey())
+        return await interaction.response.send_message(embed=embed, ephemeral=True)
+    if name is None and action != "reload":
+        return await interaction.response.send_message(f"Pick an extension to {action}.", ephemeral=True)
+
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    results = []
+    for extension in [name] if name else loaded:
+        try:
+            await getattr(bot, f"{action}_extension")(f"extensions.{extension}")
+        except commands.ExtensionError as e:
+            print(f"Failed to {action} extension {extension}: {e}\n{traceback.format_exc()}")
+            results.append(f"❌ `{extension}`: {e}")
         else:
-            print(f"Roblox API error (status {e.status}): {e}\n{traceback.format_exc()}")
-            await interaction.followup.send(f"An error occurred while fetching Roblox profile: HTTP Status {e.status}.", ephemeral=False)
-    except aiohttp.ClientError as e:
-        print(f"Roblox API request failed: {e}\n{traceback.format_exc()}")
-        await interaction.followup.send("Failed to connect to Roblox API. It might be down or unreachable.", ephemeral=False)
-    except Exception as e:
-        print(f"An unexpected error occurred in /roblox: {e}\n{traceback.format_exc()}")
-        await interaction.followup.send("An unexpected error occurred while fetching Roblox profile.", ephemeral=False)
+            print(f"Extension {extension}: {action}ed.")
+            results.append(f"✅ `{extension}` {action}ed")
 
+    synced = await sync_commands() # No-op unless the set of commands changed
+    if synced is not None:
+        results.append(f"Synced {len(synced)} command(s); other clusters still run their own copy until they do the same.")
+    await interaction.followup.send("\n".join(results), ephemeral=True)
 
-# --- New Command: /fortnite ---
-@bot.tree.command(name="fortnite", description="Shows Fortnite stats for a given username.")
-@app_commands.describe(username="The Fortnite username (Epic Games Display Name).")
-async def fortnite(interaction: discord.Interaction, username: str):
-    """
-    Fetches and displays Fortnite Battle Royale player statistics using Fortnite-API.com.
-    """
-    if await is_bot_banned(interaction): return
-    await interaction.response.defer(ephemeral=False)
+@debug_extension.autocomplete("name")
+async def debug_extension_name_autocomplete(interaction: discord.Interaction, current: str):
+    return autocomplete_choices([extension for extension in available_extensions() if extension.startswith(current.lower())][:25])
 
-    # Check if API key is properly configured
-    if not FORTNITE_API_KEY:
-        return await interaction.followup.send("Fortnite API key is not configured. Please contact the bot owner.", ephemeral=True)
+bot.tree.add_command(debug_group)
 
-    try:
-        api_url = f"https://fortnite-api.com/v2/stats/br/v2?name={username}"
-        headers = {"Authorization": FORTNITE_API_KEY}
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(api_url, headers=headers) as response:
-                response.raise_for_status()
-                data = await response.json()
-
-                if data.get('status') == 200 and data.get('data'):
-                    player_data = data['data']
-                    
-                    # Extract general stats
-                    account_name = player_data['account']['name']
-                    account_level = player_data['account']['level']
-                    battle_pass_level = player_data['battlePass']['level']
-                    
-                    # Extract overall stats (for all game modes combined)
-                    overall_stats = player_data['stats']['all']['overall']
-                    wins = overall_stats.get('wins', 0)
-                    kills = overall_stats.get('kills', 0)
-                    kd = overall_stats.get('kd', 0.0)
-                    matches = overall_stats.get('matches', 0)
-                    win_rate = overall_stats.get('winRate', 0.0)
-
-                    # Extract image for player icon (if available)
-                    avatar_icon = player_data.get('image') # Fortnite-API might provide a generated image
-
-                    embed = discord.Embed(
-                        title=f"Fortnite Stats for {account_name}",
-                        color=discord.Color.dark_green(),
-                        timestamp=interaction.created_at
-                    )
-                    
-                    if avatar_icon:
-                        embed.set_thumbnail(url=avatar_icon)
-
-                    embed.add_field(name="Account Level", value=account_level, inline=True)
-                    embed.add_field(name="Battle Pass Level", value=battle_pass_level, inline=True)
-                    embed.add_field(name="Total Matches", value=matches, inline=True)
-                    
-                    embed.add_field(name="Wins", value=wins, inline=True)
-                    embed.add_field(name="Kills", value=kills, inline=True)
-                    embed.add_field(name="K/D", value=f"{kd:.2f}", inline=True)
-                    embed.add_field(name="Win Rate", value=f"{win_rate:.2f}%", inline=True)
-
-                    embed.set_footer(text="Data from Fortnite-API.com")
-                    await interaction.followup.send(embed=embed, ephemeral=False)
-
-                elif data.get('status') == 404:
-                    await interaction.followup.send(f"Fortnite player **{username}** not found. Please ensure it's an exact Epic Games Display Name.", ephemeral=False)
-                else:
-                    error_message = data.get('error', 'Unknown API error.')
-                    await interaction.followup.send(f"An error occurred while fetching Fortnite stats: {error_message}", ephemeral=False)
-
-    except aiohttp.ClientResponseError as e:
-        if e.status == 400: # Bad Request, often due to invalid username format or missing API key
-            await interaction.followup.send(f"Invalid request for Fortnite stats (HTTP 400). Please check the username and ensure your API key is correctly configured.", ephemeral=False)
-        elif e.status == 403: # Forbidden, often due to invalid API key
-            await interaction.followup.send(f"Access to Fortnite API forbidden (HTTP 403). Please check if your Fortnite-API.com key is valid.", ephemeral=False)
-        elif e.status == 404: # Not found, specifically handled above
-            await interaction.followup.send(f"Fortnite player **{username}** not found (HTTP 404).", ephemeral=False)
-        else:
-            print(f"Fortnite API error (status {e.status}): {e}\n{traceback.format_exc()}")
-            await interaction.followup.send(f"An error occurred while fetching Fortnite stats: HTTP Status {e.status}.", ephemeral=False)
-    except aiohttp.ClientError as e:
-        print(f"Fortnite API request failed: {e}\n{traceback.format_exc()}")
-        await interaction.followup.send("Failed to connect to Fortnite API. It might be down or unreachable.", ephemeral=False)
-    except Exception as e:
-        print(f"An unexpected error occurred in /fortnite: {e}\n{traceback.format_exc()}")
-        await interaction.followup.send("An unexpected error occurred while fetching Fortnite stats.", ephemeral=False)
+
+# --- Metrics: Gauges (read at scrape time) ---
+metrics.gauge("bot_guilds", "Guilds handled by this process.", lambda: len(bot.guilds))
+metrics.gauge(
+    "bot_shard_latency_seconds", "Gateway heartbeat latency per shard.",
+    lambda: {(shard_id,): latency for shard_id, latency in bot.latencies} if SHARDED else {(0,): bot.latency},
+    ("shard",)
+)
+metrics.gauge(
+    "bot_upstream_breaker_open", "1 while an upstream's circuit breaker is open or half-open.",
+    lambda: {(name,): int(upstream.state != Upstream.CLOSED) for name, upstream in upstreams.items()},
+    ("upstream",)
+)
+metrics.gauge("bot_storage_queued_writes", "SQLite writes waiting for the batched writer.", lambda: storage.stats()["queued_writes"])
 
 
 # --- Cooldown Error Handling for all commands ---
@@ -929,6 +1983,7 @@ async def on_app_command_error(interaction: discord.Interaction, error: app_comm
     Global error handler for application commands.
     Handles cooldowns and missing permissions specifically.
     """
+    record_command_finished(interaction, "rejected" if isinstance(error, app_commands.CheckFailure) else "error")
     if isinstance(error, app_commands.CommandOnCooldown):
         remaining_time = round(error.retry_after, 1)
         if remaining_time < 1:
@@ -942,6 +1997,8 @@ async def on_app_command_error(interaction: discord.Interaction, error: app_comm
             await interaction.response.send_message(cooldown_message, ephemeral=True)
     elif isinstance(error, app_commands.MissingPermissions):
         await interaction.response.send_message("You don't have the necessary permissions to use this command.", ephemeral=True)
+    elif isinstance(error, app_commands.CheckFailure):
+        await send_response(interaction, "You can't use this command.", ephemeral=True)
     else:
         print(f"Unhandled application command error: {error}\n{traceback.format_exc()}")
         if interaction.response.is_done():
@@ -0,0 +1,148 @@
+"""
+Cluster launcher: runs the bot as several worker processes, each owning a contiguous range of shards,
+so gateway traffic and command handling are spread across CPU cores.
+
+    CLUSTER_COUNT=4 SHARD_COUNT=16 python cluster.py
+
+If SHARD_COUNT isn't set, Discord's recommended shard count is used. Every worker shares DATA_DIR
+and keeps bans, confession routes and caches consistent through the SQLite database there.
+Cluster 0 alone polls the gag stock and currency APIs; the other workers read its snapshots.
+Workers that exit are restarted with a backoff; SIGINT/SIGTERM stops all of them.
+"""
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DISCORD_BOT_TOKEN = os.getenv('DISCORD_TOKEN')
+CLUSTER_COUNT = int(os.getenv("CLUSTER_COUNT", str(os.cpu_count() or 1))) # Worker processes to launch
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0"))                           # 0 = ask Discord for the recommended count
+RESTART_BACKOFF_MAX = 60                                                   # Max seconds between restarts of a crashing worker
+STAGGER = 5                                                                # Seconds between worker logins; Discord allows one IDENTIFY every 5 seconds per bucket
+
+BOT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot.py")
+
+
+def recommended_shard_count(token):
+    """Asks Discord how many shards this bot should run."""
+    request = urllib.request.Request(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {token}", "User-Agent": "DiscordBot (cluster launcher, 1.0)"}
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.load(response)["shards"]
+
+
+def shard_ranges(shard_count, cluster_count):
+    """Splits shard IDs 0..shard_count-1 into cluster_count contiguous, near-equal ranges."""
+    base, extra = divmod(shard_count, cluster_count)
+    ranges, start = [], 0
+    for cluster_id in range(cluster_count):
+        size = base + (1 if cluster_id < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+class Worker:
+    """One bot.py process running a fixed set of shards."""
+    def __init__(self, cluster_id, shard_ids, shard_count):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.process = None
+        self.failures = 0     # Consecutive quick exits, drives the restart backoff
+        self.started_at = 0.0
+        self.restart_at = 0.0
+
+    def start(self):
+        env = dict(os.environ)
+        env.update({
+            "CLUSTER_ID": str(self.cluster_id),
+            "SHARD_COUNT": str(self.shard_count),
+            "SHARD_IDS": ",".join(str(shard_id) for shard_id in self.shard_ids),
+            "AUTO_SHARD": "false",
+        })
+        self.process = subprocess.Popen([sys.executable, BOT_SCRIPT], env=env, cwd=os.path.dirname(BOT_SCRIPT))
+        self.started_at = time.monotonic()
+        print(f"Cluster {self.cluster_id} started (pid {self.process.pid}, shards {self.shard_ids[0]}-{self.shard_ids[-1]}).")
+
+    def check(self):
+        """Restarts the worker if it exited, backing off when it keeps crashing."""
+        now = time.monotonic()
+        if self.process is None:
+            if now >= self.restart_at:
+                self.start()
+            return
+        code = self.process.poll()
+        if code is None:
+            return
+        self.failures = self.failures + 1 if now - self.started_at < RESTART_BACKOFF_MAX else 0
+        delay = min(2 ** self.failures, RESTART_BACKOFF_MAX)
+        print(f"Cluster {self.cluster_id} exited with code {code}; restarting in {delay}s.")
+        self.process = None
+        self.restart_at = now + delay
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+
+    def wait(self, timeout):
+        if self.process is None:
+            return
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def main():
+    if DISCORD_BOT_TOKEN is None:
+        print("ERROR: DISCORD_TOKEN environment variable not set.")
+        return 1
+
+    shard_count = SHARD_COUNT or recommended_shard_count(DISCORD_BOT_TOKEN)
+    cluster_count = max(1, min(CLUSTER_COUNT, shard_count)) # Every cluster needs at least one shard
+    print(f"Launching {cluster_count} cluster(s) for {shard_count} shard(s).")
+
+    workers = [
+        Worker(cluster_id, shard_ids, shard_count)
+        for cluster_id, shard_ids in enumerate(shard_ranges(shard_count, cluster_count))
+    ]
+
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        stop.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    for worker in workers:
+        if stop.is_set(): # Don't keep launching once a shutdown was requested mid-stagger
+            break
+        worker.start()
+        stop.wait(STAGGER)
+
+    while not stop.is_set():
+        for worker in workers:
+            worker.check()
+        stop.wait(1)
+
+    print("Stopping clusters...")
+    for worker in workers:
+        worker.stop()
+    for worker in workers:
+        worker.wait(timeout=30)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
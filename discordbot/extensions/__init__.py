@@ -0,0 +1,5 @@
+"""
+Command extensions loaded by bot.py (see EXTENSIONS). Each module registers its commands on
+import and starts or stops its background work in setup()/teardown(), so the owner can reload
+it with /debug extension while the bot stays connected.
+"""
@@ -0,0 +1,440 @@
+"""
+Anonymous confessions: /confession, the durable outbox that delivers them, and /confessionconfig
+for picking where each server's confessions are posted.
+"""
+import discord
+from discord import app_commands
+import asyncio
+import random
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+
+from bot import (
+    CONFESSION_CHANNEL_RATE_LIMIT, CONFESSION_CHANNEL_RATE_PERIOD, CONFESSION_USE_WEBHOOKS,
+    CONFESSIONS_CHANNEL_ID, background_task, bot, metrics, shared, storage,
+)
+
+
+# --- Confession Outbox ---
+MAX_CONFESSION_CHARS = 4000 # Embed descriptions allow 4096 characters, including the quotes and bold markers
+
+def build_confession_embed(text, created_at):
+    embed = discord.Embed(
+        title="Anonymous Confession",
+        description=f"\"**{text}**\"",
+        color=discord.Color.dark_red()
+    )
+    embed.set_footer(text="Confession submitted anonymously.")
+    embed.timestamp = created_at
+    return embed
+
+class ChannelSendBucket:
+    """
+    Client-side mirror of Discord's per-channel message rate limit (about 5 messages per 5 seconds),
+    so the outbox waits its turn instead of running into 429s.
+    """
+    def __init__(self, limit, period):
+        self.limit = limit
+        self.period = period
+        self._sent = deque() # monotonic timestamps of recent sends
+
+    async def wait(self):
+        while len(self._sent) >= self.limit:
+            delay = self._sent[0] + self.period - time.monotonic()
+            if delay <= 0:
+                self._sent.popleft()
+            else:
+                await asyncio.sleep(delay)
+        self._sent.append(time.monotonic())
+
+class ConfessionRouter:
+    """
+    Per-guild (and optionally per-category) confession channel configuration.
+    Routes are loaded once at startup and kept in memory. Resolved channel and webhook objects
+    are cached, so routing a confession needs no API calls after the first one. With
+    CONFESSION_USE_WEBHOOKS on, confessions are posted through one bot-owned webhook per channel.
+    Each webhook has its own rate-limit bucket instead of every guild sharing the bot's channel sends.
+    """
+    WEBHOOK_NAME = "Anonymous Confessions"
+    WEBHOOK_RETRY_AFTER = 300 # Seconds to post as the bot after a webhook couldn't be fetched or created
+
+    def __init__(self):
+        self.routes = {}        # (guild_id, category_id) -> channel_id; category_id 0 covers the whole guild
+        self._webhook_urls = {} # channel_id -> stored webhook URL
+        self._channels = {}     # channel_id -> resolved channel object
+        self._webhooks = {}     # channel_id -> Webhook, or None if webhooks can't be used there
+        self._webhook_retry_at = {} # channel_id -> monotonic time to try getting a webhook again after an API error
+
+    def load(self):
+        storage.executescript(
+            "CREATE TABLE IF NOT EXISTS confession_routes ("
+            "  guild_id INTEGER NOT NULL, category_id INTEGER NOT NULL DEFAULT 0,"
+            "  channel_id INTEGER NOT NULL, PRIMARY KEY (guild_id, category_id));"
+            "CREATE TABLE IF NOT EXISTS confession_webhooks (channel_id INTEGER PRIMARY KEY, url TEXT NOT NULL);"
+        )
+        self._reload()
+        storage.on_external_change(self._reload)
+
+    def _reload(self):
+        self.routes = {
+            (guild_id, category_id): channel_id
+            for guild_id, category_id, channel_id in storage.fetchall("SELECT guild_id, category_id, channel_id FROM confession_routes")
+        }
+        self._webhook_urls = dict(storage.fetchall("SELECT channel_id, url FROM confession_webhooks"))
+
+    def channel_for(self, guild_id, category_id=None):
+        """
+        Picks the confessions channel for a confession sent from a guild (and category):
+        category route, then guild route, then the bot-wide CONFESSIONS_CHANNEL_ID default.
+        """
+        if guild_id:
+            if category_id:
+                channel_id = self.routes.get((guild_id, category_id))
+                if channel_id:
+                    return channel_id
+            channel_id = self.routes.get((guild_id, 0))
+            if channel_id:
+                return channel_id
+        return CONFESSIONS_CHANNEL_ID or None
+
+    def set_route(self, guild_id, category_id, channel_id):
+        self.routes[(guild_id, category_id or 0)] = channel_id
+        return storage.write(
+            "INSERT OR REPLACE INTO confession_routes (guild_id, category_id, channel_id) VALUES (?, ?, ?)",
+            (guild_id, category_id or 0, channel_id)
+        )
+
+    def remove_route(self, guild_id, category_id):
+        if self.routes.pop((guild_id, category_id or 0), None) is None:
+            return False
+        storage.write("DELETE FROM confession_routes WHERE guild_id = ? AND category_id = ?", (guild_id, category_id or 0))
+        return True
+
+    def forget_channel(self, channel_id):
+        """Drops cached objects for a channel (e.g. after it was deleted)."""
+        self._channels.pop(channel_id, None)
+        self._webhooks.pop(channel_id, None)
+        self._webhook_retry_at.pop(channel_id, None)
+        if self._webhook_urls.pop(channel_id, None) is not None:
+            storage.write("DELETE FROM confession_webhooks WHERE channel_id = ?", (channel_id,))
+
+    async def get_channel(self, channel_id):
+        """Returns the channel object, falling back to an API fetch when it isn't in the gateway cache."""
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            channel = bot.get_channel(channel_id) or await bot.fetch_channel(channel_id)
+            self._channels[channel_id] = channel
+        return channel
+
+    async def get_webhook(self, channel_id):
+        """Returns the bot's confession webhook for a channel, creating it on first use. None if unavailable."""
+        if not CONFESSION_USE_WEBHOOKS:
+            return None
+        if channel_id in self._webhooks:
+            return self._webhooks[channel_id]
+        if self._webhook_retry_at.get(channel_id, 0) > time.monotonic():
+            return None
+
+        webhook = None
+        url = self._webhook_urls.get(channel_id)
+        if url:
+            webhook = discord.Webhook.from_url(url, client=bot)
+        else:
+            try:
+                channel = await self.get_channel(channel_id)
+                if not hasattr(channel, "create_webhook"):
+                    # Threads and DMs have no webhooks of their own: post as the bot instead
+                    self._webhooks[channel_id] = None
+                    return None
+                for existing in await channel.webhooks():
+                    if existing.name == self.WEBHOOK_NAME and existing.token and existing.user and existing.user.id == bot.user.id:
+                        webhook = existing
+                        break
+                else:
+                    webhook = await channel.create_webhook(name=self.WEBHOOK_NAME, reason="Anonymous confession delivery")
+                self._webhook_urls[channel_id] = webhook.url
+                storage.write("INSERT OR REPLACE INTO confession_webhooks (channel_id, url) VALUES (?, ?)", (channel_id, webhook.url))
+            except discord.Forbidden:
+                # Missing Manage Webhooks: post as the bot instead
+                webhook = None
+            except discord.HTTPException as e:
+                # E.g. the channel's webhook limit or a 5xx: post as the bot for a while, then try again
+                print(f"Couldn't get a confession webhook for channel {channel_id}, posting as the bot: {e}")
+                self._webhook_retry_at[channel_id] = time.monotonic() + self.WEBHOOK_RETRY_AFTER
+                return None
+        self._webhooks[channel_id] = webhook
+        self._webhook_retry_at.pop(channel_id, None)
+        return webhook
+
+    async def send(self, channel_id, embeds):
+        webhook = await self.get_webhook(channel_id)
+        if webhook is not None:
+            try:
+                return await webhook.send(embeds=embeds, username=self.WEBHOOK_NAME)
+            except discord.NotFound:
+                # Someone deleted the webhook; the outbox retries and a new one gets created
+                self.forget_channel(channel_id)
+                raise
+        channel = await self.get_channel(channel_id)
+        await channel.send(embeds=embeds)
+
+confession_router = shared("confession_router", ConfessionRouter)
+
+class ConfessionOutbox:
+    """
+    Durable queue between /confession and the confessions channel.
+    A confession is committed to the confession_outbox table before the user is told it was sent,
+    and deleted only after Discord has accepted the message, so restarts and send errors lose nothing.
+    Each channel has its own delivery task. When a backlog builds up, queued confessions are
+    grouped into one message of up to 10 embeds, paced by that channel's ChannelSendBucket.
+    If a grouped message fails, its confessions are retried one at a time, so a single bad
+    confession only uses up its own attempts.
+    """
+    MAX_EMBEDS_PER_MESSAGE = 10    # Discord limit
+    MAX_EMBED_CHARS_PER_MESSAGE = 6000 # Discord limit on the combined size of a message's embeds
+    MAX_ATTEMPTS = 5               # After this many failed sends a confession is kept in the table as 'failed'
+
+    def __init__(self):
+        self._queues = {}   # channel_id -> deque of (confession_id, text, created_at)
+        self._workers = {}  # channel_id -> delivery task
+        self._buckets = {}  # channel_id -> ChannelSendBucket
+        self._attempts = {} # confession_id -> failed sends so far
+        self._solo = {}     # channel_id -> confessions at the head of the queue to send one at a time
+        self._loaded = False
+
+    def start(self):
+        """
+        Loads confessions left undelivered by a previous run and resumes their delivery.
+        After an extension reload the queues are already in memory, so only their workers are restarted.
+        """
+        if self._loaded:
+            for channel_id, queue in self._queues.items():
+                if queue and channel_id not in self._workers:
+                    self._workers[channel_id] = background_task(self._deliver(channel_id))
+            return
+        self._loaded = True
+        storage.executescript(
+            "CREATE TABLE IF NOT EXISTS confession_outbox ("
+            "  id INTEGER PRIMARY KEY, guild_id INTEGER, channel_id INTEGER NOT NULL,"
+            "  text TEXT NOT NULL, created_at REAL NOT NULL,"
+            "  attempts INTEGER NOT NULL DEFAULT 0, status TEXT NOT NULL DEFAULT 'pending');"
+        )
+        rows = [
+            row for row in storage.fetchall(
+                "SELECT id, guild_id, channel_id, text, created_at, attempts FROM confession_outbox WHERE status = 'pending' ORDER BY id"
+            )
+            if bot.owns_guild(row[1]) # Other clusters deliver confessions from their own guilds
+        ]
+        for confession_id, _, channel_id, text, created_at, attempts in rows:
+            self._attempts[confession_id] = attempts
+            self._queue_in_memory(channel_id, confession_id, text, datetime.fromtimestamp(created_at, tz=timezone.utc))
+        if rows:
+            print(f"Resuming delivery of {len(rows)} queued confession(s).")
+
+    def stop(self):
+        for worker in self._workers.values():
+            worker.cancel()
+        self._workers.clear()
+
+    async def enqueue(self, interaction, channel_id, text):
+        """Durably queues a confession. Returns once it has been committed to disk."""
+        # The interaction ID is a unique snowflake, so it doubles as the outbox row ID
+        confession_id = interaction.id
+        created_at = interaction.created_at
+        await storage.write(
+            "INSERT INTO confession_outbox (id, guild_id, channel_id, text, created_at) VALUES (?, ?, ?, ?, ?)",
+            (confession_id, interaction.guild_id, channel_id, text, created_at.timestamp())
+        )
+        self._queue_in_memory(channel_id, confession_id, text, created_at)
+
+    def _queue_in_memory(self, channel_id, confession_id, text, created_at):
+        self._queues.setdefault(channel_id, deque()).append((confession_id, text, created_at))
+        worker = self._workers.get(channel_id)
+        if worker is None or worker.done():
+            self._workers[channel_id] = background_task(self._deliver(channel_id))
+
+    def pending(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    def __len__(self):
+        return self.pending()
+
+    def _take_batch(self, queue, limit):
+        batch, chars = [], 0
+        for item in queue:
+            size = len(item[1]) + 64 # Title, quotes and footer
+            if batch and (len(batch) >= limit or chars + size > self.MAX_EMBED_CHARS_PER_MESSAGE):
+                break
+            batch.append(item)
+            chars += size
+        return batch
+
+    async def _deliver(self, channel_id):
+        await bot.wait_until_ready()
+        queue = self._queues[channel_id]
+        bucket = self._buckets.setdefault(channel_id, ChannelSendBucket(CONFESSION_CHANNEL_RATE_LIMIT, CONFESSION_CHANNEL_RATE_PERIOD))
+        while queue:
+            solo = self._solo.get(channel_id, 0)
+            batch = self._take_batch(queue, 1 if solo else self.MAX_EMBEDS_PER_MESSAGE)
+            await bucket.wait()
+            try:
+                await confession_router.send(channel_id, [build_confession_embed(text, created_at) for _, text, created_at in batch])
+            except Exception as e:
+                if len(batch) > 1:
+                    # Don't charge every confession in the message for what may be one bad one
+                    print(f"Failed to deliver {len(batch)} confessions to channel {channel_id} together, retrying them one at a time: {e}")
+                    self._solo[channel_id] = len(batch)
+                    continue
+                await self._handle_failure(channel_id, batch, e)
+                if not queue or queue[0] is not batch[0]:
+                    self._sent_solo(channel_id) # Given up on; the next one gets its own try
+                continue
+
+            self._sent_solo(channel_id, len(batch))
+            for _ in batch:
+                queue.popleft()
+            ids = [confession_id for confession_id, _, _ in batch]
+            for confession_id in ids:
+                self._attempts.pop(confession_id, None)
+            storage.write(f"DELETE FROM confession_outbox WHERE id IN ({', '.join('?' * len(ids))})", ids)
+            print(f"Delivered {len(batch)} confession(s) to channel {channel_id}. {len(queue)} still queued.")
+
+        del self._queues[channel_id]
+        self._solo.pop(channel_id, None)
+        self._workers.pop(channel_id, None)
+
+    def _sent_solo(self, channel_id, count=1):
+        remaining = self._solo.get(channel_id, 0) - count
+        if remaining > 0:
+            self._solo[channel_id] = remaining
+        else:
+            self._solo.pop(channel_id, None)
+
+    async def _handle_failure(self, channel_id, batch, error):
+        print(f"Failed to deliver {len(batch)} confession(s) to channel {channel_id}: {error}")
+        queue = self._queues[channel_id]
+        most_attempts = 0
+        for item in batch:
+            confession_id = item[0]
+            attempts = self._attempts.get(confession_id, 0) + 1
+            most_attempts = max(most_attempts, attempts)
+            if attempts >= self.MAX_ATTEMPTS:
+                # Keep it on disk for the owner to inspect, but stop blocking the rest of the channel
+                queue.remove(item)
+                self._attempts.pop(confession_id, None)
+                storage.write("UPDATE confession_outbox SET status = 'failed', attempts = ? WHERE id = ?", (attempts, confession_id))
+            else:
+                self._attempts[confession_id] = attempts
+                storage.write("UPDATE confession_outbox SET attempts = ? WHERE id = ?", (attempts, confession_id))
+        # Exponential backoff with jitter before retrying this channel
+        await asyncio.sleep(min(2 ** most_attempts, 60) + random.random())
+
+confession_outbox = shared("confession_outbox", ConfessionOutbox)
+
+# --- Slash Command: /confession ---
+@bot.tree.command(name="confession", description="Submit an anonymous confession.")
+@app_commands.describe(
+    text=f"The confession you want to submit anonymously (up to {MAX_CONFESSION_CHARS} characters)."
+)
+async def confession(interaction: discord.Interaction, text: app_commands.Range[str, 1, MAX_CONFESSION_CHARS]):
+    """
+    Handles the '/confession' slash command.
+    Queues an anonymous confession in the durable ConfessionOutbox, which posts it to the
+    confessions channel that ConfessionRouter picks for this server (and category).
+    """
+    channel_id = confession_router.channel_for(interaction.guild_id, getattr(interaction.channel, "category_id", None))
+    if channel_id is None:
+        return await interaction.response.send_message(
+            "Confessions aren't set up in this server yet. Ask an admin to run `/confessionconfig set`.",
+            ephemeral=True
+        )
+
+    try:
+        await confession_router.get_channel(channel_id)
+    except discord.HTTPException:
+        print(f"Error: Confessions channel with ID {channel_id} not found or accessible.")
+        return await interaction.response.send_message(
+            "An error occurred while sending your confession. The confessions channel might be misconfigured.",
+            ephemeral=True
+        )
+
+    try:
+        await confession_outbox.enqueue(interaction, channel_id, text)
+    except Exception as e:
+        print(f"Failed to queue confession: {e}\n{traceback.format_exc()}")
+        return await interaction.response.send_message(
+            "An error occurred while sending your confession. Please try again.",
+            ephemeral=True
+        )
+
+    await interaction.response.send_message(
+        "Your confession has been sent!",
+        ephemeral=True
+    )
+
+# --- Command Group: /confessionconfig (Admin Only) ---
+confession_config = app_commands.Group(
+    name="confessionconfig",
+    description="Configure where confessions are posted in this server.",
+    guild_only=True,
+    default_permissions=discord.Permissions(manage_guild=True)
+)
+
+@confession_config.command(name="set", description="Post this server's confessions (or one category's) in a channel.")
+@app_commands.checks.has_permissions(manage_guild=True) # Requires Manage Server permission
+@app_commands.describe(channel="Where confessions should be posted.", category="Only route confessions sent from this category.")
+async def confessionconfig_set(interaction: discord.Interaction, channel: discord.TextChannel, category: discord.CategoryChannel = None):
+    """
+    Saves a confession route for this server, or for one category of it.
+    """
+    confession_router.set_route(interaction.guild_id, category.id if category else 0, channel.id)
+    where = f"the **{category.name}** category" if category else "this server"
+    await interaction.response.send_message(f"Confessions from {where} will be posted in {channel.mention}.", ephemeral=True)
+
+@confession_config.command(name="remove", description="Remove this server's (or one category's) confession channel.")
+@app_commands.checks.has_permissions(manage_guild=True) # Requires Manage Server permission
+@app_commands.describe(category="Remove the route for this category instead of the server-wide one.")
+async def confessionconfig_remove(interaction: discord.Interaction, category: discord.CategoryChannel = None):
+    """
+    Deletes a confession route for this server, or for one category of it.
+    """
+    if confession_router.remove_route(interaction.guild_id, category.id if category else 0):
+        await interaction.response.send_message("The confession channel has been removed.", ephemeral=True)
+    else:
+        await interaction.response.send_message("No confession channel was configured for that.", ephemeral=True)
+
+@confession_config.command(name="show", description="Show where this server's confessions are posted.")
+@app_commands.checks.has_permissions(manage_guild=True) # Requires Manage Server permission
+async def confessionconfig_show(interaction: discord.Interaction):
+    """
+    Lists this server's confession routes.
+    """
+    lines = []
+    for (guild_id, category_id), channel_id in confession_router.routes.items():
+        if guild_id == interaction.guild_id:
+            where = f"<#{category_id}> category" if category_id else "Whole server"
+            lines.append(f"- {where} → <#{channel_id}>")
+    if not lines:
+        default = f"<#{CONFESSIONS_CHANNEL_ID}> (bot default)" if CONFESSIONS_CHANNEL_ID else "nowhere"
+        lines.append(f"No routes configured. Confessions go to {default}.")
+    await interaction.response.send_message("\n".join(lines), ephemeral=True)
+
+bot.tree.add_command(confession_config)
+
+@bot.listen('on_guild_channel_delete')
+async def forget_deleted_confession_channel(channel):
+    confession_router.forget_channel(channel.id)
+
+
+# --- Extension Setup ---
+async def setup(bot):
+    confession_router.load()
+    confession_outbox.start()
+    metrics.gauge("bot_confession_outbox_pending", "Confessions waiting to be delivered.", confession_outbox.pending)
+
+async def teardown(bot):
+    # Undelivered confessions stay queued (and on disk) until the extension is loaded again
+    confession_outbox.stop()
+    metrics.remove("bot_confession_outbox_pending")
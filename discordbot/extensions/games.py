@@ -0,0 +1,586 @@
+"""
+Party games: /ship, /simprate and /howgay ratings, truth/dare/never-have-I-ever prompt packs
+with /promptconfig, and /clickgame. numpy is only imported when this extension is loaded.
+"""
+import discord
+from discord import app_commands
+import asyncio
+import bisect
+import os
+import random
+import numpy as np
+from collections import OrderedDict
+
+from bot import (
+    LOW_MEMORY, MEMBERS_INTENT, PROMPT_DEFAULT_PACKS, PROMPT_DEFAULT_RATING, PROMPT_MAX_BAGS,
+    PROMPT_RELOAD_INTERVAL, PROMPTS_DIR, SHIP_MATCHES, SHIP_MEMBER_INDEX_TTL, background_task, bot,
+    send_response, shared, SingleFlight, splitmix64, storage, TTLCache,
+)
+
+
+# --- Ratings ---
+# /ship, /simprate and /howgay scores are a pure hash of the user IDs: stable forever, and they
+# never touch the shared `random` module state that other commands rely on.
+SHIP_SALT = 0x5348495000000001
+SIMP_SALT = 0x53494D5000000002
+GAY_SALT = 0x4741590000000003
+
+def splitmix64_array(x):
+    """splitmix64 over a uint64 NumPy array; wraps modulo 2**64 exactly like the scalar version."""
+    with np.errstate(over="ignore"):
+        x = x + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def user_rating(salt, user_id):
+    """0-100 score for one user."""
+    return splitmix64(user_id ^ salt) % 101
+
+def pair_rating(salt, user_id, other_id):
+    """0-100 score for a pair of users; the same whichever order they're given in."""
+    low, high = min(user_id, other_id), max(user_id, other_id)
+    return splitmix64(low ^ splitmix64(high ^ salt)) % 101
+
+def pair_ratings(salt, user_id, other_ids):
+    """pair_rating of `user_id` against every ID in a uint64 array, in one vectorized pass."""
+    user = np.uint64(user_id)
+    low = np.minimum(other_ids, user)
+    high = np.maximum(other_ids, user)
+    return splitmix64_array(low ^ splitmix64_array(high ^ np.uint64(salt))) % np.uint64(101)
+
+# Server ID -> uint64 array of non-bot member IDs, rebuilt when members join or leave
+member_id_index = shared("member_id_index", lambda: TTLCache(SHIP_MEMBER_INDEX_TTL, max_entries=1000, name="ship_members"))
+
+member_id_loads = SingleFlight() # Concurrent /ship calls in one server share a single member request
+
+async def load_member_ids(guild):
+    if LOW_MEMORY and MEMBERS_INTENT:
+        # No member cache to read: ask the gateway, keep the IDs (8 bytes each) and drop the Member objects
+        members = await guild.chunk(cache=False)
+    else:
+        members = guild.members
+    ids = np.fromiter((member.id for member in members if not member.bot), dtype=np.uint64)
+    member_id_index.set(guild.id, ids)
+    return ids
+
+@bot.listen('on_member_join')
+async def invalidate_member_index_on_join(member):
+    member_id_index.pop(member.guild.id)
+
+@bot.listen('on_member_remove')
+async def invalidate_member_index_on_remove(member):
+    member_id_index.pop(member.guild.id)
+
+def top_matches(user_id, member_ids, count):
+    """
+    Returns ([(member_id, score)] for the `count` best matches, best first (ties broken by ID),
+    number of members ranked). The user is left out, if present.
+    """
+    candidates = member_ids[member_ids != np.uint64(user_id)]
+    if not len(candidates):
+        return [], 0
+    scores = pair_ratings(SHIP_SALT, user_id, candidates)
+    count = min(count, len(candidates))
+    # Partitioning finds the count-th best score in O(n); only members at or above it get sorted
+    threshold = np.partition(scores, len(scores) - count)[len(scores) - count]
+    shortlist = np.flatnonzero(scores >= threshold)
+    order = np.lexsort((candidates[shortlist], -scores[shortlist].astype(np.int64)))[:count]
+    return [(int(candidates[shortlist[i]]), int(scores[shortlist[i]])) for i in order], len(candidates)
+
+def ship_phrase(compatibility_percentage):
+    if compatibility_percentage < 30:
+        return "not a great match."
+    elif 30 <= compatibility_percentage < 60:
+        return "an okay match."
+    elif 60 <= compatibility_percentage < 85:
+        return "a good match!"
+    else:
+        return "a perfect match! ❤️"
+
+# --- New Command: /ship ---
+@bot.tree.command(name="ship", description="Calculate the compatibility between two users, or find someone's best matches.")
+@app_commands.describe(user1="The first user.", user2="The second user. Leave empty to find user1's best matches in this server.")
+async def ship(interaction: discord.Interaction, user1: discord.Member, user2: discord.Member = None):
+    """
+    Calculates and displays a "compatibility percentage" between two users.
+    Without user2, scores user1 against every member of the server and shows the top matches.
+    """
+    if user2 is None:
+        return await ship_matchmaking(interaction, user1)
+    if user1.id == user2.id:
+        return await interaction.response.send_message("Please pick two different users!", ephemeral=True)
+
+    compatibility_percentage = pair_rating(SHIP_SALT, user1.id, user2.id)
+
+    response_messages = [
+        "Hmm, interesting combo...",
+        "Let's see what the stars say...",
+        "Calculating connection...",
+        "A bond is forming...",
+        "Chemistry check..."
+    ]
+    random_response = random.choice(response_messages)
+
+    await interaction.response.send_message(
+        f"{random_response}\n"
+        f"**{user1.display_name}** and **{user2.display_name}** are **{compatibility_percentage}%** {ship_phrase(compatibility_percentage)}",
+        ephemeral=False
+    )
+
+async def ship_matchmaking(interaction, user):
+    if interaction.guild is None:
+        return await interaction.response.send_message("Matchmaking only works in a server. Pick a second user instead!", ephemeral=True)
+
+    member_ids = member_id_index.get(interaction.guild.id)
+    if member_ids is None:
+        if LOW_MEMORY and MEMBERS_INTENT:
+            await interaction.response.defer(thinking=True) # Requesting a big server's member list takes a while
+        member_ids = await member_id_loads.do(interaction.guild.id, lambda: load_member_ids(interaction.guild))
+    matches, ranked = top_matches(user.id, member_ids, SHIP_MATCHES)
+    if not matches:
+        return await send_response(interaction, "There's nobody here to match with yet!", ephemeral=True)
+
+    lines = []
+    for rank, (member_id, score) in enumerate(matches, start=1):
+        member = interaction.guild.get_member(member_id)
+        name = member.display_name if member else f"<@{member_id}>"
+        lines.append(f"**{rank}.** {name}: **{score}%** {ship_phrase(score)}")
+
+    embed = discord.Embed(
+        title=f"💘 Best matches for {user.display_name}",
+        description="\n".join(lines),
+        color=discord.Color.pink()
+    )
+    embed.set_footer(text=f"Out of {ranked:,} members")
+    await send_response(interaction, embed=embed, ephemeral=False)
+
+# --- New Command: /simprate ---
+@bot.tree.command(name="simprate", description="Rate someone's 'simp' level (for playful use).")
+@app_commands.describe(user="The user to rate.")
+async def simprate(interaction: discord.Interaction, user: discord.Member):
+    """
+    Playfully rates a user's 'simp' level.
+    """
+    # Hash of the user ID, so the same user always gets the same result
+    simp_percentage = user_rating(SIMP_SALT, user.id)
+
+    if simp_percentage < 25:
+        tier = "just a friend."
+    elif 25 <= simp_percentage < 50:
+        tier = "a bit caring."
+    elif 50 <= simp_percentage < 75:
+        tier = "quite devoted."
+    else:
+        tier = "a true simp! ❤️"
+
+    await interaction.response.send_message(f"**{user.display_name}** is **{simp_percentage}%** {tier}", ephemeral=False)
+
+# --- New Command: /howgay ---
+@bot.tree.command(name="howgay", description="Playfully rate someone's 'gayness'.")
+@app_commands.describe(user="The user to rate.")
+async def howgay(interaction: discord.Interaction, user: discord.Member):
+    """
+    Playfully rates a user's 'gayness'.
+    """
+    gay_percentage = user_rating(GAY_SALT, user.id)
+
+    phrases = [
+        "just vibing.",
+        "got some rainbow flair.",
+        "pretty fabulous.",
+        "shining bright like a diamond!",
+        "the gayest of them all! 🌈"
+    ]
+    
+    if gay_percentage < 20:
+        phrase_index = 0
+    elif gay_percentage < 40:
+        phrase_index = 1
+    elif gay_percentage < 60:
+        phrase_index = 2
+    elif gay_percentage < 80:
+        phrase_index = 3
+    else:
+        phrase_index = 4
+
+    await interaction.response.send_message(f"**{user.display_name}** is **{gay_percentage}%** {phrases[phrase_index]}", ephemeral=False)
+
+
+# --- Prompt Packs ---
+class PromptFile:
+    """
+    One prompt file, indexed with NumPy (where each prompt starts and ends) and read on demand.
+    Only the offsets stay in memory, 8 bytes per prompt; each draw reads its line with os.pread.
+    Surrounding whitespace is trimmed by the index itself; blank lines and lines starting with # are skipped.
+    """
+    CHUNK_SIZE = 1 << 16 # Bytes indexed at a time, which bounds the index build's scratch memory
+    SPACE = np.frombuffer(b" \t\r\n\x0b\x0c", dtype=np.uint8)
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = os.open(path, os.O_RDONLY)
+        try:
+            dtype = np.uint32 if os.fstat(self._fd).st_size < 2 ** 32 else np.uint64
+            starts, ends = [], []
+            offset = 0 # File offset of pending[0]
+            pending = b""
+            while True:
+                block = os.read(self._fd, self.CHUNK_SIZE)
+                pending += block
+                cut = pending.rfind(b"\n") + 1 if block else len(pending) # Index whole lines only
+                if cut:
+                    chunk_starts, chunk_ends = self._index_lines(pending[:cut])
+                    starts.append((chunk_starts + offset).astype(dtype))
+                    ends.append((chunk_ends + offset).astype(dtype))
+                    offset += cut
+                    pending = pending[cut:]
+                if not block:
+                    break
+        except BaseException:
+            os.close(self._fd)
+            raise
+        self.starts = np.concatenate(starts) if starts else np.zeros(0, dtype)
+        self.ends = np.concatenate(ends) if ends else np.zeros(0, dtype)
+
+    @classmethod
+    def _index_lines(cls, chunk):
+        """Returns the (start, end) offsets within chunk of each prompt on its lines."""
+        data = np.frombuffer(chunk, dtype=np.uint8)
+        newlines = np.flatnonzero(data == ord("\n"))
+        line_starts = np.concatenate(([0], newlines + 1))
+        line_ends = np.concatenate((newlines, [len(data)]))
+        # Every non-whitespace byte in the chunk; a line's prompt runs from its first to its last one
+        text = np.flatnonzero(~np.isin(data, cls.SPACE))
+        first = np.searchsorted(text, line_starts)
+        last = np.searchsorted(text, line_ends) - 1
+        keep = first <= last # Lines with no text at all are blank
+        starts = text[first[keep]]
+        ends = text[last[keep]] + 1
+        not_comment = data[starts] != ord("#")
+        return starts[not_comment], ends[not_comment]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def get(self, index):
+        start = int(self.starts[index])
+        # A pack rewritten in place reads short or shifted until the watcher re-indexes it, but never faults
+        return os.pread(self._fd, int(self.ends[index]) - start, start).decode("utf-8", "replace").strip()
+
+    @property
+    def nbytes(self):
+        return self.starts.nbytes + self.ends.nbytes
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+class PromptPool:
+    """Several PromptFiles addressed as one sequence."""
+    def __init__(self, files):
+        self.files = files
+        self.bounds = []  # Cumulative prompt counts, for bisecting a pool index to its file
+        total = 0
+        for prompt_file in files:
+            total += len(prompt_file)
+            self.bounds.append(total)
+
+    def __len__(self):
+        return self.bounds[-1] if self.bounds else 0
+
+    def get(self, index):
+        file_index = bisect.bisect_right(self.bounds, index)
+        offset = self.bounds[file_index - 1] if file_index else 0
+        return self.files[file_index].get(index - offset)
+
+def feistel_permute(index, size, key):
+    """
+    Maps `index` in [0, size) to a unique position in [0, size) via a keyed 4-round Feistel network.
+    Cycle-walking keeps results in range; the padded domain is < 4 * size, so that's O(1) expected.
+    """
+    half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+    mask = (1 << half_bits) - 1
+    x = index
+    while True:
+        left, right = x >> half_bits, x & mask
+        for round_number in range(4):
+            left, right = right, left ^ (splitmix64(right ^ key ^ (round_number << 56)) & mask)
+        x = (left << half_bits) | right
+        if x < size:
+            return x
+
+class ShuffleBag:
+    """
+    Non-repeating draws over a pool: the i-th draw is feistel_permute(i, size, key), so every prompt
+    comes up once before any repeats. The whole state is a key and a position; nothing is materialized.
+    """
+    __slots__ = ("pool_key", "key", "position")
+
+    def __init__(self, pool_key):
+        self.pool_key = pool_key
+        self.key = random.getrandbits(64)
+        self.position = 0
+
+    def draw(self, size):
+        if self.position >= size:
+            self.key = random.getrandbits(64) # Bag exhausted: reshuffle
+            self.position = 0
+        index = feistel_permute(self.position, size, self.key)
+        self.position += 1
+        return index
+
+class PromptLibrary:
+    """
+    Prompt packs from PROMPTS_DIR, laid out as <pack>/<kind>.<rating>.txt.
+    A server picks which packs it uses and the highest content rating it allows (stored in SQLite);
+    each channel draws from its own ShuffleBag. Files are re-indexed when their size or mtime changes,
+    checked every PROMPT_RELOAD_INTERVAL seconds, so packs can be edited without a restart.
+    """
+    KINDS = ("truth", "dare", "neverhaveiever")
+    RATINGS = ("everyone", "teen", "mature") # Each rating includes the ones before it
+
+    def __init__(self, directory, reload_interval, max_bags):
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self.max_bags = max_bags
+        self.files = {}           # (pack, kind, rating) -> PromptFile
+        self.generation = 0       # Bumped on every reload so shuffle bags start over
+        self.guild_settings = {}  # guild_id -> (packs tuple, rating)
+        self._signature = None
+        self._pools = {}          # (packs, rating, kind) -> PromptPool
+        self._bags = OrderedDict() # (channel_id, kind) -> ShuffleBag, least recently used first
+        self._task = None
+
+    @property
+    def packs(self):
+        return sorted({pack for pack, _, _ in self.files})
+
+    def _scan(self):
+        """Returns {(pack, kind, rating): (path, mtime, size)} for every well-formed pack file."""
+        found = {}
+        if not os.path.isdir(self.directory):
+            return found
+        for pack in os.scandir(self.directory):
+            if not pack.is_dir():
+                continue
+            for entry in os.scandir(pack.path):
+                parts = entry.name.split(".")
+                if len(parts) == 3 and parts[0] in self.KINDS and parts[1] in self.RATINGS and parts[2] == "txt":
+                    stat = entry.stat()
+                    found[(pack.name.lower(), parts[0], parts[1])] = (entry.path, stat.st_mtime_ns, stat.st_size)
+        return found
+
+    def _load(self, found):
+        return {key: PromptFile(path) for key, (path, _, _) in found.items()}
+
+    async def reload(self, force=False):
+        """Re-indexes the packs if any file was added, removed or changed. Returns True if it reloaded."""
+        found = await asyncio.to_thread(self._scan)
+        if not force and found == self._signature:
+            return False
+        files = await asyncio.to_thread(self._load, found)
+        old_files, self.files = self.files, files
+        self._signature = found
+        self._pools.clear()
+        self.generation += 1
+        for prompt_file in old_files.values():
+            prompt_file.close()
+        print(f"Loaded {sum(len(f) for f in files.values())} prompts from {len(self.packs)} pack(s).")
+        return True
+
+    def _load_settings(self):
+        self.guild_settings = {
+            guild_id: (tuple(packs.split(",")), rating)
+            for guild_id, packs, rating in storage.fetchall("SELECT guild_id, packs, rating FROM prompt_settings")
+        }
+        self._pools.clear()
+
+    async def start(self):
+        storage.executescript(
+            "CREATE TABLE IF NOT EXISTS prompt_settings ("
+            "  guild_id INTEGER PRIMARY KEY, packs TEXT NOT NULL, rating TEXT NOT NULL);"
+        )
+        self._load_settings()
+        storage.on_external_change(self._load_settings)
+        await self.reload(force=not self.files) # Packs already loaded before an extension reload are kept unless they changed
+        if self.reload_interval > 0 and self._task is None:
+            self._task = background_task(self._watch_forever())
+
+    async def _watch_forever(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.reload()
+            except Exception as e:
+                print(f"Prompt pack reload failed, keeping the previous packs: {e}")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def settings_for(self, guild_id):
+        return self.guild_settings.get(guild_id) or (tuple(PROMPT_DEFAULT_PACKS), PROMPT_DEFAULT_RATING)
+
+    def set_guild_settings(self, guild_id, packs, rating):
+        self.guild_settings[guild_id] = (tuple(packs), rating)
+        return storage.write(
+            "INSERT OR REPLACE INTO prompt_settings (guild_id, packs, rating) VALUES (?, ?, ?)",
+            (guild_id, ",".join(packs), rating)
+        )
+
+    def pool(self, packs, rating, kind):
+        key = (packs, rating, kind)
+        pool = self._pools.get(key)
+        if pool is None:
+            allowed = self.RATINGS[:self.RATINGS.index(rating) + 1] if rating in self.RATINGS else self.RATINGS[:1]
+            pool = PromptPool([
+                self.files[(pack, kind, allowed_rating)]
+                for pack in packs for allowed_rating in allowed
+                if (pack, kind, allowed_rating) in self.files
+            ])
+            self._pools[key] = pool
+        return pool
+
+    def draw(self, channel_id, guild_id, kind):
+        """Returns the next prompt for a channel, or None if its server's packs have none of this kind."""
+        packs, rating = self.settings_for(guild_id)
+        pool = self.pool(packs, rating, kind)
+        size = len(pool)
+        if not size:
+            return None
+
+        bag_key = (channel_id, kind)
+        pool_key = (packs, rating, self.generation)
+        bag = self._bags.get(bag_key)
+        if bag is None or bag.pool_key != pool_key:
+            bag = self._bags[bag_key] = ShuffleBag(pool_key)
+        self._bags.move_to_end(bag_key)
+        while len(self._bags) > self.max_bags:
+            self._bags.popitem(last=False)
+        return pool.get(bag.draw(size))
+
+    def stats(self):
+        return {
+            "packs": len(self.packs),
+            "prompts": sum(len(f) for f in self.files.values()),
+            "index_bytes": sum(f.nbytes for f in self.files.values()),
+            "bags": len(self._bags),
+        }
+
+prompt_library = shared("prompt_library", lambda: PromptLibrary(PROMPTS_DIR, PROMPT_RELOAD_INTERVAL, PROMPT_MAX_BAGS))
+
+async def send_prompt(interaction, kind, label):
+    prompt = prompt_library.draw(interaction.channel_id, interaction.guild_id, kind)
+    if prompt is None:
+        return await interaction.response.send_message(
+            "There are no prompts of this kind in this server's prompt packs. An admin can change them with `/promptconfig set`.",
+            ephemeral=True
+        )
+    await interaction.response.send_message(f"**{label}:** {prompt}", ephemeral=False)
+
+# --- New Command: /truth ---
+@bot.tree.command(name="truth", description="Get a random truth question.")
+async def truth(interaction: discord.Interaction):
+    """
+    Sends a random 'truth' question, without repeats until the channel has seen them all.
+    """
+    await send_prompt(interaction, "truth", "Truth")
+
+# --- New Command: /dare ---
+@bot.tree.command(name="dare", description="Get a random dare challenge.")
+async def dare(interaction: discord.Interaction):
+    """
+    Sends a random 'dare' challenge, without repeats until the channel has seen them all.
+    """
+    await send_prompt(interaction, "dare", "Dare")
+
+# --- New Command: /neverhaveiever ---
+@bot.tree.command(name="neverhaveiever", description="Play a 'Never Have I Ever' statement.")
+async def neverhaveiever(interaction: discord.Interaction):
+    """
+    Sends a random 'Never Have I Ever' statement, without repeats until the channel has seen them all.
+    """
+    await send_prompt(interaction, "neverhaveiever", "Never Have I Ever")
+
+# --- Command Group: /promptconfig (Admin Only) ---
+PROMPT_RATING_CHOICES = [
+    app_commands.Choice(name="Everyone", value="everyone"),
+    app_commands.Choice(name="Teen", value="teen"),
+    app_commands.Choice(name="Mature", value="mature"),
+]
+
+prompt_config = app_commands.Group(
+    name="promptconfig",
+    description="Choose the truth/dare/never-have-I-ever prompt packs for this server.",
+    guild_only=True,
+    default_permissions=discord.Permissions(manage_guild=True)
+)
+
+@prompt_config.command(name="set", description="Choose prompt packs and the highest content rating for this server.")
+@app_commands.checks.has_permissions(manage_guild=True) # Requires Manage Server permission
+@app_commands.describe(packs="Comma-separated pack names (see /promptconfig show).", rating="Highest content rating to include.")
+@app_commands.choices(rating=PROMPT_RATING_CHOICES)
+async def promptconfig_set(interaction: discord.Interaction, packs: str, rating: app_commands.Choice[str]):
+    """
+    Saves this server's prompt packs and content rating.
+    """
+    chosen = []
+    for pack in packs.split(","):
+        pack = pack.strip().lower()
+        if pack and pack not in chosen:
+            chosen.append(pack)
+    unknown = [pack for pack in chosen if pack not in prompt_library.packs]
+    if not chosen or unknown:
+        available = ", ".join(f"`{pack}`" for pack in prompt_library.packs) or "none"
+        return await interaction.response.send_message(f"Unknown pack(s): {', '.join(unknown) or '(none given)'}. Available packs: {available}.", ephemeral=True)
+
+    prompt_library.set_guild_settings(interaction.guild_id, chosen, rating.value)
+    await interaction.response.send_message(f"This server now uses **{', '.join(chosen)}** prompts rated up to **{rating.name}**.", ephemeral=True)
+
+@prompt_config.command(name="show", description="Show this server's prompt packs and the packs available.")
+@app_commands.checks.has_permissions(manage_guild=True) # Requires Manage Server permission
+async def promptconfig_show(interaction: discord.Interaction):
+    """
+    Lists the packs this server uses and every pack that's installed.
+    """
+    packs, rating = prompt_library.settings_for(interaction.guild_id)
+    lines = [f"This server uses **{', '.join(packs)}** prompts rated up to **{rating}**.", "", "Available packs:"]
+    for pack in prompt_library.packs:
+        counts = [f"{len(prompt_library.pool((pack,), 'mature', kind))} {kind}" for kind in PromptLibrary.KINDS]
+        lines.append(f"- `{pack}`: {', '.join(counts)}")
+    await interaction.response.send_message("\n".join(lines), ephemeral=True)
+
+bot.tree.add_command(prompt_config)
+
+# --- New Command: /clickgame ---
+@bot.tree.command(name="clickgame", description="A simple click-based mini-game.")
+async def clickgame(interaction: discord.Interaction):
+    """
+    Starts a simple mini-game where the user clicks a button.
+    """
+    view = discord.ui.View(timeout=30) # Set a timeout for the view (e.g., 30 seconds)
+    button = discord.ui.Button(label="Click Me!", style=discord.ButtonStyle.primary)
+
+    async def button_callback(button_interaction: discord.Interaction):
+        if button_interaction.user.id == interaction.user.id:
+            await button_interaction.response.send_message(f"You clicked it! Good job!", ephemeral=True)
+            view.stop() # Stop listening after one click
+        else:
+            await button_interaction.response.send_message("This isn't your game!", ephemeral=True)
+
+    button.callback = button_callback
+    view.add_item(button)
+
+    await interaction.response.send_message("Test your reflexes! Click the button!", view=view, ephemeral=False)
+    # The view will timeout after 180 seconds by default if no interaction occurs.
+
+
+# --- Extension Setup ---
+async def setup(bot):
+    await prompt_library.start()
+
+async def teardown(bot):
+    prompt_library.stop()
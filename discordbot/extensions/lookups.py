@@ -0,0 +1,1420 @@
+"""
+Commands backed by external APIs: /gag-stock, /lyrics, /currencyconvert, /imagegenerate,
+/roblox, /fortnite and /fortnitecompare, plus the caches and queues in front of those APIs.
+"""
+import discord
+from discord import app_commands
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import unicodedata
+import zlib
+import aiohttp
+from collections import OrderedDict
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from bot import (
+    CURRENCY_API_KEY, CURRENCY_API_URL, CURRENCY_BASE, CURRENCY_MAX_TARGETS, CURRENCY_RATES_TTL,
+    DATA_DIR, FORTNITE_API_KEY, FORTNITE_API_URL, FORTNITE_CACHE_TTL, FORTNITE_COMPARE_CONCURRENCY,
+    FORTNITE_COMPARE_MAX, GAG_STOCK_API_URL, GAG_STOCK_POLL_INTERVAL, IMAGE_CACHE_MAX_BYTES,
+    IMAGE_GEN_API_KEY, IMAGE_GEN_API_URL, IMAGE_GEN_MAX_JOBS_PER_USER, IMAGE_GEN_MAX_QUEUE,
+    IMAGE_GEN_WORKERS, LYRICS_API_URL, LYRICS_MEMORY_CACHE_BYTES, LYRICS_PAGE_CHARS, MISSING,
+    ROBLOX_AUTOCOMPLETE_NAMES, ROBLOX_BATCH_WINDOW, ROBLOX_ID_CACHE_TTL, ROBLOX_PROFILE_CACHE_TTL,
+    ROBLOX_USERS_API_URL, autocomplete_choices, background_task, bot, currency_upstream, current_interaction,
+    debug_group, format_age, fortnite_upstream, gag_stock_upstream, image_gen_upstream,
+    lyrics_upstream, metrics, normalize_search_text, open_sqlite, PrefixIndex, roblox_upstream,
+    send_response, shared, SingleFlight, snapshots, TTLCache,
+)
+
+
+# --- Gag Stock Cache ---
+def format_stock_list(items_data):
+    """Helper to format stock items into a readable string."""
+    if not isinstance(items_data, list):
+        print(f"Warning: Expected a list for stock items, got {type(items_data)}")
+        return "Data format error" 
+    if not items_data:
+        return "None in stock"
+    
+    formatted_items = []
+    for item in items_data:
+        if isinstance(item, dict) and 'name' in item and 'value' in item:
+            name = item['name']
+            value = item['value']
+            formatted_items.append(f"- {name} ({value})")
+        else:
+            print(f"Skipping malformed item in stock list: {item}")
+    
+    if not formatted_items:
+        return "None in stock (or all items malformed)" 
+    
+    return "\n".join(formatted_items)
+
+class GagStockCache:
+    """
+    Keeps the last good /gag-stock snapshot in memory.
+    A background task polls GAG_STOCK_API_URL every GAG_STOCK_POLL_INTERVAL seconds,
+    so the command itself never touches the network once the first poll has succeeded.
+    If the API goes down, the previous snapshot keeps being served with its age.
+    Only cluster 0 polls; the other clusters pick up its snapshot from the shared SnapshotStore.
+    """
+    SNAPSHOT = "gag_stock"
+
+    def __init__(self, url, interval):
+        self.url = url
+        self.interval = interval
+        self.seeds = None   # Pre-formatted format_stock_list() output for each stock type
+        self.eggs = None
+        self.gear = None
+        self.fetched_at = None      # datetime (UTC) of the last good snapshot
+        self._fetched_monotonic = 0.0
+        self.last_error = None      # Error from the most recent failed poll, cleared on success
+        self._refresh_lock = asyncio.Lock()
+        self._task = None
+
+    @property
+    def has_data(self):
+        return self.fetched_at is not None
+
+    def age(self):
+        """Seconds since the last good snapshot."""
+        return time.monotonic() - self._fetched_monotonic
+
+    def is_stale(self):
+        return self.last_error is not None or self.age() > self.interval * 2
+
+    async def refresh(self):
+        """Fetches the stock endpoint once and replaces the snapshot. Concurrent callers share one request."""
+        async with self._refresh_lock:
+            try:
+                async with gag_stock_upstream.get(self.url) as response:
+                    response.raise_for_status() # Raises an exception for HTTP errors (4xx or 5xx)
+                    data = await response.json()
+
+                snapshot = {
+                    "seeds": format_stock_list(data.get('seedsStock', [])),
+                    "eggs": format_stock_list(data.get('eggStock', [])),
+                    "gear": format_stock_list(data.get('gearStock', [])),
+                }
+                fetched_at = time.time()
+                self._apply(snapshot, fetched_at)
+            except Exception as e:
+                self.last_error = e
+                raise
+        try:
+            await asyncio.to_thread(snapshots.save, self.SNAPSHOT, snapshot, fetched_at)
+        except sqlite3.Error as e:
+            print(f"Failed to share the gag stock snapshot: {e}")
+
+    def _apply(self, snapshot, fetched_at):
+        self.seeds = snapshot["seeds"]
+        self.eggs = snapshot["eggs"]
+        self.gear = snapshot["gear"]
+        self.fetched_at = datetime.fromtimestamp(fetched_at, timezone.utc)
+        self._fetched_monotonic = time.monotonic() - max(0.0, time.time() - fetched_at)
+        self.last_error = None
+
+    async def load_shared(self):
+        """Adopts the snapshot another cluster saved, if it is newer than ours."""
+        try:
+            found = await asyncio.to_thread(snapshots.load, self.SNAPSHOT)
+        except sqlite3.Error as e:
+            print(f"Failed to read the shared gag stock snapshot: {e}")
+            return
+        if found is not None and (not self.has_data or found[1] > self.fetched_at.timestamp()):
+            self._apply(*found)
+
+    async def ensure_data(self):
+        """Waits for a first snapshot if the poller hasn't produced one yet (e.g. right after startup)."""
+        if not self.has_data:
+            async with self._refresh_lock:
+                pass # Wait out a refresh that is already in flight
+            if not self.has_data:
+                await self.load_shared()
+            if not self.has_data:
+                await self.refresh()
+
+    async def _poll_forever(self):
+        while True:
+            if not snapshots.is_leader:
+                await self.load_shared()
+                await asyncio.sleep(self.interval / 4) # Stay within a quarter interval of cluster 0's copy
+                continue
+            try:
+                await self.refresh()
+            except Exception as e:
+                if self.has_data:
+                    print(f"Gag stock poll failed, serving cached data from {format_age(self.age())} ago: {e}")
+                else:
+                    print(f"Gag stock poll failed, no cached data yet: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = background_task(self._poll_forever())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+gag_stock_cache = shared("gag_stock_cache", lambda: GagStockCache(GAG_STOCK_API_URL, GAG_STOCK_POLL_INTERVAL))
+
+# --- Slash Command: /gag-stock ---
+@bot.tree.command(name="gag-stock", description="Get the current stock levels for various gags.")
+async def gag_stock(interaction: discord.Interaction):
+    """
+    Displays current stock levels from the Grow A Garden API.
+    Served from the in-memory snapshot kept up to date by GagStockCache.
+    """
+    if not gag_stock_cache.has_data:
+        # Only happens before the first successful poll; wait for one fetch instead of failing.
+        try:
+            await interaction.response.defer(ephemeral=True)
+        except discord.errors.NotFound:
+            print("Failed to defer interaction for /gag-stock. It might have expired or been responded to already.")
+            return
+
+        try:
+            await gag_stock_cache.ensure_data()
+        except aiohttp.ClientError as e:
+            print(f"API request failed: {e}\n{traceback.format_exc()}")
+            return await interaction.followup.send(
+                "Failed to retrieve stock information. The API might be down or unreachable. Please try again later.",
+                ephemeral=True
+            )
+        except Exception as e:
+            print(f"An unexpected error occurred in /gag-stock: {e}\n{traceback.format_exc()}")
+            return await interaction.followup.send(
+                "An unexpected error occurred while fetching gag stock. Please try again later.",
+                ephemeral=True
+            )
+
+    embed = discord.Embed(
+        title="Gag Stock Information",
+        color=discord.Color.dark_grey(),
+        timestamp=gag_stock_cache.fetched_at
+    )
+
+    embed.add_field(name="Seed Stock", value=gag_stock_cache.seeds, inline=True)
+    embed.add_field(name="Egg Stock", value=gag_stock_cache.eggs, inline=True)
+    embed.add_field(name="Gear Stock", value=gag_stock_cache.gear, inline=True)
+
+    age = format_age(gag_stock_cache.age())
+    if gag_stock_cache.is_stale():
+        embed.set_footer(text=f"⚠️ Stock API unavailable, showing data from {age} ago")
+    else:
+        embed.set_footer(text=f"Updated {age} ago")
+
+    await send_response(interaction, embed=embed, ephemeral=True)
+
+# --- Lyrics Cache ---
+class LyricsAPIError(Exception):
+    """Raised when lyrics.ovh answers with an unexpected status code."""
+    def __init__(self, status):
+        super().__init__(f"lyrics.ovh returned HTTP {status}")
+        self.status = status
+
+def normalize_lyrics_key(artist, title):
+    """
+    Builds the cache key for a song: case-folded, punctuation stripped, whitespace collapsed.
+    'The Beatles', 'the beatles!' and '  THE  BEATLES ' all map to the same key.
+    """
+    return f"{normalize_search_text(artist)}\x1f{normalize_search_text(title)}"
+
+class LyricsCache:
+    """
+    Two-tier lyrics cache: an in-memory LRU bounded by LYRICS_MEMORY_CACHE_BYTES in front of
+    a SQLite table in DATA_DIR. Texts are kept zlib-compressed in both tiers, and concurrent
+    requests for the same song share one lyrics.ovh request.
+    """
+    def __init__(self, path, memory_budget):
+        self.path = path
+        self.memory_budget = memory_budget
+        self._memory = OrderedDict() # key -> compressed lyrics, most recently used last
+        self._memory_bytes = 0
+        self._db = None
+        self._db_lock = threading.Lock() # sqlite3 connections aren't safe to share between threads without it
+        self._inflight = SingleFlight()
+        # Autocomplete indexes over every song with stored lyrics
+        self.artists = PrefixIndex()  # normalized artist -> artist
+        self.titles = PrefixIndex()   # normalized title -> title
+        self.songs = PrefixIndex()    # song key (normalized artist + title) -> title
+
+    def open(self):
+        self._db = open_sqlite(self.path)
+        with self._db_lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS lyrics ("
+                "key TEXT PRIMARY KEY, artist TEXT NOT NULL, title TEXT NOT NULL, "
+                "body BLOB NOT NULL, fetched_at REAL NOT NULL)"
+            )
+            rows = self._db.execute("SELECT key, artist, title FROM lyrics ORDER BY fetched_at").fetchall()
+        self.artists = PrefixIndex((normalize_search_text(artist), artist) for _, artist, _ in rows)
+        self.titles = PrefixIndex((normalize_search_text(title), title) for _, _, title in rows)
+        self.songs = PrefixIndex((key, title) for key, _, title in rows)
+
+    def _index_song(self, key, artist, title):
+        self.artists.add(normalize_search_text(artist), artist)
+        self.titles.add(normalize_search_text(title), title)
+        self.songs.add(key, title)
+
+    def suggest_artists(self, current, limit=25):
+        return self.artists.search(normalize_search_text(current), limit)
+
+    def suggest_titles(self, artist, current, limit=25):
+        """Titles starting with `current`, limited to the given artist's songs when one is set."""
+        if artist and artist.strip():
+            return self.songs.search(normalize_lyrics_key(artist, current), limit)
+        return self.titles.search(normalize_search_text(current), limit)
+
+    def close(self):
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+    def __len__(self):
+        return len(self._memory)
+
+    @property
+    def nbytes(self):
+        """Compressed lyrics held in memory."""
+        return self._memory_bytes
+
+    def _remember(self, key, blob):
+        """Adds a compressed text to the in-memory LRU, evicting the least recently used entries."""
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        if len(blob) > self.memory_budget:
+            return
+        self._memory[key] = blob
+        self._memory_bytes += len(blob)
+        while self._memory_bytes > self.memory_budget:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _db_load(self, key):
+        with self._db_lock:
+            row = self._db.execute("SELECT body FROM lyrics WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _db_song_id(self, key):
+        with self._db_lock:
+            row = self._db.execute("SELECT rowid FROM lyrics WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _db_song(self, song_id):
+        with self._db_lock:
+            return self._db.execute("SELECT artist, title FROM lyrics WHERE rowid = ?", (song_id,)).fetchone()
+
+    async def song_id(self, artist, title):
+        """Returns the stored row ID for a song, used to refer to it from message components."""
+        if self._db is None:
+            return None
+        return await asyncio.to_thread(self._db_song_id, normalize_lyrics_key(artist, title))
+
+    async def get_song(self, song_id):
+        """Returns (artist, title, lyrics text) for a stored row ID, or None if the row is gone."""
+        if self._db is None:
+            return None
+        row = await asyncio.to_thread(self._db_song, song_id)
+        if row is None:
+            return None
+        artist, title = row
+        return artist, title, await self.get(artist, title)
+
+    def _db_store(self, key, artist, title, blob):
+        with self._db_lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO lyrics (key, artist, title, body, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (key, artist, title, blob, time.time())
+            )
+
+    async def _fetch(self, key, artist, title):
+        """Downloads lyrics from lyrics.ovh and stores them in both tiers. Returns the compressed text or None."""
+        lyrics_url = f"{LYRICS_API_URL}/{quote(artist, safe='')}/{quote(title, safe='')}"
+        async with lyrics_upstream.get(lyrics_url) as response:
+            if response.status == 404:
+                return None
+            if response.status != 200:
+                raise LyricsAPIError(response.status)
+            data = await response.json()
+
+        lyrics_text = data.get('lyrics')
+        if not lyrics_text:
+            return None
+        blob = zlib.compress(lyrics_text.encode("utf-8"))
+        self._remember(key, blob)
+        await asyncio.to_thread(self._db_store, key, artist, title, blob)
+        self._index_song(key, artist, title)
+        return blob
+
+    async def get_compressed(self, artist, title):
+        """Returns the zlib-compressed lyrics for a song, or None if lyrics.ovh has none."""
+        key = normalize_lyrics_key(artist, title)
+        blob = self._memory.get(key)
+        metrics.cache_result("lyrics_memory", blob is not None)
+        if blob is not None:
+            self._memory.move_to_end(key)
+            return blob
+
+        if self._db is not None:
+            blob = await asyncio.to_thread(self._db_load, key)
+            metrics.cache_result("lyrics_disk", blob is not None)
+            if blob is not None:
+                self._remember(key, blob)
+                return blob
+
+        return await self._inflight.do(key, lambda: self._fetch(key, artist, title))
+
+    async def get(self, artist, title):
+        """Returns the lyrics text for a song, or None if lyrics.ovh has none."""
+        blob = await self.get_compressed(artist, title)
+        return zlib.decompress(blob).decode("utf-8") if blob is not None else None
+
+lyrics_cache = shared("lyrics_cache", lambda: LyricsCache(os.path.join(DATA_DIR, "lyrics.sqlite3"), LYRICS_MEMORY_CACHE_BYTES))
+
+# --- Lyrics Pages ---
+def lyrics_page_offsets(text, limit=LYRICS_PAGE_CHARS):
+    """
+    Splits lyrics into pages of at most `limit` characters, breaking between lines.
+    A single line longer than a page is hard-split. Returns a list of (start, end) offsets into `text`.
+    """
+    pages = []
+    start = end = 0
+    length = len(text)
+    while end < length:
+        newline = text.find("\n", end)
+        line_end = length if newline == -1 else newline + 1
+        if line_end - start <= limit:
+            end = line_end
+            continue
+        if end > start: # Page is full; the current line starts the next one
+            pages.append((start, end))
+            start = end
+        else: # Line alone is longer than a page
+            end = start + limit
+            pages.append((start, end))
+            start = end
+    if end > start or not pages:
+        pages.append((start, end))
+    return pages
+
+def lyrics_page_embed(artist, title, text, page):
+    """Renders one page of lyrics. `page` is clamped to the valid range. Returns (embed, page, page_count)."""
+    offsets = lyrics_page_offsets(text)
+    page = max(0, min(page, len(offsets) - 1))
+    start, end = offsets[page]
+    embed = discord.Embed(
+        title=f"Lyrics for {title} by {artist}",
+        description=text[start:end],
+        color=discord.Color.blue()
+    )
+    if len(offsets) > 1:
+        embed.set_footer(text=f"Page {page + 1}/{len(offsets)}")
+    return embed, page, len(offsets)
+
+class LyricsPageButton(discord.ui.DynamicItem[discord.ui.Button], template=r"lyrics:(?P<song>\d+):(?P<page>\d+)"):
+    """
+    Prev/next button for a lyrics message. All state lives in the custom_id (song row ID and
+    the page it leads to), so open lyrics messages cost no memory and keep working across restarts.
+    Pages are rendered on click from the cached compressed text.
+    """
+    def __init__(self, song_id, page, label, disabled=False):
+        super().__init__(discord.ui.Button(
+            label=label,
+            style=discord.ButtonStyle.secondary,
+            disabled=disabled,
+            custom_id=f"lyrics:{song_id}:{page}"
+        ))
+        self.song_id = song_id
+        self.page = page
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match["song"]), int(match["page"]), item.label)
+
+    async def callback(self, interaction: discord.Interaction):
+        song = await lyrics_cache.get_song(self.song_id)
+        if song is None or song[2] is None:
+            await interaction.response.send_message("These lyrics are no longer cached. Run `/lyrics` again.", ephemeral=True)
+            return
+        artist, title, text = song
+        embed, page, page_count = lyrics_page_embed(artist, title, text, self.page)
+        await interaction.response.edit_message(embed=embed, view=lyrics_page_view(self.song_id, page, page_count))
+
+def lyrics_page_view(song_id, page, page_count):
+    """Builds the prev/next buttons for a page, or None when everything fits on one page."""
+    if page_count <= 1:
+        return None
+    view = discord.ui.View(timeout=None) # Fully dynamic: discord.py keeps nothing per message
+    view.add_item(LyricsPageButton(song_id, max(page - 1, 0), "Previous", disabled=page == 0))
+    view.add_item(LyricsPageButton(song_id, min(page + 1, page_count - 1), "Next", disabled=page == page_count - 1))
+    return view
+
+# --- New Command: /lyrics ---
+@bot.tree.command(name="lyrics", description="Get lyrics for a song.")
+@app_commands.describe(artist="The artist's name.", title="The song title.")
+async def lyrics(interaction: discord.Interaction, artist: str, title: str):
+    """
+    Displays lyrics for a given song and artist, split into pages with prev/next buttons.
+    Served from LyricsCache; only songs that were never requested before hit the Lyrics.ovh API.
+    """
+    await interaction.response.defer(ephemeral=False)
+    
+    try:
+        lyrics_text = await lyrics_cache.get(artist, title)
+        if lyrics_text:
+            embed, page, page_count = lyrics_page_embed(artist, title, lyrics_text, 0)
+            view = None
+            if page_count > 1:
+                song_id = await lyrics_cache.song_id(artist, title)
+                if song_id is not None:
+                    view = lyrics_page_view(song_id, page, page_count)
+            if view is None:
+                await interaction.followup.send(embed=embed, ephemeral=False)
+            else:
+                await interaction.followup.send(embed=embed, view=view, ephemeral=False)
+        else:
+            await interaction.followup.send(f"Lyrics not found for **{title}** by **{artist}**. Please check the spelling.", ephemeral=False)
+    except LyricsAPIError as e:
+        await interaction.followup.send(f"An error occurred while fetching lyrics. Status code: {e.status}", ephemeral=False)
+    except Exception as e:
+        print(f"Error fetching lyrics: {e}\n{traceback.format_exc()}")
+        await interaction.followup.send("An unexpected error occurred while trying to get lyrics. The lyrics API might be down or unreachable.", ephemeral=False)
+
+@lyrics.autocomplete("artist")
+async def lyrics_artist_autocomplete(interaction: discord.Interaction, current: str):
+    """Suggests artists whose lyrics are already cached; never calls lyrics.ovh."""
+    return autocomplete_choices(lyrics_cache.suggest_artists(current))
+
+@lyrics.autocomplete("title")
+async def lyrics_title_autocomplete(interaction: discord.Interaction, current: str):
+    """Suggests cached song titles, narrowed to the chosen artist's songs."""
+    return autocomplete_choices(lyrics_cache.suggest_titles(interaction.namespace.artist, current))
+
+# --- Currency Rate Store ---
+class CurrencyAPIError(Exception):
+    """Raised when exchangerate-api answers with a non-success result."""
+
+class CurrencyRateStore:
+    """
+    Caches one exchangerate-api table for CURRENCY_BASE and converts any pair locally.
+    The table is refreshed in the background every CURRENCY_RATES_TTL seconds, and on demand
+    if it has expired. A failed refresh keeps serving the previous table.
+    Only cluster 0 refreshes in the background; the other clusters read its table from the SnapshotStore.
+    """
+    def __init__(self, base, ttl):
+        self.base = base
+        self.ttl = ttl
+        self.rates = None           # {currency_code: units per 1 base currency}
+        self.codes = PrefixIndex()  # Currency codes in the table, for autocomplete
+        self.fetched_at = None      # datetime (UTC) of the last good table
+        self._fetched_monotonic = 0.0
+        self._refresh_lock = asyncio.Lock()
+        self._task = None
+
+    @property
+    def snapshot_name(self):
+        return f"currency_rates:{self.base}"
+
+    @property
+    def has_data(self):
+        return self.rates is not None
+
+    def is_expired(self):
+        return not self.has_data or time.monotonic() - self._fetched_monotonic > self.ttl
+
+    async def refresh(self):
+        """Downloads the base table once. Concurrent callers share one request."""
+        async with self._refresh_lock:
+            # The API key is part of the URL path
+            api_url = f"{CURRENCY_API_URL}/{CURRENCY_API_KEY}/latest/{self.base}"
+            async with currency_upstream.get(api_url) as response:
+                response.raise_for_status()
+                data = await response.json()
+
+            if data.get('result') != 'success' or not data.get('conversion_rates'):
+                raise CurrencyAPIError(data.get('error-type', 'Unknown error'))
+
+            rates = {code.upper(): rate for code, rate in data['conversion_rates'].items()}
+            fetched_at = time.time()
+            self._apply(rates, fetched_at)
+        try:
+            await asyncio.to_thread(snapshots.save, self.snapshot_name, rates, fetched_at)
+        except sqlite3.Error as e:
+            print(f"Failed to share the currency rate table: {e}")
+
+    def _apply(self, rates, fetched_at):
+        self.rates = rates
+        self.codes = PrefixIndex((code, code) for code in rates)
+        self.fetched_at = datetime.fromtimestamp(fetched_at, timezone.utc)
+        self._fetched_monotonic = time.monotonic() - max(0.0, time.time() - fetched_at)
+
+    async def load_shared(self):
+        """Adopts the table another cluster saved, if it is newer than ours."""
+        try:
+            found = await asyncio.to_thread(snapshots.load, self.snapshot_name)
+        except sqlite3.Error as e:
+            print(f"Failed to read the shared currency rate table: {e}")
+            return
+        if found is not None and (not self.has_data or found[1] > self.fetched_at.timestamp()):
+            self._apply(*found)
+
+    async def ensure_fresh(self):
+        """Refreshes the table if it has expired. Falls back to the stale table if the refresh fails."""
+        if not self.is_expired():
+            return
+        async with self._refresh_lock:
+            pass # Wait out a refresh that is already in flight
+        if not self.is_expired():
+            return
+        await self.load_shared()
+        if not self.is_expired():
+            return
+        try:
+            await self.refresh()
+        except Exception as e:
+            if not self.has_data:
+                raise
+            print(f"Currency rate refresh failed, serving stale rates: {e}")
+
+    def convert(self, amount, from_currency, to_currency):
+        """
+        Converts between any two currencies in the table by triangulating through the base.
+        Raises KeyError with the unknown code if either currency is missing.
+        """
+        for code in (from_currency, to_currency):
+            if code not in self.rates:
+                raise KeyError(code)
+        return amount * self.rates[to_currency] / self.rates[from_currency]
+
+    async def _poll_forever(self):
+        while True:
+            if not snapshots.is_leader:
+                await self.load_shared()
+                await asyncio.sleep(self.ttl / 4) # Stay within a quarter TTL of cluster 0's table
+                continue
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Currency rate refresh failed: {e}")
+            await asyncio.sleep(self.ttl)
+
+    def start(self):
+        if CURRENCY_API_KEY and (self._task is None or self._task.done()):
+            self._task = background_task(self._poll_forever())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+currency_rates = shared("currency_rates", lambda: CurrencyRateStore(CURRENCY_BASE, CURRENCY_RATES_TTL))
+
+def parse_currency_codes(text):
+    """Splits a user-supplied list like 'eur, jpy gbp' into unique upper-case codes, keeping order."""
+    codes = []
+    for code in text.replace(",", " ").split():
+        code = code.strip().upper()
+        if code and code not in codes:
+            codes.append(code)
+    return codes
+
+# --- New Command: /currencyconvert ---
+@bot.tree.command(name="currencyconvert", description="Convert currencies.")
+@app_commands.describe(amount="The amount to convert.", from_currency="The currency code to convert from (e.g., USD, EUR).", to_currency="The currency code(s) to convert to (e.g., JPY, or 'EUR, GBP, JPY' for several).")
+async def currencyconvert(interaction: discord.Interaction, amount: float, from_currency: str, to_currency: str):
+    """
+    Converts a given amount from one currency to one or more others.
+    Rates come from the cached CurrencyRateStore table, so most calls make no API request.
+    """
+    # Check if API key is properly configured
+    if not CURRENCY_API_KEY:
+        return await interaction.response.send_message("Currency conversion API key is not configured. Please contact the bot owner.", ephemeral=True)
+
+    from_currency = from_currency.strip().upper()
+    targets = parse_currency_codes(to_currency)
+    if not targets:
+        return await interaction.response.send_message("Please provide at least one currency code to convert to (e.g., EUR).", ephemeral=True)
+    if len(targets) > CURRENCY_MAX_TARGETS:
+        return await interaction.response.send_message(f"You can convert to at most {CURRENCY_MAX_TARGETS} currencies at once.", ephemeral=True)
+
+    if currency_rates.is_expired():
+        # Only hits the network when the cached table is missing or older than CURRENCY_RATES_TTL
+        await interaction.response.defer(ephemeral=False)
+        try:
+            await currency_rates.ensure_fresh()
+        except CurrencyAPIError as e:
+            return await interaction.followup.send(f"Currency conversion failed: {e}. Please check your API key.", ephemeral=False)
+        except aiohttp.ClientError as e:
+            print(f"API request failed for currency conversion: {e}\n{traceback.format_exc()}")
+            return await interaction.followup.send("Failed to retrieve currency rates. The API might be down or unreachable or your API key is invalid.", ephemeral=False)
+        except Exception as e:
+            print(f"An unexpected error occurred in /currencyconvert: {e}\n{traceback.format_exc()}")
+            return await interaction.followup.send("An unexpected error occurred during currency conversion.", ephemeral=False)
+
+    if from_currency not in currency_rates.rates:
+        message = f"Could not find exchange rate for `{from_currency}`. Please check the currency codes (e.g., USD, EUR)."
+    elif len(targets) == 1:
+        try:
+            converted_amount = currency_rates.convert(amount, from_currency, targets[0])
+            message = f"{amount:,.2f} {from_currency} is **{converted_amount:,.2f} {targets[0]}**."
+        except KeyError:
+            message = f"Could not find exchange rate for `{targets[0]}`. Please check the currency codes (e.g., USD, EUR)."
+    else:
+        lines = [f"{amount:,.2f} {from_currency} is:"]
+        unknown = []
+        for code in targets:
+            try:
+                lines.append(f"- **{currency_rates.convert(amount, from_currency, code):,.2f} {code}**")
+            except KeyError:
+                unknown.append(f"`{code}`")
+        if unknown:
+            lines.append(f"Could not find exchange rates for {', '.join(unknown)}.")
+        message = "\n".join(lines)
+
+    await send_response(interaction, message, ephemeral=False)
+
+@currencyconvert.autocomplete("from_currency")
+async def from_currency_autocomplete(interaction: discord.Interaction, current: str):
+    """Suggests codes from the cached rate table; never calls the currency API."""
+    return autocomplete_choices(currency_rates.codes.search(current.strip().upper()))
+
+@currencyconvert.autocomplete("to_currency")
+async def to_currency_autocomplete(interaction: discord.Interaction, current: str):
+    """Completes the last code of a comma-separated list, keeping the codes already typed."""
+    head, _, last = current.rpartition(",")
+    typed = parse_currency_codes(head)
+    prefix = ", ".join(typed + [""]) if typed else ""
+    suggestions = [code for code in currency_rates.codes.search(last.strip().upper(), 25 + len(typed)) if code not in typed]
+    return autocomplete_choices(prefix + code for code in suggestions[:25])
+
+# --- Image Generation Queue ---
+def build_image_payload(prompt):
+    """Request body for the image API. Example payload for Stability AI's SDXL (check docs for exact parameters)."""
+    return {
+        "text_prompts": [{"text": prompt}],
+        "cfg_scale": 7, # Controls how much the prompt is adhered to
+        "height": 512,  # Image height
+        "width": 512,   # Image width
+        "samples": 1,   # Number of images to generate (keep to 1 for free tier/simplicity)
+        "steps": 30,    # Number of steps for generation
+    }
+
+def decode_image_response(raw):
+    """
+    Parses the image API's JSON response and decodes the first artifact.
+    Returns (png_bytes, None) for base64 artifacts, (None, url) for URL artifacts, or (None, None).
+    This is CPU-heavy for multi-megabyte responses, so it's run in a worker thread.
+    """
+    data = json.loads(raw)
+    # --- IMPORTANT: Parsing the response depends on your chosen API ---
+    # Example for Stability AI, which often returns base64 encoded images:
+    if data and data.get('artifacts'):
+        artifact = data['artifacts'][0]
+        # Check if the image is base64 encoded
+        if 'base64' in artifact:
+            return base64.b64decode(artifact['base64']), None
+        # Or if a direct URL is provided by the API (less common for direct generation)
+        if 'url' in artifact:
+            return None, artifact['url']
+    return None, None
+
+class ImageCache:
+    """
+    Content-addressed on-disk cache of generated PNGs.
+    Files are named after a SHA-256 of the normalized prompt plus every generation parameter,
+    so a repeat prompt is served from disk without calling the image API. Total size is capped at
+    IMAGE_CACHE_MAX_BYTES, evicting the least recently used files (tracked by mtime across restarts).
+    """
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index = OrderedDict() # digest -> file size, least recently used first
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.generations = 0          # API generations stored in the cache, and their total duration,
+        self.generation_seconds = 0.0 # used to estimate the latency saved per hit
+
+    @staticmethod
+    def key_for(prompt, payload):
+        normalized_prompt = " ".join(unicodedata.normalize("NFKC", prompt).casefold().split())
+        params = {k: v for k, v in payload.items() if k != "text_prompts"}
+        material = json.dumps({"api": IMAGE_GEN_API_URL, "prompt": normalized_prompt, "params": params}, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def __contains__(self, digest):
+        return digest in self._index
+
+    def _path(self, digest):
+        return os.path.join(self.directory, f"{digest}.png")
+
+    def open(self):
+        """Builds the LRU index from the files already on disk."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._index.clear() # Opened again when the extension is reloaded
+        self._total_bytes = 0
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".png"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        for _, digest, size in sorted(entries):
+            self._index[digest] = size
+            self._total_bytes += size
+
+    async def get(self, digest):
+        """Returns cached PNG bytes, or None on a miss."""
+        def read():
+            path = self._path(digest)
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path) # Bump mtime so LRU order survives restarts
+            return data
+
+        try:
+            data = await asyncio.to_thread(read)
+        except FileNotFoundError:
+            self._forget(digest)
+            self.misses += 1
+            metrics.cache_result("images", False)
+            return None
+        if digest not in self._index:
+            # Written by another cluster process sharing this directory
+            self._index[digest] = len(data)
+            self._total_bytes += len(data)
+        self._index.move_to_end(digest)
+        self.hits += 1
+        metrics.cache_result("images", True)
+        return data
+
+    async def put(self, digest, data, generation_seconds):
+        def write():
+            path = self._path(digest)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        await asyncio.to_thread(write)
+        self._forget(digest)
+        self._index[digest] = len(data)
+        self._total_bytes += len(data)
+        self.generations += 1
+        self.generation_seconds += generation_seconds
+
+        evicted = []
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            old_digest = next(iter(self._index))
+            self._forget(old_digest)
+            evicted.append(self._path(old_digest))
+
+        def remove_evicted():
+            for path in evicted:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+        if evicted:
+            await asyncio.to_thread(remove_evicted)
+
+    def _forget(self, digest):
+        size = self._index.pop(digest, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        average_generation = self.generation_seconds / self.generations if self.generations else 0.0
+        return {
+            "files": len(self._index),
+            "bytes": self._total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_seconds": self.hits * average_generation,
+        }
+
+image_cache = shared("image_cache", lambda: ImageCache(os.path.join(DATA_DIR, "images"), IMAGE_CACHE_MAX_BYTES))
+
+def build_image_embed(prompt, timestamp, cached=False):
+    embed = discord.Embed(
+        title="Generated Image",
+        description=f"Prompt: \"{prompt}\"",
+        color=discord.Color.green(),
+        timestamp=timestamp
+    )
+    embed.set_footer(text="Generated by AI (cached)" if cached else "Generated by AI")
+    return embed
+
+class ImageJob:
+    """One queued /imagegenerate request."""
+    def __init__(self, interaction, prompt):
+        self.interaction = interaction
+        self.prompt = prompt
+        self.user_id = interaction.user.id
+        self.payload = build_image_payload(prompt)
+        self.cache_key = ImageCache.key_for(prompt, self.payload)
+
+class ImageGenerationQueue:
+    """
+    Runs /imagegenerate requests through a fixed pool of IMAGE_GEN_WORKERS workers.
+    Each user may have at most IMAGE_GEN_MAX_JOBS_PER_USER jobs queued or running, and the whole
+    queue is capped at IMAGE_GEN_MAX_QUEUE so followups stay inside Discord's 15 minute token window.
+    """
+    def __init__(self, workers, max_per_user, max_queue):
+        self.worker_count = workers
+        self.max_per_user = max_per_user
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._jobs_per_user = {} # user id -> jobs queued or running
+        self._workers = []
+        self._busy = set()       # workers in the middle of a job
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def jobs_for(self, user_id):
+        return self._jobs_per_user.get(user_id, 0)
+
+    def reserve(self, user_id):
+        """Claims one of the user's job slots. Returns False if they're already at the per-user cap."""
+        if self.jobs_for(user_id) >= self.max_per_user:
+            return False
+        self._jobs_per_user[user_id] = self.jobs_for(user_id) + 1
+        return True
+
+    def release(self, user_id):
+        remaining = self.jobs_for(user_id) - 1
+        if remaining > 0:
+            self._jobs_per_user[user_id] = remaining
+        else:
+            self._jobs_per_user.pop(user_id, None)
+
+    def submit(self, job):
+        """
+        Queues a job whose slot was claimed with reserve() and returns how many jobs are waiting ahead of it.
+        Raises asyncio.QueueFull if the queue is full.
+        """
+        ahead = self._queue.qsize()
+        self._queue.put_nowait(job)
+        return ahead
+
+    async def _work(self):
+        me = asyncio.current_task()
+        while me in self._workers: # Stopped workers finish the job they're on, then exit
+            job = await self._queue.get()
+            self._busy.add(me)
+            try:
+                await self._run(job)
+            except Exception as e:
+                print(f"An unexpected error occurred in /imagegenerate: {e}\n{traceback.format_exc()}")
+                try:
+                    await job.interaction.followup.send("An unexpected error occurred during image generation. Please ensure your prompt is appropriate.", ephemeral=False)
+                except discord.HTTPException:
+                    pass
+            finally:
+                self._busy.discard(me)
+                self.release(job.user_id)
+                self._queue.task_done()
+
+    async def _run(self, job):
+        interaction = job.interaction
+        current_interaction.set(interaction) # Rate limit queueing is fair per requesting user, not per worker
+
+        # An identical job may have finished while this one was waiting in the queue
+        image_bytes = await image_cache.get(job.cache_key)
+        if image_bytes is not None:
+            return await send_generated_image(interaction, job.prompt, image_bytes, cached=True)
+
+        # Headers and payload need to match your chosen Image Generation API's documentation
+        headers = {
+            "Authorization": f"Bearer {IMAGE_GEN_API_KEY}",
+            "Content-Type": "application/json",
+            "Accept": "application/json" # Typically application/json for response, or image/png/jpeg for direct image
+        }
+
+        started = time.perf_counter()
+        try:
+            async with image_gen_upstream.post(IMAGE_GEN_API_URL, json=job.payload, headers=headers) as response:
+                response.raise_for_status() # Raise exception for bad responses
+                raw = await response.read()
+        except aiohttp.ClientError as e:
+            print(f"Image generation API request failed: {e}\n{traceback.format_exc()}")
+            return await interaction.followup.send(f"Failed to generate image. The AI service might be down, unreachable, or your API key is invalid. Error: `{e}`", ephemeral=False)
+
+        # Decoding megabytes of base64 would stall every other command, so do it off the event loop
+        image_bytes, image_url = await asyncio.to_thread(decode_image_response, raw)
+        del raw
+
+        if image_bytes is not None:
+            await image_cache.put(job.cache_key, image_bytes, time.perf_counter() - started)
+            await send_generated_image(interaction, job.prompt, image_bytes)
+        elif image_url:
+            embed = build_image_embed(job.prompt, interaction.created_at)
+            embed.set_image(url=image_url)
+            await interaction.followup.send(embed=embed, ephemeral=False)
+        else:
+            await interaction.followup.send("Could not generate image. The AI response was unexpected or empty.", ephemeral=False)
+
+    def start(self):
+        if not self._workers:
+            self._workers = [background_task(self._work()) for _ in range(self.worker_count)]
+
+    def stop(self):
+        """Stops the workers. Jobs already running are finished; queued ones wait for the next start()."""
+        for worker in self._workers:
+            if worker not in self._busy:
+                worker.cancel()
+        self._workers = []
+
+image_queue = shared("image_queue", lambda: ImageGenerationQueue(IMAGE_GEN_WORKERS, IMAGE_GEN_MAX_JOBS_PER_USER, IMAGE_GEN_MAX_QUEUE))
+
+async def send_generated_image(interaction, prompt, image_bytes, cached=False):
+    """Sends PNG bytes as an attachment rendered inside the embed."""
+    embed = build_image_embed(prompt, interaction.created_at, cached=cached)
+    embed.set_image(url="attachment://generated.png")
+    file = discord.File(io.BytesIO(image_bytes), filename="generated.png")
+    await interaction.followup.send(embed=embed, file=file, ephemeral=False)
+
+# --- New Command: /imagegenerate ---
+@bot.tree.command(name="imagegenerate", description="Generate an image based on a text prompt.")
+@app_commands.describe(prompt="The text description for the image to generate.")
+async def imagegenerate(interaction: discord.Interaction, prompt: str):
+    """
+    Queues an image generation job; a worker from ImageGenerationQueue sends the result
+    as a PNG attachment once it's done.
+    """
+    # Check if API key and URL are properly configured
+    if not IMAGE_GEN_API_KEY:
+        return await interaction.response.send_message("Image generation API key is not configured. Please contact the bot owner.", ephemeral=True)
+    if not IMAGE_GEN_API_URL.startswith("http"):
+         return await interaction.response.send_message("Image generation API URL is not properly set. Please contact the bot owner.", ephemeral=True)
+
+    # Repeat prompts are served from the on-disk cache without queueing or calling the API
+    cache_key = ImageCache.key_for(prompt, build_image_payload(prompt))
+    if cache_key in image_cache:
+        await interaction.response.defer(ephemeral=False)
+        image_bytes = await image_cache.get(cache_key)
+        if image_bytes is not None:
+            return await send_generated_image(interaction, prompt, image_bytes, cached=True)
+
+    if not image_queue.reserve(interaction.user.id):
+        return await send_response(
+            interaction,
+            f"You already have {image_queue.max_per_user} image(s) queued. Please wait for them to finish.",
+            ephemeral=True
+        )
+
+    try:
+        if not interaction.response.is_done():
+            await interaction.response.defer(ephemeral=False)
+        ahead = image_queue.submit(ImageJob(interaction, prompt))
+    except asyncio.QueueFull:
+        image_queue.release(interaction.user.id)
+        return await interaction.followup.send("The image generator is busy right now. Please try again in a few minutes.", ephemeral=True)
+    except Exception:
+        image_queue.release(interaction.user.id)
+        raise
+
+    if ahead > 0:
+        await interaction.followup.send(f"Your image is queued at position **{ahead + 1}**. It will be posted here when it's ready.", ephemeral=True)
+
+
+# --- Roblox Resolver ---
+class RobloxResolver:
+    """
+    Resolves Roblox usernames to user IDs and profiles with as few API calls as possible.
+    Lookups arriving within ROBLOX_BATCH_WINDOW seconds of each other are sent as one
+    batched POST to /v1/usernames/users. Username->ID results are cached for ROBLOX_ID_CACHE_TTL,
+    and profiles for ROBLOX_PROFILE_CACHE_TTL.
+    """
+    USERNAMES_URL = f"{ROBLOX_USERS_API_URL}/usernames/users"
+    PROFILE_URL = ROBLOX_USERS_API_URL + "/users/{user_id}"
+    BATCH_LIMIT = 100 # Max usernames Roblox accepts per request
+    NOT_FOUND_TTL = 300 # Unknown usernames are remembered for a shorter time
+
+    def __init__(self, window, id_ttl, profile_ttl):
+        self.window = window
+        self.ids = TTLCache(id_ttl, name="roblox_ids")              # lower-case username -> {"id", "name", "displayName"} or None
+        self.profiles = TTLCache(profile_ttl, name="roblox_profiles") # user id -> profile JSON
+        self._pending = {}                       # lower-case username -> Future waiting for the next batch
+        self._flush_task = None
+        self._profile_flight = SingleFlight()
+        self.names = PrefixIndex(max_entries=ROBLOX_AUTOCOMPLETE_NAMES) # Lower-case username -> username, for autocomplete
+
+    def __len__(self):
+        return len(self.ids) + len(self.profiles)
+
+    async def resolve(self, username):
+        """Returns {"id", "name", "displayName"} for a username, or None if it doesn't exist."""
+        key = username.strip().lower()
+        cached = self.ids.get(key, MISSING)
+        if cached is not MISSING:
+            return cached
+
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+            if self._flush_task is None:
+                self._flush_task = background_task(self._flush_after_window())
+        return await asyncio.shield(future)
+
+    async def _flush_after_window(self):
+        await asyncio.sleep(self.window)
+        pending, self._pending = self._pending, {}
+        self._flush_task = None
+        names = list(pending)
+        await asyncio.gather(*(
+            self._resolve_batch(names[i:i + self.BATCH_LIMIT], pending)
+            for i in range(0, len(names), self.BATCH_LIMIT)
+        ))
+
+    async def _resolve_batch(self, names, pending):
+        try:
+            payload = {"usernames": names, "excludeBannedUsers": False}
+            async with roblox_upstream.post(self.USERNAMES_URL, json=payload) as response:
+                response.raise_for_status()
+                data = await response.json()
+
+            found = {}
+            for entry in (data or {}).get('data', []):
+                requested = entry.get('requestedUsername') or entry.get('name', '')
+                found[requested.lower()] = {
+                    "id": entry['id'],
+                    "name": entry.get('name', requested),
+                    "displayName": entry.get('displayName', requested),
+                }
+            for name in names:
+                user = found.get(name)
+                self.ids.set(name, user, ttl=None if user else self.NOT_FOUND_TTL)
+                if user:
+                    self.names.add(user["name"].lower(), user["name"])
+                if not pending[name].done():
+                    pending[name].set_result(user)
+        except Exception as e:
+            for name in names:
+                if not pending[name].done():
+                    pending[name].set_exception(e)
+
+    async def get_profile(self, user_id):
+        """Returns the /v1/users/{id} profile JSON, from cache when possible."""
+        profile = self.profiles.get(user_id)
+        if profile is not None:
+            return profile
+
+        async def fetch():
+            async with roblox_upstream.get(self.PROFILE_URL.format(user_id=user_id)) as response:
+                response.raise_for_status()
+                profile = await response.json()
+            self.profiles.set(user_id, profile)
+            return profile
+
+        return await self._profile_flight.do(user_id, fetch)
+
+roblox_resolver = shared("roblox_resolver", lambda: RobloxResolver(ROBLOX_BATCH_WINDOW, ROBLOX_ID_CACHE_TTL, ROBLOX_PROFILE_CACHE_TTL))
+
+# --- New Command: /roblox ---
+@bot.tree.command(name="roblox", description="Shows a Roblox user's profile and stats.")
+@app_commands.describe(username="The Roblox username.")
+async def roblox(interaction: discord.Interaction, username: str):
+    """
+    Fetches and displays a Roblox user's profile information.
+    Username-to-ID lookups are batched and cached by RobloxResolver, so a cached
+    username only needs the profile call (which is cached too).
+    """
+    await interaction.response.defer(ephemeral=False)
+
+    try:
+        # Step 1: Get UserID from username (batched POST request, cached)
+        roblox_user = await roblox_resolver.resolve(username)
+        if roblox_user is None:
+            return await interaction.followup.send(f"Could not find Roblox user **{username}**.", ephemeral=False)
+
+        roblox_user_id = roblox_user['id']
+
+        # Step 2: Get User Profile Details using UserID (GET request, cached)
+        profile_data = await roblox_resolver.get_profile(roblox_user_id)
+
+        # Extract relevant data
+        name = profile_data.get('name', 'N/A')
+        display_name = profile_data.get('displayName', name)
+        description = profile_data.get('description', 'No description set.').strip()
+        created_date_str = profile_data.get('created', 'N/A')
+        is_banned = profile_data.get('isBanned', False)
+
+        # Format join date
+        join_date = "N/A"
+        if created_date_str != 'N/A':
+            try:
+                # Parse ISO format (e.g., '2020-01-01T00:00:00.000Z')
+                created_dt = datetime.fromisoformat(created_date_str.replace('Z', '+00:00'))
+                join_date = created_dt.strftime("%Y-%m-%d %H:%M UTC")
+            except ValueError:
+                pass # Keep N/A if parsing fails
+        
+        embed = discord.Embed(
+            title=f"Roblox Profile: {display_name}",
+            description=f"Username: `{name}`",
+            color=discord.Color.blue(),
+            timestamp=interaction.created_at
+        )
+        embed.set_thumbnail(url=f"https://www.roblox.com/Thumbs/Avatar.ashx?x=150&y=150&username={name}") # Basic avatar thumbnail
+        
+        embed.add_field(name="User ID", value=roblox_user_id, inline=True)
+        embed.add_field(name="Join Date", value=join_date, inline=True)
+        embed.add_field(name="Banned", value="Yes" if is_banned else "No", inline=True)
+        
+        if description:
+            embed.add_field(name="About Me", value=description if len(description) <= 1024 else description[:1021] + "...", inline=False) # Discord field value limit
+
+        await interaction.followup.send(embed=embed, ephemeral=False)
+
+    except aiohttp.ClientResponseError as e:
+        if e.status == 404:
+            await interaction.followup.send(f"Roblox user **{username}** not found.", ephemeral=False)
+        else:
+            print(f"Roblox API error (status {e.status}): {e}\n{traceback.format_exc()}")
+            await interaction.followup.send(f"An error occurred while fetching Roblox profile: HTTP Status {e.status}.", ephemeral=False)
+    except aiohttp.ClientError as e:
+        print(f"Roblox API request failed: {e}\n{traceback.format_exc()}")
+        await interaction.followup.send("Failed to connect to Roblox API. It might be down or unreachable.", ephemeral=False)
+    except Exception as e:
+        print(f"An unexpected error occurred in /roblox: {e}\n{traceback.format_exc()}")
+        await interaction.followup.send("An unexpected error occurred while fetching Roblox profile.", ephemeral=False)
+
+@roblox.autocomplete("username")
+async def roblox_username_autocomplete(interaction: discord.Interaction, current: str):
+    """Suggests usernames that have been looked up before; never calls the Roblox API."""
+    return autocomplete_choices(roblox_resolver.names.search(current.strip().lower()))
+
+
+# --- Fortnite Stats Cache ---
+class FortniteAPIError(Exception):
+    """Raised when Fortnite-API.com answers with an error payload."""
+
+class FortniteStatsCache:
+    """
+    Caches the parsed overall Battle Royale stats per player for FORTNITE_CACHE_TTL seconds.
+    Concurrent lookups of the same player share one Fortnite-API.com request.
+    """
+    API_URL = f"{FORTNITE_API_URL}/stats/br/v2"
+    NOT_FOUND_TTL = 60 # Unknown names are remembered briefly so typos don't hammer the API
+
+    def __init__(self, ttl):
+        self.stats = TTLCache(ttl, name="fortnite_stats") # lower-case username -> parsed stats dict, or None if not found
+        self._flight = SingleFlight()
+
+    def __len__(self):
+        return len(self.stats)
+
+    async def get(self, username):
+        """Returns the parsed stats for a player, or None if the player doesn't exist."""
+        key = username.strip().lower()
+        cached = self.stats.get(key, MISSING)
+        if cached is not MISSING:
+            return cached
+        return await self._flight.do(key, lambda: self._fetch(key, username.strip()))
+
+    async def _fetch(self, key, username):
+        headers = {"Authorization": FORTNITE_API_KEY}
+        async with fortnite_upstream.get(self.API_URL, params={"name": username}, headers=headers) as response:
+            if response.status == 404:
+                self.stats.set(key, None, ttl=self.NOT_FOUND_TTL)
+                return None
+            response.raise_for_status()
+            data = await response.json()
+
+        if data.get('status') == 404:
+            self.stats.set(key, None, ttl=self.NOT_FOUND_TTL)
+            return None
+        if data.get('status') != 200 or not data.get('data'):
+            raise FortniteAPIError(data.get('error', 'Unknown API error.'))
+
+        player_data = data['data']
+        # Overall stats (for all game modes combined)
+        overall_stats = player_data['stats']['all']['overall']
+        stats = {
+            "account_name": player_data['account']['name'],
+            "account_level": player_data['account']['level'],
+            "battle_pass_level": player_data['battlePass']['level'],
+            "wins": overall_stats.get('wins', 0),
+            "kills": overall_stats.get('kills', 0),
+            "kd": overall_stats.get('kd', 0.0),
+            "matches": overall_stats.get('matches', 0),
+            "win_rate": overall_stats.get('winRate', 0.0),
+            "image": player_data.get('image'), # Fortnite-API might provide a generated image
+        }
+        self.stats.set(key, stats)
+        return stats
+
+fortnite_stats = shared("fortnite_stats", lambda: FortniteStatsCache(FORTNITE_CACHE_TTL))
+fortnite_compare_semaphore = shared("fortnite_compare_semaphore", lambda: asyncio.Semaphore(FORTNITE_COMPARE_CONCURRENCY))
+
+def describe_fortnite_error(error, username):
+    """Turns an exception from FortniteStatsCache.get into a user-facing message."""
+    if isinstance(error, FortniteAPIError):
+        return f"An error occurred while fetching Fortnite stats: {error}"
+    if isinstance(error, aiohttp.ClientResponseError):
+        if error.status == 400: # Bad Request, often due to invalid username format or missing API key
+            return "Invalid request for Fortnite stats (HTTP 400). Please check the username and ensure your API key is correctly configured."
+        if error.status == 403: # Forbidden, often due to invalid API key
+            return "Access to Fortnite API forbidden (HTTP 403). Please check if your Fortnite-API.com key is valid."
+        print(f"Fortnite API error (status {error.status}): {error}")
+        return f"An error occurred while fetching Fortnite stats: HTTP Status {error.status}."
+    if isinstance(error, aiohttp.ClientError):
+        print(f"Fortnite API request failed: {error}")
+        return "Failed to connect to Fortnite API. It might be down or unreachable."
+    print(f"An unexpected error occurred while fetching Fortnite stats for {username}: {error!r}")
+    return "An unexpected error occurred while fetching Fortnite stats."
+
+# --- New Command: /fortnite ---
+@bot.tree.command(name="fortnite", description="Shows Fortnite stats for a given username.")
+@app_commands.describe(username="The Fortnite username (Epic Games Display Name).")
+async def fortnite(interaction: discord.Interaction, username: str):
+    """
+    Displays Fortnite Battle Royale player statistics from Fortnite-API.com (cached per player).
+    """
+    await interaction.response.defer(ephemeral=False)
+
+    # Check if API key is properly configured
+    if not FORTNITE_API_KEY:
+        return await interaction.followup.send("Fortnite API key is not configured. Please contact the bot owner.", ephemeral=True)
+
+    try:
+        stats = await fortnite_stats.get(username)
+    except Exception as e:
+        return await interaction.followup.send(describe_fortnite_error(e, username), ephemeral=False)
+
+    if stats is None:
+        return await interaction.followup.send(f"Fortnite player **{username}** not found. Please ensure it's an exact Epic Games Display Name.", ephemeral=False)
+
+    embed = discord.Embed(
+        title=f"Fortnite Stats for {stats['account_name']}",
+        color=discord.Color.dark_green(),
+        timestamp=interaction.created_at
+    )
+    
+    if stats['image']:
+        embed.set_thumbnail(url=stats['image'])
+
+    embed.add_field(name="Account Level", value=stats['account_level'], inline=True)
+    embed.add_field(name="Battle Pass Level", value=stats['battle_pass_level'], inline=True)
+    embed.add_field(name="Total Matches", value=stats['matches'], inline=True)
+    
+    embed.add_field(name="Wins", value=stats['wins'], inline=True)
+    embed.add_field(name="Kills", value=stats['kills'], inline=True)
+    embed.add_field(name="K/D", value=f"{stats['kd']:.2f}", inline=True)
+    embed.add_field(name="Win Rate", value=f"{stats['win_rate']:.2f}%", inline=True)
+
+    embed.set_footer(text="Data from Fortnite-API.com")
+    await interaction.followup.send(embed=embed, ephemeral=False)
+
+# --- New Command: /fortnitecompare ---
+@bot.tree.command(name="fortnitecompare", description="Compare Fortnite stats for several players.")
+@app_commands.describe(usernames="Epic Games Display Names separated by commas (e.g., 'Ninja, Bugha').")
+async def fortnitecompare(interaction: discord.Interaction, usernames: str):
+    """
+    Fetches several players' stats concurrently (at most FORTNITE_COMPARE_CONCURRENCY requests
+    at a time across the bot) and shows them side by side in one embed.
+    """
+    if not FORTNITE_API_KEY:
+        return await interaction.response.send_message("Fortnite API key is not configured. Please contact the bot owner.", ephemeral=True)
+
+    names = []
+    for name in usernames.split(","):
+        name = name.strip()
+        if name and name.lower() not in (n.lower() for n in names):
+            names.append(name)
+    if len(names) < 2:
+        return await interaction.response.send_message("Please provide at least two usernames separated by commas.", ephemeral=True)
+    if len(names) > FORTNITE_COMPARE_MAX:
+        return await interaction.response.send_message(f"You can compare at most {FORTNITE_COMPARE_MAX} players at once.", ephemeral=True)
+
+    await interaction.response.defer(ephemeral=False)
+
+    async def fetch(name):
+        async with fortnite_compare_semaphore:
+            return await fortnite_stats.get(name)
+
+    results = await asyncio.gather(*(fetch(name) for name in names), return_exceptions=True)
+
+    embed = discord.Embed(
+        title="Fortnite Stats Comparison",
+        color=discord.Color.dark_green(),
+        timestamp=interaction.created_at
+    )
+    found = []
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            embed.add_field(name=name, value=describe_fortnite_error(result, name)[:1024], inline=True)
+        elif result is None:
+            embed.add_field(name=name, value="Player not found.", inline=True)
+        else:
+            found.append(result)
+            embed.add_field(
+                name=result['account_name'],
+                value=(
+                    f"**Wins:** {result['wins']}\n"
+                    f"**Kills:** {result['kills']}\n"
+                    f"**K/D:** {result['kd']:.2f}\n"
+                    f"**Win Rate:** {result['win_rate']:.2f}%\n"
+                    f"**Matches:** {result['matches']}"
+                ),
+                inline=True
+            )
+
+    if len(found) >= 2:
+        best_kd = max(found, key=lambda stats: stats['kd'])
+        most_wins = max(found, key=lambda stats: stats['wins'])
+        embed.description = f"🏆 Best K/D: **{best_kd['account_name']}** · Most wins: **{most_wins['account_name']}**"
+
+    embed.set_footer(text="Data from Fortnite-API.com")
+    await interaction.followup.send(embed=embed, ephemeral=False)
+
+# --- Owner-only Diagnostics: /debug imagecache ---
+@debug_group.command(name="imagecache", description="Show hit rate and savings of the generated image cache.")
+async def debug_imagecache(interaction: discord.Interaction):
+    """
+    Reports how often /imagegenerate was served from ImageCache instead of the image API.
+    """
+    stats = image_cache.stats()
+    embed = discord.Embed(title="Image Cache", color=discord.Color.dark_grey())
+    embed.add_field(name="Hit Rate", value=f"{stats['hit_rate']:.1%} ({stats['hits']} hits / {stats['misses']} misses)", inline=False)
+    embed.add_field(name="API Calls Saved", value=stats['hits'], inline=True)
+    embed.add_field(name="Est. Generation Time Saved", value=format_age(stats['saved_seconds']), inline=True)
+    embed.add_field(name="Stored", value=f"{stats['files']} images, {stats['bytes'] / (1024 * 1024):.1f} MiB of {IMAGE_CACHE_MAX_BYTES / (1024 * 1024):.0f} MiB", inline=False)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+# --- Extension Setup ---
+async def setup(bot):
+    lyrics_cache.open()
+    image_cache.open()
+    gag_stock_cache.start()
+    currency_rates.start()
+    image_queue.start()
+    bot.add_dynamic_items(LyricsPageButton)
+    metrics.gauge("bot_image_queue_depth", "Image generation jobs waiting for a worker.", image_queue.depth)
+
+async def teardown(bot):
+    gag_stock_cache.stop()
+    currency_rates.stop()
+    image_queue.stop()
+    lyrics_cache.close()
+    bot.remove_dynamic_items(LyricsPageButton)
+    debug_group.remove_command("imagecache") # Subcommands of core groups aren't removed with the module
+    metrics.remove("bot_image_queue_depth")
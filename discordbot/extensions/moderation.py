@@ -0,0 +1,243 @@
+"""
+Server moderation: /botban and /botunban, and per-server cooldown overrides with /cooldownconfig.
+The ban index and the cooldown engine themselves live in bot.py, since every command is gated by them.
+"""
+import discord
+from discord import app_commands
+
+from bot import (
+    autocomplete_choices, BanIndex, bot, CooldownEngine, cooldowns, format_cooldown,
+    normalize_command_name, parse_cooldown, storage,
+)
+
+
+# --- New Command: /botban (Admin Only) ---
+BAN_SCOPE_CHOICES = [
+    app_commands.Choice(name="This server", value="server"),
+    app_commands.Choice(name="Every server (bot owner only)", value="global"),
+]
+
+async def resolve_ban_scope(interaction, scope, command):
+    """
+    Validates the scope/command options of /botban and /botunban.
+    Returns (guild_id, command_name) for the ban, or sends an error and returns None.
+    """
+    guild_id = interaction.guild_id
+    if scope is not None and scope.value == "global":
+        if not await bot.is_owner(interaction.user):
+            await interaction.response.send_message("Only the bot owner can manage bans that apply to every server.", ephemeral=True)
+            return None
+        guild_id = BanIndex.GLOBAL
+
+    command_name = ""
+    if command:
+        parts = command.strip().lstrip("/").split()
+        if not parts:
+            await interaction.response.send_message(f"`{command}` isn't a command name. Use one like `imagegenerate`, or leave it empty for all commands.", ephemeral=True)
+            return None
+        command_name = parts[0].lower()
+        if bot.tree.get_command(command_name) is None:
+            await interaction.response.send_message(f"There is no `/{command_name}` command.", ephemeral=True)
+            return None
+    return guild_id, command_name
+
+def describe_ban_scope(guild_id, command_name, guild_name="this server"):
+    what = f"`/{command_name}`" if command_name else "bot commands"
+    where = "every server" if guild_id == BanIndex.GLOBAL else guild_name
+    return f"{what} in {where}"
+
+@bot.tree.command(name="botban", description="Prevent a user from using any bot commands.")
+@app_commands.guild_only()
+@app_commands.checks.has_permissions(ban_members=True) # Requires Ban Members permission
+@app_commands.describe(
+    user="The user to ban from bot commands.",
+    reason="The reason for the bot ban.",
+    command="Only ban them from this command (e.g., imagegenerate). Leave empty for all commands.",
+    scope="Where the ban applies. Defaults to this server."
+)
+@app_commands.choices(scope=BAN_SCOPE_CHOICES)
+async def botban(interaction: discord.Interaction, user: discord.Member, reason: str = "No reason provided.", command: str = None, scope: app_commands.Choice[str] = None):
+    """
+    Bans a user from using bot commands (or a single command) in this server. Requires 'Ban Members' permission.
+    The bot owner can also ban users in every server. Enforced by BanGateTree before any command runs.
+    """
+    if user.id == bot.user.id:
+        return await interaction.response.send_message("I cannot ban myself from using commands.", ephemeral=True)
+    if user.id == interaction.user.id:
+        return await interaction.response.send_message("You cannot ban yourself from using commands.", ephemeral=True)
+    # Prevent non-admin from banning admin, unless they are also admin
+    if user.guild_permissions.administrator and not interaction.user.guild_permissions.administrator:
+        return await interaction.response.send_message("You cannot ban an administrator from using bot commands unless you are also an administrator.", ephemeral=True)
+
+    resolved = await resolve_ban_scope(interaction, scope, command)
+    if resolved is None:
+        return
+    guild_id, command_name = resolved
+    banned_from = describe_ban_scope(guild_id, command_name)
+
+    if storage.bans.has(guild_id, command_name, user.id):
+        return await interaction.response.send_message(f"**{user.display_name}** is already banned from using {banned_from}.", ephemeral=True)
+
+    storage.add_ban(guild_id, user.id, reason, interaction.user.id, command=command_name)
+    await interaction.response.send_message(f"**{user.display_name}** has been banned from using {banned_from}. Reason: {reason}", ephemeral=False)
+    # Optionally, notify the banned user via DM
+    try:
+        await user.send(f"You have been banned from using {describe_ban_scope(guild_id, command_name, f'**{interaction.guild.name}**')} by **{interaction.user.display_name}**. Reason: {reason}")
+    except discord.Forbidden:
+        print(f"Could not DM {user.display_name} about bot ban.")
+
+# --- New Command: /botunban (Admin Only) ---
+@bot.tree.command(name="botunban", description="Allow a user to use bot commands again.")
+@app_commands.guild_only()
+@app_commands.checks.has_permissions(ban_members=True) # Requires Ban Members permission
+@app_commands.describe(
+    user="The user to unban from bot commands.",
+    command="Lift a ban on this single command. Leave empty for an all-commands ban.",
+    scope="Which ban to lift. Defaults to this server."
+)
+@app_commands.choices(scope=BAN_SCOPE_CHOICES)
+async def botunban(interaction: discord.Interaction, user: discord.Member, command: str = None, scope: app_commands.Choice[str] = None):
+    """
+    Unbans a user, allowing them to use bot commands again. Requires 'Ban Members' permission.
+    """
+    resolved = await resolve_ban_scope(interaction, scope, command)
+    if resolved is None:
+        return
+    guild_id, command_name = resolved
+    banned_from = describe_ban_scope(guild_id, command_name)
+
+    if not storage.bans.has(guild_id, command_name, user.id):
+        return await interaction.response.send_message(f"**{user.display_name}** is not currently banned from using {banned_from}.", ephemeral=True)
+
+    storage.remove_ban(guild_id, user.id, command=command_name)
+    await interaction.response.send_message(f"**{user.display_name}** has been unbanned from using {banned_from}.", ephemeral=False)
+    try:
+        await user.send(f"You have been unbanned from using {describe_ban_scope(guild_id, command_name, f'**{interaction.guild.name}**')} by **{interaction.user.display_name}**.")
+    except discord.Forbidden:
+        print(f"Could not DM {user.display_name} about bot unban.")
+
+# --- Command Group: /cooldownconfig (Admin Only) ---
+cooldown_config = app_commands.Group(
+    name="cooldownconfig",
+    description="Change how often commands can be used in this server.",
+    guild_only=True,
+    default_permissions=discord.Permissions(manage_guild=True)
+)
+
+def cooldown_command_names():
+    return [command.qualified_name for command in bot.tree.walk_commands() if isinstance(command, app_commands.Command)]
+
+async def resolve_cooldown_target(interaction, scope, command):
+    """
+    Validates the scope/command options of /cooldownconfig. Returns (guild_id, command_name),
+    or sends an error and returns None.
+    """
+    guild_id = interaction.guild_id
+    if scope is not None and scope.value == "global":
+        if not await bot.is_owner(interaction.user):
+            await interaction.response.send_message("Only the bot owner can change cooldowns for every server.", ephemeral=True)
+            return None
+        guild_id = CooldownEngine.BOT_WIDE
+
+    command_name = normalize_command_name(command)
+    if command_name != CooldownEngine.ALL_COMMANDS and command_name not in cooldown_command_names():
+        await interaction.response.send_message(f"There is no `/{command_name}` command. Use `*` for every command.", ephemeral=True)
+        return None
+    return guild_id, command_name
+
+def format_command_name(command_name):
+    return "every command" if command_name == CooldownEngine.ALL_COMMANDS else f"`/{command_name}`"
+
+def describe_cooldown_target(guild_id, command_name, role):
+    what = format_command_name(command_name)
+    who = f"members with {role.mention}" if role else "everyone"
+    where = "every server" if guild_id == CooldownEngine.BOT_WIDE else "this server"
+    return f"{what} for {who} in {where}"
+
+@cooldown_config.command(name="set", description="Set how often a command can be used.")
+@app_commands.checks.has_permissions(manage_guild=True) # Requires Manage Server permission
+@app_commands.describe(
+    command="The command (e.g. imagegenerate), or * for every command.",
+    cooldown="Uses per period, e.g. 2/60 for twice a minute, or 'off' for no cooldown.",
+    role="Only for members with this role; the most lenient of a member's roles applies.",
+    scope="Where the cooldown applies. Defaults to this server."
+)
+@app_commands.choices(scope=BAN_SCOPE_CHOICES)
+async def cooldownconfig_set(interaction: discord.Interaction, command: str, cooldown: str, role: discord.Role = None, scope: app_commands.Choice[str] = None):
+    """
+    Saves a cooldown override. Takes effect on the next use; commands don't need to be re-synced.
+    """
+    try:
+        policy = parse_cooldown(cooldown)
+    except ValueError:
+        return await interaction.response.send_message("Cooldowns look like `2/60` (2 uses per 60 seconds) or `off`.", ephemeral=True)
+    resolved = await resolve_cooldown_target(interaction, scope, command)
+    if resolved is None:
+        return
+    guild_id, command_name = resolved
+    if guild_id == CooldownEngine.BOT_WIDE and role is not None:
+        return await interaction.response.send_message("Role cooldowns only apply to this server.", ephemeral=True)
+
+    cooldowns.set_policy(guild_id, command_name, role.id if role else CooldownEngine.EVERYONE, policy)
+    await interaction.response.send_message(
+        f"Cooldown for {describe_cooldown_target(guild_id, command_name, role)} set to **{format_cooldown(policy)}**.",
+        ephemeral=True, allowed_mentions=discord.AllowedMentions.none()
+    )
+
+@cooldown_config.command(name="remove", description="Remove a cooldown override.")
+@app_commands.checks.has_permissions(manage_guild=True) # Requires Manage Server permission
+@app_commands.describe(
+    command="The command the override is for, or * for every command.",
+    role="The role the override is for. Leave empty for the override that applies to everyone.",
+    scope="Which override to remove. Defaults to this server."
+)
+@app_commands.choices(scope=BAN_SCOPE_CHOICES)
+async def cooldownconfig_remove(interaction: discord.Interaction, command: str, role: discord.Role = None, scope: app_commands.Choice[str] = None):
+    """
+    Removes a cooldown override, falling back to the next matching policy.
+    """
+    resolved = await resolve_cooldown_target(interaction, scope, command)
+    if resolved is None:
+        return
+    guild_id, command_name = resolved
+    target = describe_cooldown_target(guild_id, command_name, role)
+    if not cooldowns.remove_policy(guild_id, command_name, role.id if role else CooldownEngine.EVERYONE):
+        return await interaction.response.send_message(f"There is no cooldown override for {target}.", ephemeral=True, allowed_mentions=discord.AllowedMentions.none())
+    await interaction.response.send_message(f"Removed the cooldown override for {target}.", ephemeral=True, allowed_mentions=discord.AllowedMentions.none())
+
+@cooldown_config.command(name="show", description="Show the cooldowns that apply in this server.")
+@app_commands.checks.has_permissions(manage_guild=True) # Requires Manage Server permission
+async def cooldownconfig_show(interaction: discord.Interaction):
+    """
+    Lists this server's overrides and the bot-wide cooldowns they override.
+    """
+    lines = ["**This server**"]
+    for command_name, by_role in sorted(cooldowns.policies.get(interaction.guild_id, {}).items()):
+        for role_id, policy in by_role.items():
+            who = f"<@&{role_id}>" if role_id else "everyone"
+            lines.append(f"- {format_command_name(command_name)} for {who}: {format_cooldown(policy)}")
+    if len(lines) == 1:
+        lines.append("No overrides.")
+
+    lines += ["", "**Bot-wide**"]
+    bot_wide = dict(cooldowns.defaults)
+    for command_name, by_role in cooldowns.policies.get(CooldownEngine.BOT_WIDE, {}).items():
+        if CooldownEngine.EVERYONE in by_role:
+            bot_wide[command_name] = by_role[CooldownEngine.EVERYONE]
+    for command_name, policy in sorted(bot_wide.items()):
+        lines.append(f"- {format_command_name(command_name)}: {format_cooldown(policy)}")
+    await interaction.response.send_message("\n".join(lines)[:2000], ephemeral=True, allowed_mentions=discord.AllowedMentions.none())
+
+@cooldownconfig_set.autocomplete("command")
+@cooldownconfig_remove.autocomplete("command")
+async def cooldownconfig_command_autocomplete(interaction: discord.Interaction, current: str):
+    current = normalize_command_name(current)
+    names = [CooldownEngine.ALL_COMMANDS] + sorted(cooldown_command_names())
+    return autocomplete_choices([name for name in names if name.startswith(current)][:25])
+
+bot.tree.add_command(cooldown_config)
+
+
+# --- Extension Setup ---
+async def setup(bot):
+    pass # The commands above were added to bot.tree when this module was imported
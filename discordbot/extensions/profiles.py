@@ -0,0 +1,53 @@
+"""
+Social links: /socials to add one to your profile, /getsocials to view someone's.
+"""
+import discord
+from discord import app_commands
+
+from bot import (
+    bot, storage,
+)
+
+
+# --- New Command: /socials ---
+@bot.tree.command(name="socials", description="Add your social media links to your profile.")
+@app_commands.describe(platform="The social media platform (e.g., YouTube, Reddit).", link="Your profile link on that platform.")
+async def socials(interaction: discord.Interaction, platform: str, link: str):
+    """
+    Allows users to save their social media links. (Persisted by BotStorage)
+    """
+    # Store platform in lowercase for consistency
+    await storage.set_social(interaction.user.id, platform.lower(), link)
+    
+    await interaction.response.send_message(f"Your **{platform.capitalize()}** link has been saved!", ephemeral=True)
+
+# --- New Command: /getsocials ---
+@bot.tree.command(name="getsocials", description="View a user's linked social media.")
+@app_commands.describe(user="The user whose social links you want to view.")
+async def getsocials(interaction: discord.Interaction, user: discord.Member):
+    """
+    Displays a user's saved social media links.
+    """
+    links = await storage.get_socials(user.id)
+    if not links:
+        return await interaction.response.send_message(f"**{user.display_name}** hasn't added any social media links yet.", ephemeral=False)
+
+    embed = discord.Embed(
+        title=f"{user.display_name}'s Social Links",
+        color=discord.Color.purple(),
+        timestamp=interaction.created_at
+    )
+    embed.set_thumbnail(url=user.avatar.url if user.avatar else user.default_avatar.url)
+
+    description_parts = []
+    for platform, link in links.items():
+        description_parts.append(f"**{platform.capitalize()}:** <{link}>")
+    
+    embed.description = "\n".join(description_parts)
+
+    await interaction.response.send_message(embed=embed, ephemeral=False)
+
+
+# --- Extension Setup ---
+async def setup(bot):
+    pass # The commands above were added to bot.tree when this module was imported
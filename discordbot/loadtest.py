@@ -0,0 +1,409 @@
+"""
+Offline load test for the bot's slash command handlers.
+
+Runs the real command callbacks from bot.py with fake interactions, against local aiohttp
+servers that stand in for every upstream API (Grow A Garden, lyrics.ovh, ExchangeRate-API,
+Roblox, Fortnite-API, the image generator). No Discord connection or API keys are needed.
+
+    python loadtest.py --users 50 --requests 20
+    python loadtest.py --users 200 --commands lyrics,roblox --distinct 10 --latency 150 --error-rate 0.05
+
+Reports throughput, time-to-ack and total latency percentiles per command, peak memory,
+upstream requests per API and the bot's cache hit/miss counters. Queued confessions are
+delivered by the real outbox to a fake channel before the run ends.
+
+Callbacks are called directly (command.callback), so BanGateTree.interaction_check and what it
+gates are not exercised: bans, cooldowns and the command/response metrics.
+"""
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from aiohttp import web
+
+COMMANDS = [
+    "confession", "gag-stock", "lyrics", "currencyconvert", "roblox", "fortnite",
+    "fortnitecompare", "imagegenerate", "socials", "getsocials", "uptime", "truth",
+]
+
+
+# --- Upstream Stand-ins ---
+class StandInServer:
+    """
+    One local aiohttp app imitating every upstream API the bot calls.
+    Each request waits `latency` ms (+/- `jitter`), fails with HTTP 503 at `error_rate`,
+    and lyrics/image payloads are `payload_kb` in size.
+    """
+    def __init__(self, latency, jitter, error_rate, payload_kb):
+        self.latency = latency / 1000
+        self.jitter = jitter / 1000
+        self.error_rate = error_rate
+        self.lyrics = ("la " * (payload_kb * 1024 // 3 + 1))[:payload_kb * 1024]
+        self.image_base64 = base64.b64encode(os.urandom(payload_kb * 1024)).decode("ascii")
+        self.requests = {} # route name -> count
+        self.runner = None
+        self.base_url = None
+
+    async def _simulate(self, route):
+        self.requests[route] = self.requests.get(route, 0) + 1
+        await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        if random.random() < self.error_rate:
+            raise web.HTTPServiceUnavailable()
+
+    async def gag_stock(self, request):
+        await self._simulate("gag-stock")
+        stock = [{"name": f"Item {i}", "value": random.randint(1, 20)} for i in range(8)]
+        return web.json_response({"seedsStock": stock, "eggStock": stock[:4], "gearStock": stock[:6]})
+
+    async def lyrics_ovh(self, request):
+        await self._simulate("lyrics")
+        return web.json_response({"lyrics": self.lyrics})
+
+    async def exchange_rates(self, request):
+        await self._simulate("currency")
+        rates = {code: round(random.uniform(0.5, 150), 4) for code in ("EUR", "GBP", "JPY", "CAD", "AUD", "CHF", "INR")}
+        rates[request.match_info["base"]] = 1.0
+        return web.json_response({"result": "success", "conversion_rates": rates})
+
+    async def roblox_usernames(self, request):
+        await self._simulate("roblox-usernames")
+        body = await request.json()
+        data = [
+            {"requestedUsername": name, "id": 1000 + sum(map(ord, name)), "name": name, "displayName": name.title()}
+            for name in body.get("usernames", [])
+        ]
+        return web.json_response({"data": data})
+
+    async def roblox_profile(self, request):
+        await self._simulate("roblox-profile")
+        user_id = request.match_info["user_id"]
+        return web.json_response({
+            "name": f"player{user_id}", "displayName": f"Player {user_id}",
+            "description": "Load test profile.", "created": "2020-01-01T00:00:00.000Z", "isBanned": False,
+        })
+
+    async def fortnite_stats(self, request):
+        await self._simulate("fortnite")
+        name = request.query.get("name", "player")
+        overall = {"wins": 42, "kills": 1337, "kd": 2.5, "matches": 500, "winRate": 8.4}
+        return web.json_response({"status": 200, "data": {
+            "account": {"name": name, "level": 100},
+            "battlePass": {"level": 80},
+            "stats": {"all": {"overall": overall}},
+            "image": None,
+        }})
+
+    async def image_generation(self, request):
+        await self._simulate("image")
+        await request.read()
+        return web.Response(
+            text=json.dumps({"artifacts": [{"base64": self.image_base64}]}),
+            content_type="application/json"
+        )
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/gag", self.gag_stock)
+        app.router.add_get("/lyrics/{artist}/{title}", self.lyrics_ovh)
+        app.router.add_get("/currency/{key}/latest/{base}", self.exchange_rates)
+        app.router.add_post("/roblox/usernames/users", self.roblox_usernames)
+        app.router.add_get("/roblox/users/{user_id}", self.roblox_profile)
+        app.router.add_get("/fortnite/stats/br/v2", self.fortnite_stats)
+        app.router.add_post("/image", self.image_generation)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+def point_bot_at(base_url, data_dir):
+    """Environment for bot.py; must be set before it is imported, since it reads its config at import time."""
+    os.environ.update({
+        "GAG_STOCK_API_URL": f"{base_url}/gag",
+        "LYRICS_API_URL": f"{base_url}/lyrics",
+        "CURRENCY_API_URL": f"{base_url}/currency",
+        "ROBLOX_USERS_API_URL": f"{base_url}/roblox",
+        "FORTNITE_API_URL": f"{base_url}/fortnite",
+        "IMAGE_GEN_API_URL": f"{base_url}/image",
+        "CURRENCY_API_KEY": "loadtest",
+        "IMAGE_GEN_API_KEY": "loadtest",
+        "FORTNITE_API_KEY": "loadtest",
+        "CONFESSIONS_CHANNEL_ID": "1",
+        "CONFESSION_USE_WEBHOOKS": "false",
+        "DATA_DIR": data_dir,
+        "STORAGE_SYNC_INTERVAL": "0",
+        "METRICS_PORT": "0",
+    })
+    # Stand-ins have no quotas; export e.g. FORTNITE_RATE_LIMIT=3/1 to load test the limiter itself
+    for upstream in ("GAG_STOCK", "LYRICS", "CURRENCY", "ROBLOX", "FORTNITE", "IMAGE_GEN"):
+        os.environ.setdefault(f"{upstream}_RATE_LIMIT", "")
+
+
+# --- Fake Interactions ---
+_interaction_ids = itertools.count((int(time.time() * 1000) - 1420070400000) << 22) # Snowflakes, unique per run
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.name = f"user{user_id}"
+        self.display_name = self.name
+        self.mention = f"<@{user_id}>"
+        self.bot = False
+        self.avatar = None
+        self.default_avatar = SimpleNamespace(url="https://cdn.discordapp.com/embed/avatars/0.png")
+        self.display_avatar = self.default_avatar
+
+class FakeChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.category_id = None
+        self.mention = f"<#{channel_id}>"
+        self.messages = 0
+        self.confessions = 0
+
+    async def send(self, *args, embeds=(), **kwargs):
+        self.messages += 1
+        self.confessions += len(embeds)
+
+class FakeResponse:
+    """Stands in for InteractionResponse; records when the interaction was acknowledged."""
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    def _ack(self):
+        if self._done:
+            raise RuntimeError("Interaction has already been responded to")
+        self._done = True
+        self._interaction.acked_at = time.perf_counter()
+
+    async def send_message(self, *args, **kwargs):
+        self._ack()
+        self._interaction.finish()
+
+    async def defer(self, *args, **kwargs):
+        self._ack()
+
+    async def edit_message(self, *args, **kwargs):
+        self._ack()
+        self._interaction.finish()
+
+    async def send_modal(self, *args, **kwargs):
+        self._ack()
+        self._interaction.finish()
+
+class FakeFollowup:
+    """Stands in for the followup Webhook. The first followup that isn't a progress notice finishes the interaction."""
+    PROGRESS_PREFIXES = ("Your image is queued",)
+
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, content=None, *args, **kwargs):
+        if not self._interaction.response.is_done():
+            raise RuntimeError("Followup sent before the interaction was acknowledged")
+        if not (content and content.startswith(self.PROGRESS_PREFIXES)):
+            self._interaction.finish()
+
+class FakeInteraction:
+    def __init__(self, command_name, user, guild, channel):
+        self.id = next(_interaction_ids)
+        self.type = SimpleNamespace(name="application_command")
+        self.data = {"name": command_name}
+        self.command = None
+        self.extras = {}
+        self.user = user
+        self.guild = guild
+        self.guild_id = guild.id
+        self.channel = channel
+        self.channel_id = channel.id
+        self.created_at = datetime.now(timezone.utc)
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        self.started_at = time.perf_counter()
+        self.acked_at = None
+        self.finished_at = None
+        self._finished = asyncio.Event()
+
+    def finish(self):
+        if self.finished_at is None:
+            self.finished_at = time.perf_counter()
+            self._finished.set()
+
+    async def wait_finished(self, timeout):
+        await asyncio.wait_for(self._finished.wait(), timeout)
+
+
+# --- Workload ---
+def command_arguments(name, k, user):
+    """Arguments for one invocation; `k` picks one of --distinct values so caches see repeats."""
+    if name == "confession":
+        return {"text": f"Load test confession {k}"}
+    if name == "lyrics":
+        return {"artist": f"Artist {k}", "title": f"Song {k}"}
+    if name == "currencyconvert":
+        return {"amount": 100.0 + k, "from_currency": "USD", "to_currency": "EUR, GBP, JPY"}
+    if name in ("roblox", "fortnite"):
+        return {"username": f"player{k}"}
+    if name == "fortnitecompare":
+        return {"usernames": f"player{k}, player{k + 1}, player{k + 2}"}
+    if name == "imagegenerate":
+        return {"prompt": f"a cat wearing hat number {k}"}
+    if name == "socials":
+        return {"platform": "youtube", "link": f"https://youtube.com/@user{user.id}"}
+    if name == "getsocials":
+        return {"user": user}
+    return {}
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+class Results:
+    def __init__(self):
+        self.ack = {}      # command -> [seconds]
+        self.total = {}    # command -> [seconds]
+        self.errors = {}   # command -> count
+
+    def record(self, name, interaction, error):
+        if error is not None:
+            self.errors[name] = self.errors.get(name, 0) + 1
+            return
+        if interaction.acked_at is not None:
+            self.ack.setdefault(name, []).append(interaction.acked_at - interaction.started_at)
+        self.total.setdefault(name, []).append(interaction.finished_at - interaction.started_at)
+
+async def virtual_user(bot, user_index, args, results, guild, channel):
+    rng = random.Random(args.seed + user_index)
+    user = FakeUser(10_000 + user_index)
+    for _ in range(args.requests):
+        name = rng.choice(args.commands)
+        command = bot.bot.tree.get_command(name)
+        interaction = FakeInteraction(name, user, guild, channel)
+        error = None
+        try:
+            await command.callback(interaction, **command_arguments(name, rng.randrange(args.distinct), user))
+            await interaction.wait_finished(args.timeout)
+        except Exception as e:
+            error = e
+            if args.verbose:
+                print(f"/{name} failed: {e!r}")
+        results.record(name, interaction, error)
+        if args.think:
+            await asyncio.sleep(rng.uniform(0, args.think / 1000))
+
+def print_report(args, results, elapsed, server, bot):
+    completed = sum(len(values) for values in results.total.values())
+    failed = sum(results.errors.values())
+    print(f"\n{args.users} users x {args.requests} requests in {elapsed:.2f}s: "
+          f"{completed} completed, {failed} failed, {completed / elapsed:.1f} req/s")
+    print(f"Upstream latency {args.latency:.0f}±{args.jitter:.0f} ms, error rate {args.error_rate:.0%}, payload {args.payload_kb} KiB\n")
+
+    header = f"{'command':<17}{'count':>7}{'errors':>7}{'ack p50':>10}{'p95':>9}{'p99':>9}{'total p50':>11}{'p95':>9}{'p99':>9}"
+    print(header)
+    print("-" * len(header))
+    for name in sorted(set(results.total) | set(results.errors)):
+        ack = sorted(results.ack.get(name, []))
+        total = sorted(results.total.get(name, []))
+        ms = lambda values, p: f"{percentile(values, p) * 1000:.1f}"
+        print(f"{name:<17}{len(total):>7}{results.errors.get(name, 0):>7}"
+              f"{ms(ack, 50):>10}{ms(ack, 95):>9}{ms(ack, 99):>9}"
+              f"{ms(total, 50):>11}{ms(total, 95):>9}{ms(total, 99):>9}")
+    print("(milliseconds)")
+
+    print(f"\nPeak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        print(f"Python heap: {current / (1024 * 1024):.1f} MiB now, {peak / (1024 * 1024):.1f} MiB peak")
+
+    print("\nUpstream requests: " + (", ".join(f"{route}={count}" for route, count in sorted(server.requests.items())) or "none"))
+    cache_lines = [line for line in bot.metrics.render().splitlines() if line.startswith("bot_cache_requests_total{")]
+    if cache_lines:
+        print("Cache lookups:")
+        for line in cache_lines:
+            print(f"  {line}")
+
+async def run(args):
+    server = StandInServer(args.latency, args.jitter, args.error_rate, args.payload_kb)
+    await server.start()
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="bot-loadtest-")
+    point_bot_at(server.base_url, data_dir)
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import bot # Imported late so it picks up the environment above
+
+    async def ready():
+        pass
+    bot.bot.wait_until_ready = ready # There's no gateway to wait for; let the outbox deliver right away
+    await bot.bot.start_services() # Also loads the extensions, which register the commands
+    unknown = [name for name in args.commands if bot.bot.tree.get_command(name) is None]
+    if unknown:
+        await bot.bot.stop_services()
+        raise SystemExit(f"Unknown command(s): {', '.join(unknown)}")
+
+    from extensions.confessions import confession_outbox, confession_router
+    guild = SimpleNamespace(id=1, name="Load Test")
+    channel = FakeChannel(1)
+    confession_router._channels[channel.id] = channel # No gateway cache here; skip the API fetch
+
+    results = Results()
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_user(bot, i, args, results, guild, channel) for i in range(args.users)))
+    elapsed = time.perf_counter() - started
+
+    # The outbox paces sends with the channel's rate limit, so delivery can trail the last command
+    deadline = time.perf_counter() + args.timeout
+    while confession_outbox.pending() and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+
+    print_report(args, results, elapsed, server, bot)
+    print(f"Confessions delivered: {channel.confessions} in {channel.messages} message(s), {confession_outbox.pending()} still queued")
+    await bot.bot.stop_services()
+    await bot.bot.http_session.close()
+    await server.stop()
+    if not args.data_dir:
+        print(f"\nData written to {data_dir}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the bot's command handlers.")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--requests", type=int, default=10, help="Commands each user runs, one after another")
+    parser.add_argument("--commands", default=",".join(COMMANDS), help="Comma-separated commands to pick from at random")
+    parser.add_argument("--distinct", type=int, default=50, help="Distinct argument values per command (lower = more cache hits)")
+    parser.add_argument("--latency", type=float, default=100, help="Mean upstream latency in ms")
+    parser.add_argument("--jitter", type=float, default=50, help="Upstream latency jitter in ms (+/-)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of upstream requests answered with HTTP 503")
+    parser.add_argument("--payload-kb", type=int, default=4, help="Size of lyrics and generated image payloads in KiB")
+    parser.add_argument("--think", type=float, default=0, help="Max random pause between a user's commands in ms")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds to wait for a command's final message")
+    parser.add_argument("--data-dir", help="Reuse a DATA_DIR (e.g. for warm disk caches) instead of a fresh temp dir")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tracemalloc", action="store_true", help="Also report Python heap peak (slows the run)")
+    parser.add_argument("--verbose", action="store_true", help="Print every failed command")
+    args = parser.parse_args()
+    args.commands = [name.strip() for name in args.commands.split(",") if name.strip()]
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()